@@ -1,11 +1,74 @@
 # agents/story_agent.py (SIMPLIFIED VERSION - 60% reduction)
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 import re
-import requests
+from config.api_config import FINGERPRINT_CACHE_CONFIG, LLM_TASK_OPTIONS, KELUHAN_NORMALIZER_CONFIG
+from tools.keluhan_normalizer import keluhan_normalizer
+from tools.llm_gateway import get_llm_gateway
+from tools.lru_cache import LRUCache
+from tools.tracing import traced
+from tools.logger import get_logger
+
+log = get_logger("story_agent")
 
 class StoryAgentSummary:
     """Simplified Story Agent for narrative generation"""
+
+    # Static part of the keluhan rewrite prompt (Ollama system prompt, prefix reused across calls)
+    KELUHAN_SYSTEM_PROMPT = """Perbaiki keluhan pelanggan menjadi 1 kalimat yang jelas.
+
+Aturan:
+- "ket" -> "ketika" atau "keterangan", sesuai konteks
+- Perbaiki kata singkatan
+- Jawab hanya dengan JSON satu baris: {"keluhan": "<hasil perbaikan>"}
+
+Contoh:
+Input: "Tidak bisa terima call ket dialihkan"
+Output: {"keluhan": "Tidak dapat menerima panggilan ketika dialihkan"}
+"""
+    KELUHAN_SCHEMA = {
+        "type": "object",
+        "properties": {"keluhan": {"type": "string"}},
+        "required": ["keluhan"]
+    }
+
+    # Several tickets in one call (list views); outputs are mapped back by index
+    KELUHAN_BATCH_SYSTEM_PROMPT = """Perbaiki setiap keluhan pelanggan menjadi 1 kalimat yang jelas.
+
+Aturan:
+- "ket" -> "ketika" atau "keterangan", sesuai konteks
+- Perbaiki kata singkatan
+- Satu hasil untuk setiap nomor input, nomor "i" sama dengan nomor input
+- Jawab hanya dengan JSON satu baris: {"hasil": [{"i": <nomor>, "keluhan": "<hasil perbaikan>"}]}
+
+Contoh:
+Input:
+1. "Tidak bisa terima call ket dialihkan"
+2. "internet lemot ga bisa buka yt"
+Output: {"hasil": [{"i": 1, "keluhan": "Tidak dapat menerima panggilan ketika dialihkan"}, {"i": 2, "keluhan": "Internet lambat dan tidak dapat membuka YouTube"}]}
+"""
+    KELUHAN_BATCH_SCHEMA = {
+        "type": "object",
+        "properties": {
+            "hasil": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {"i": {"type": "integer"}, "keluhan": {"type": "string"}},
+                    "required": ["i", "keluhan"]
+                }
+            }
+        },
+        "required": ["hasil"]
+    }
+    KELUHAN_BATCH_SIZE = 10
+
+    # Rewritten keluhan per raw text, shared by single and batched rewrites
+    _keluhan_cache = LRUCache(
+        max_entries=FINGERPRINT_CACHE_CONFIG["keluhan_rewrite"].get("max_entries", 2048),
+        ttl_seconds=FINGERPRINT_CACHE_CONFIG["keluhan_rewrite"].get("ttl_seconds"),
+        name="KeluhanRewriteCache"
+    )
     
     def __init__(self):
         # Simple status/customer mappings
@@ -25,8 +88,14 @@ class StoryAgentSummary:
             'B2B': 'Business to Business'
         }
     
-    def generate_summary_narrative(self, data: List[Dict], location: str, time_period: str) -> str:
-        """Generate comprehensive narrative for summary data"""
+    @traced("narrative")
+    def generate_summary_narrative(self, data: List[Dict], location: str, time_period: str,
+                                   approximation: Dict[str, Any] = None) -> str:
+        """Generate comprehensive narrative for summary data
+
+        approximation: info from SmartQueryBuilder when totals come from SAMPLE
+        or sketch aggregates; the header then carries the error bound.
+        """
         
         if not data or len(data) == 0:
             return f"📊 **Tidak ditemukan keluhan di {location} {time_period}**"
@@ -58,7 +127,18 @@ class StoryAgentSummary:
         
         # Header
         narrative_parts.append(f"📊 **Ringkasan Keluhan di {location} {time_period}**\n")
-        narrative_parts.append(f"Total **{total_complaints} keluhan** ditemukan dari **{len(data)} record** data.")
+        if approximation:
+            narrative_parts.append(f"Total **sekitar {total_complaints} keluhan** {self.format_error_bound(approximation)} ditemukan dari **{len(data)} record** data.")
+            # Sketch summaries carry the top provinces per group instead of a province breakdown
+            top_provinsi = []
+            for row in data:
+                for provinsi in row.get('top_provinsi') or []:
+                    if provinsi not in top_provinsi:
+                        top_provinsi.append(provinsi)
+            if top_provinsi:
+                narrative_parts.append(f"📍 Provinsi terbanyak: {', '.join(top_provinsi[:3])}")
+        else:
+            narrative_parts.append(f"Total **{total_complaints} keluhan** ditemukan dari **{len(data)} record** data.")
         
         # Overview
         if total_complaints == 0:
@@ -133,6 +213,17 @@ class StoryAgentSummary:
         
         return "\n\n".join(narrative_parts)
     
+    def format_error_bound(self, approximation: Dict[str, Any]) -> str:
+        """Format approximation info as '(perkiraan ±2%)'"""
+        error_bound = approximation.get('error_bound')
+        if error_bound is None:
+            return "(perkiraan)"
+        
+        percent = error_bound * 100
+        if percent >= 1:
+            return f"(perkiraan ±{percent:.0f}%)"
+        return f"(perkiraan ±{percent:.1f}%)"
+    
     def extract_location_from_entities(self, entities: Dict[str, Any]) -> str:
         """Extract location name from entities"""
         geo_entities = entities.get('geographic', [])
@@ -182,6 +273,7 @@ class StoryAgentSummary:
                     
         return "periode yang diminta"
     
+    @traced("narrative")
     def generate_detail_narrative(self, ticket_data: Dict) -> str:
         """Generate detailed narrative for individual ticket"""
         
@@ -253,53 +345,152 @@ class StoryAgentSummary:
         match = re.search(pattern, text, re.IGNORECASE)
         return match.group(1).strip() if match else "N/A"
     
+    def _extract_raw_keluhan(self, description: str) -> str:
+        """Raw 'Detail Keluhan' / 'Detail Complain' line of a ticket description"""
+        raw_keluhan = self._extract_field(description or "", r'Detail Keluhan\s*:\s*([^\n]+)')
+        if raw_keluhan == "N/A":
+            raw_keluhan = self._extract_field(description or "", r'Detail Complain\s*:\s*([^\n]+)')
+        return raw_keluhan
+    
     def _extract_and_improve_keluhan(self, description: str) -> str:
         """Extract and improve keluhan text"""
-        raw_keluhan = self._extract_field(description, r'Detail Keluhan\s*:\s*([^\n]+)')
-        if raw_keluhan == "N/A":
-            raw_keluhan = self._extract_field(description, r'Detail Complain\s*:\s*([^\n]+)')
-        
+        raw_keluhan = self._extract_raw_keluhan(description)
         if raw_keluhan != "N/A":
             return self._improve_keluhan_with_llm(raw_keluhan)
         return "N/A"
     
+    def extract_and_improve_keluhan_batch(self, descriptions: List[str], use_llm: bool = True) -> List[str]:
+        """Improved keluhan per ticket description ("N/A" when it has none), one LLM call for all misses
+        
+        use_llm=False only returns dictionary and cached rewrites; misses get "N/A".
+        """
+        raw_list = [self._extract_raw_keluhan(description) for description in descriptions]
+        found = [raw for raw in raw_list if raw != "N/A"]
+        improved = iter(self.improve_keluhan_batch(found, use_llm=use_llm))
+        return [(next(improved) or "N/A") if raw != "N/A" else "N/A" for raw in raw_list]
+    
+    @staticmethod
+    def _keluhan_cache_key(raw_keluhan: str) -> str:
+        return " ".join(raw_keluhan.split())
+    
+    def _cache_enabled(self) -> bool:
+        return FINGERPRINT_CACHE_CONFIG["keluhan_rewrite"].get("enabled", True)
+    
+    def _normalize_keluhan(self, raw_keluhan: str) -> Tuple[str, bool]:
+        """(dictionary rewrite, good enough to skip the LLM)"""
+        normalized, quality = keluhan_normalizer.normalize(raw_keluhan)
+        return normalized, (KELUHAN_NORMALIZER_CONFIG["fast_path"] and
+                            quality >= KELUHAN_NORMALIZER_CONFIG["min_quality"])
+    
     def _improve_keluhan_with_llm(self, raw_keluhan: str) -> str:
-        """Improve keluhan text using LLM"""
-        prompt = f"""
-Perbaiki keluhan pelanggan ini menjadi 1 kalimat yang jelas:
-"{raw_keluhan}"
-
-Aturan:
-- "ket" -> "keterangan"
-- Perbaiki kata singkatan
-- Hanya berikan hasil akhir, tidak perlu penjelasan
-
-Contoh:
-Input: "Tidak bisa terima call ket dialihkan"
-Output: "Tidak dapat menerima panggilan ketika dialihkan"
-"""
+        """Improve keluhan text: dictionary rewrite first, LLM only for what it cannot fix"""
+        normalized, fast_path = self._normalize_keluhan(raw_keluhan)
+        if fast_path:
+            return normalized
+        if self._cache_enabled():
+            cached = self._keluhan_cache.get(self._keluhan_cache_key(raw_keluhan))
+            if cached is not None:
+                return cached
+        return self._rewrite_keluhan(raw_keluhan, normalized)
+    
+    def _rewrite_keluhan(self, raw_keluhan: str, normalized: str) -> str:
+        """Single LLM rewrite of the normalized text (cache already checked)"""
+        prompt = f"""Input: "{normalized}"
+Output:"""
         
         try:
-            response = requests.post("http://localhost:11434/api/generate", 
-                json={"model": "llama3", "prompt": prompt, "stream": False, "options": {"temperature": 0.3}})
-            
-            if response.status_code == 200:
-                result = response.json()["response"].strip()
-                
-                # Extract clean result
-                lines = [line.strip() for line in result.split('\n') if line.strip()]
-                
-                for line in reversed(lines):
-                    if not any(skip in line.lower() for skip in ['perbaikan:', 'contoh:', 'aturan:', 'input:', 'output:', 'berikut']):
-                        if len(line) > 10 and not line.startswith('*'):
-                            return line.strip('"')
-                
-                return lines[0] if lines else raw_keluhan
-        except:
-            pass
-        
-        # Manual fallback
-        return raw_keluhan.replace("ket ", "keterangan ").replace(" ga ", " tidak ")
+            result = get_llm_gateway().generate_json(prompt, self.KELUHAN_SCHEMA, temperature=0.3,
+                                                      system=self.KELUHAN_SYSTEM_PROMPT, task="keluhan_rewrite")
+            keluhan = str(result.get("keluhan", "")).strip().strip('"')
+            if len(keluhan) > 5:
+                if self._cache_enabled():
+                    self._keluhan_cache.set(self._keluhan_cache_key(raw_keluhan), keluhan)
+                return keluhan
+        except Exception as e:
+            log.warning("Keluhan rewrite failed, using dictionary rewrite: %s", e)
+        
+        # Dictionary rewrite as fallback
+        return normalized
+    
+    def improve_keluhan_batch(self, raw_keluhan_list: List[str], use_llm: bool = True) -> List[Optional[str]]:
+        """Improve many keluhan texts: dictionary fast path, cache, then one LLM call per KELUHAN_BATCH_SIZE misses
+        
+        Output i belongs to input i. Items the model skipped or garbled get the
+        dictionary rewrite (not cached), same as a failed single rewrite.
+        With use_llm=False, cache misses are left as None.
+        """
+        results: List[Optional[str]] = [None] * len(raw_keluhan_list)
+        misses: Dict[str, List[int]] = {}
+        normalized_by_key: Dict[str, str] = {}
+        fast = 0
+        for index, raw_keluhan in enumerate(raw_keluhan_list):
+            normalized, fast_path = self._normalize_keluhan(raw_keluhan)
+            if fast_path:
+                results[index] = normalized
+                fast += 1
+                continue
+            cache_key = self._keluhan_cache_key(raw_keluhan)
+            normalized_by_key[cache_key] = normalized
+            cached = self._keluhan_cache.get(cache_key) if self._cache_enabled() else None
+            if cached is not None:
+                results[index] = cached
+            else:
+                misses.setdefault(cache_key, []).append(index)
+        
+        if not use_llm:
+            return results
+        
+        if len(misses) == 1:
+            # Nothing to batch - the single prompt is shorter
+            key, indices = next(iter(misses.items()))
+            improved = self._rewrite_keluhan(raw_keluhan_list[indices[0]], normalized_by_key[key])
+            for index in indices:
+                results[index] = improved
+            return results
+        
+        if misses:
+            log.info("📝 Keluhan rewrite: %s by dictionary, %s cached, %s to LLM", fast,
+                     len(raw_keluhan_list) - fast - sum(len(i) for i in misses.values()), len(misses))
+        keys = list(misses)
+        for start in range(0, len(keys), self.KELUHAN_BATCH_SIZE):
+            chunk = keys[start:start + self.KELUHAN_BATCH_SIZE]
+            improved = self._improve_keluhan_chunk([normalized_by_key[key] for key in chunk])
+            for key, keluhan in zip(chunk, improved):
+                if keluhan is not None and self._cache_enabled():
+                    self._keluhan_cache.set(key, keluhan)
+                for index in misses[key]:
+                    results[index] = keluhan if keluhan is not None else normalized_by_key[key]
+        return results
+    
+    def _improve_keluhan_chunk(self, keluhan_list: List[str]) -> List[Optional[str]]:
+        """One structured LLM call for up to KELUHAN_BATCH_SIZE normalized texts; None where no usable output"""
+        prompt = "Input:\n" + "\n".join(
+            f'{i}. "{text}"' for i, text in enumerate(keluhan_list, 1)) + "\nOutput:"
+        # Output grows with the number of items, so scale the single-rewrite cap
+        num_predict = LLM_TASK_OPTIONS.get("keluhan_rewrite", {}).get("num_predict", 96) * len(keluhan_list)
+        
+        improved: List[Optional[str]] = [None] * len(keluhan_list)
+        try:
+            result = get_llm_gateway().generate_json(prompt, self.KELUHAN_BATCH_SCHEMA, temperature=0.3,
+                                                      options={"num_predict": num_predict},
+                                                      system=self.KELUHAN_BATCH_SYSTEM_PROMPT, task="keluhan_rewrite")
+            for item in result.get("hasil", []):
+                if not isinstance(item, dict):
+                    continue
+                try:
+                    index = int(item.get("i")) - 1
+                except (TypeError, ValueError):
+                    continue
+                keluhan = str(item.get("keluhan", "")).strip().strip('"')
+                if 0 <= index < len(improved) and improved[index] is None and len(keluhan) > 5:
+                    improved[index] = keluhan
+        except Exception as e:
+            log.warning("⚠️ Batch keluhan rewrite failed (%s items): %s", len(keluhan_list), e)
+        return improved
+    
+    @classmethod
+    def get_cache_stats(cls) -> Dict[str, Any]:
+        return cls._keluhan_cache.get_stats()
     
     def _parse_simple_technical_analysis(self, cch_suggestion: str) -> Dict[str, str]:
         """Simple technical analysis parsing"""
@@ -0,0 +1,254 @@
+# benchmarks/fakes.py
+"""Local stand-ins for ClickHouse, Ollama and the Telkomsel SmartCare API.
+
+Usage (from repo root):
+    python -m benchmarks.fakes                      # start the HTTP fakes, print the env to export
+    python -m benchmarks.fakes --token-ms 15 --prefill-ms 200
+
+ClickHouse is replaced at the client level: main.py connects through
+CLICKHOUSE_CLIENT_FACTORY=benchmarks.fakes:get_clickhouse_client, which
+answers from the recorded result sets in fixtures/clickhouse_results.json
+(first regex match on the SQL wins) after FAKE_CLICKHOUSE_LATENCY_MS.
+
+Ollama (/api/generate, /api/tags) answers in the format each prompt asks
+for and sleeps prefill_ms + token_ms per generated token. The Telkomsel mock
+serves the AK/SK token endpoint and queryHistoryInfo with hourly history.
+Chroma is not faked: the harness points CHROMADB_PATH at a temp directory.
+"""
+import os
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+# --------------------------------------------------------------------------- ClickHouse
+
+class FakeQueryResult:
+    """The parts of clickhouse_connect's QueryResult the app reads"""
+
+    def __init__(self, column_names: List[str], rows: List[List[Any]]):
+        self.column_names = tuple(column_names)
+        self.result_rows = [tuple(row) for row in rows]
+        self.summary = {"read_rows": str(len(rows)), "result_rows": str(len(rows))}
+
+    @property
+    def first_row(self):
+        return self.result_rows[0] if self.result_rows else None
+
+
+class FakeClickHouseClient:
+    """Answers SQL from recorded result sets instead of a server"""
+
+    def __init__(self, fixtures_path: Optional[str] = None, latency_ms: Optional[float] = None):
+        fixtures_path = fixtures_path or os.getenv("FAKE_CLICKHOUSE_FIXTURES",
+                                                   os.path.join(FIXTURES_DIR, "clickhouse_results.json"))
+        with open(fixtures_path, "r", encoding="utf-8") as f:
+            results = json.load(f)["results"]
+        self.results = [(re.compile(item["match"], re.IGNORECASE | re.DOTALL), item) for item in results]
+        self.latency_ms = float(os.getenv("FAKE_CLICKHOUSE_LATENCY_MS", "25")) if latency_ms is None else latency_ms
+        self.queries = 0
+
+    def query(self, sql: str, parameters: Optional[Dict] = None, settings: Optional[Dict] = None) -> FakeQueryResult:
+        self.queries += 1
+        if self.latency_ms:
+            # +-30% jitter so percentiles are not flat
+            time.sleep(self.latency_ms * random.uniform(0.7, 1.3) / 1000)
+        for pattern, item in self.results:
+            if pattern.search(sql):
+                return FakeQueryResult(item["columns"], item["rows"])
+        return FakeQueryResult([], [])
+
+    def command(self, sql: str, *args, **kwargs):
+        return None
+
+    def close(self):
+        pass
+
+
+def get_clickhouse_client(**connection_kwargs) -> FakeClickHouseClient:
+    """Drop-in for clickhouse_connect.get_client (connection arguments are ignored)"""
+    return FakeClickHouseClient()
+
+
+# --------------------------------------------------------------------------- Ollama
+
+def _fake_completion(prompt: str) -> str:
+    """Reply in the format the prompt asks for"""
+    if "QUERY USER:" in prompt:
+        query = re.search(r'QUERY USER: "(.*?)"', prompt)
+        query = (query.group(1) if query else "").lower()
+        if any(word in query for word in ("resep", "film", "musik", "cuaca", "presiden", "bola")):
+            return json.dumps({"classification": "OFF_TOPIC", "confidence": 0.9})
+        if any(word in query for word in ("kamu", "sistem", "bot")):
+            return json.dumps({"classification": "SYSTEM_INQUIRY", "confidence": 0.9})
+        return json.dumps({"classification": "COMPLAINT", "confidence": 0.9})
+    if "FOLLOW-UP QUERY" in prompt:
+        return json.dumps({"intent": "list", "inherit_location": True, "inherit_time": True, "filters": ""})
+    if "Extract date from text" in prompt:
+        day = datetime.now() - timedelta(days=1)
+        return f"{day:%Y-%m-%d} 00:00,{day:%Y-%m-%d} 23:55"
+    if "Perbaiki setiap keluhan" in prompt:
+        items = re.findall(r'^(\d+)\. "(.*)"$', prompt.split("Output: {")[-1], re.MULTILINE)
+        return json.dumps({"hasil": [{"i": int(i), "keluhan": f"Pelanggan melaporkan: {text}"} for i, text in items]})
+    if "Perbaiki keluhan pelanggan" in prompt:
+        return json.dumps({"keluhan": "Pelanggan tidak dapat mengakses internet karena sinyal hilang timbul sejak pagi."})
+    return ("📋 Berdasarkan knowledge base, langkah penanganan: 1) cek coverage dan kualitas sinyal "
+            "(RSRP di atas -100 dBm dianggap baik), 2) pastikan kuota dan APN benar, 3) restart perangkat "
+            "dan reset pengaturan jaringan, 4) bila masih bermasalah eskalasi ke tim jaringan dengan "
+            "lokasi dan waktu kejadian. Sumber: SOP penanganan keluhan.")
+
+
+def make_ollama_handler(prefill_ms: float, token_ms: float):
+    class FakeOllamaHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status: int, body: Dict[str, Any]):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/api/tags":
+                from config.api_config import LLM_MODEL_MAP
+                models = {os.getenv("OLLAMA_MODEL", "llama3") + ":latest"} | {m for m in LLM_MODEL_MAP.values() if m}
+                self._send_json(200, {"models": [{"name": name} for name in sorted(models)]})
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            if self.path != "/api/generate":
+                self._send_json(404, {"error": "not found"})
+                return
+            # Static instructions arrive as the system prompt, the query in the prompt
+            prompt = f"{payload.get('system', '')}\n{payload.get('prompt', '')}"
+            response = _fake_completion(prompt)
+            eval_count = max(1, int(len(response.split()) * 1.3))
+            prompt_count = max(1, int(len(prompt.split()) * 1.3))
+            time.sleep((prefill_ms + token_ms * eval_count) / 1000)
+            self._send_json(200, {
+                "model": payload.get("model"),
+                "response": response,
+                "done": True,
+                "prompt_eval_count": prompt_count,
+                "eval_count": eval_count,
+                "load_duration": 0,
+                "prompt_eval_duration": int(prefill_ms * 1e6),
+                "eval_duration": int(token_ms * eval_count * 1e6),
+                "total_duration": int((prefill_ms + token_ms * eval_count) * 1e6)
+            })
+
+    return FakeOllamaHandler
+
+
+# --------------------------------------------------------------------------- Telkomsel SmartCare
+
+def _fake_history(hours: int = 24) -> List[Dict[str, Any]]:
+    now = datetime.now().replace(minute=0, second=0, microsecond=0)
+    history = []
+    for i in range(hours, 0, -1):
+        point = now - timedelta(hours=i)
+        history.append({
+            "UTC": int(point.timestamp()),
+            "TEXT": point.strftime("%Y-%m-%d %H:%M"),
+            "TOTALTRAFFIC": round(random.uniform(0, 350), 2),
+            "TOTALSCORE": round(random.uniform(55, 98), 1),
+            "TOTALINTERNALLATENCYCCH": round(random.uniform(20, 120), 1)
+        })
+    return history
+
+
+def make_smartcare_handler(latency_ms: float):
+    class FakeSmartCareHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status: int, body: Dict[str, Any]):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            self.rfile.read(length)
+            time.sleep(latency_ms / 1000)
+            if self.path.endswith("/tokens/aksk"):
+                self._send_json(200, {"AccessToken": f"fake-token-{int(time.time())}", "ExpiresIn": 3600})
+            elif self.path.endswith("/queryHistoryInfo"):
+                self._send_json(200, {"history": _fake_history(), "resultCode": "0"})
+            else:
+                self._send_json(404, {"error": "not found"})
+
+    return FakeSmartCareHandler
+
+
+# --------------------------------------------------------------------------- servers
+
+def _serve(handler, port: int = 0) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name=f"fake-{handler.__name__}", daemon=True).start()
+    return server
+
+
+def start_fakes(prefill_ms: float = 150, token_ms: float = 20, smartcare_ms: float = 80,
+                clickhouse_ms: float = 25) -> Dict[str, Any]:
+    """Start the HTTP fakes on free ports; returns the env for main.py plus the servers"""
+    ollama = _serve(make_ollama_handler(prefill_ms, token_ms))
+    smartcare = _serve(make_smartcare_handler(smartcare_ms))
+    smartcare_url = f"http://127.0.0.1:{smartcare.server_address[1]}"
+    return {
+        "servers": [ollama, smartcare],
+        "env": {
+            "OLLAMA_BASE_URL": f"http://127.0.0.1:{ollama.server_address[1]}",
+            "TELKOMSEL_TOKEN_URL": f"{smartcare_url}/apigovernance/tokens/aksk",
+            "TELKOMSEL_QUERY_URL": f"{smartcare_url}/apiaccess/cccommon/v1/query/queryHistoryInfo",
+            "CLICKHOUSE_CLIENT_FACTORY": "benchmarks.fakes:get_clickhouse_client",
+            "FAKE_CLICKHOUSE_LATENCY_MS": str(clickhouse_ms)
+        }
+    }
+
+
+def stop_fakes(fakes: Dict[str, Any]):
+    for server in fakes["servers"]:
+        server.shutdown()
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Ollama / SmartCare fakes standalone")
+    parser.add_argument("--prefill-ms", type=float, default=150, help="Ollama latency before the first token")
+    parser.add_argument("--token-ms", type=float, default=20, help="Ollama latency per generated token")
+    parser.add_argument("--smartcare-ms", type=float, default=80)
+    parser.add_argument("--clickhouse-ms", type=float, default=25)
+    args = parser.parse_args()
+
+    fakes = start_fakes(args.prefill_ms, args.token_ms, args.smartcare_ms, args.clickhouse_ms)
+    print("🧪 Fakes running. Start main.py with:")
+    for key, value in fakes["env"].items():
+        print(f"   export {key}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stop_fakes(fakes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# benchmarks/fulltext_granules.py
+"""Compare full-text skip-index predicates against a plain ILIKE scan.
+
+Usage (from repo root, needs a reachable ClickHouse):
+    python -m benchmarks.fulltext_granules "sinyal hilang"
+    python -m benchmarks.fulltext_granules "internet atau sinyal" --days 90 --runs 5
+
+For each variant it reports granules selected per index (EXPLAIN indexes = 1),
+rows read and elapsed time from the query summary.
+"""
+import argparse
+import re
+import statistics
+import time
+from typing import Dict, Any, List
+
+from tools.direct_database_tool import DirectDatabaseTool
+from tools.smart_query_builder import SmartQueryBuilder
+
+
+def parse_index_granules(explain_lines: List[str]) -> List[Dict[str, Any]]:
+    """Extract 'Granules: selected/total' per index from EXPLAIN indexes = 1 output"""
+    steps = []
+    current = None
+    for line in explain_lines:
+        text = line.strip()
+        if text in ("PrimaryKey", "MinMax", "Partition", "Skip"):
+            current = {"index": text}
+            steps.append(current)
+        elif text.startswith("Name:") and current is not None:
+            current["index"] = f"{current['index']} {text.split(':', 1)[1].strip()}"
+        elif text.startswith("Granules:") and current is not None:
+            match = re.search(r'(\d+)/(\d+)', text)
+            if match:
+                current["selected"], current["total"] = int(match.group(1)), int(match.group(2))
+    return steps
+
+
+def explain_granules(client, sql: str) -> List[Dict[str, Any]]:
+    result = client.query(f"EXPLAIN indexes = 1 {sql}")
+    return parse_index_granules([row[0] for row in result.result_rows])
+
+
+def time_query(client, sql: str, runs: int) -> Dict[str, Any]:
+    timings = []
+    read_rows = 0
+    count = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = client.query(sql)
+        timings.append((time.perf_counter() - start) * 1000)
+        read_rows = int(result.summary.get("read_rows", 0)) if result.summary else 0
+        count = result.result_rows[0][0] if result.result_rows else 0
+    return {
+        "count": count,
+        "read_rows": read_rows,
+        "median_ms": statistics.median(timings),
+        "min_ms": min(timings)
+    }
+
+
+def build_variants(builder: SmartQueryBuilder, terms: str, days: int) -> Dict[str, str]:
+    """Same filter expressed as skip-index predicates vs ILIKE scan"""
+    table = builder.table_name
+    time_filter = f"create_time >= now() - INTERVAL {int(days)} DAY"
+    fields = builder.fulltext_config.get('fields', ['description'])
+    separator = builder.fulltext_config.get('alternative_separator', 'atau')
+
+    indexed = ' OR '.join(builder._build_fulltext_condition(field, terms) for field in fields)
+
+    # ILIKE equivalent: words ANDed, "atau" alternatives ORed
+    ilike_groups = [group.split() for group in terms.lower().split(f' {separator} ')]
+    if len(ilike_groups) > 1:
+        words = [word for group in ilike_groups for word in group]
+        ilike = ' OR '.join(f"{field} ILIKE '%{word}%'" for field in fields for word in words)
+    else:
+        ilike = ' OR '.join(
+            '(' + ' AND '.join(f"{field} ILIKE '%{word}%'" for word in ilike_groups[0]) + ')'
+            for field in fields
+        )
+
+    return {
+        "skip_index": f"SELECT count() FROM {table} WHERE ({indexed}) AND {time_filter}",
+        "ilike_scan": f"SELECT count() FROM {table} WHERE ({ilike}) AND {time_filter}",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-text skip index vs ILIKE benchmark")
+    parser.add_argument("terms", help='Search terms, e.g. "sinyal hilang" or "internet atau sinyal"')
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    db_tool = DirectDatabaseTool()
+    builder = SmartQueryBuilder(use_direct_db=False)
+    variants = build_variants(builder, args.terms, args.days)
+
+    with db_tool.pool.get_client() as client:
+        for name, sql in variants.items():
+            print(f"\n{'=' * 60}\n{name}: {sql}")
+            for step in explain_granules(client, sql):
+                if "selected" in step:
+                    skipped = step["total"] - step["selected"]
+                    print(f"  {step['index']:<40} granules {step['selected']}/{step['total']} (skipped {skipped})")
+            stats = time_query(client, sql, args.runs)
+            print(f"  count={stats['count']} read_rows={stats['read_rows']:,} "
+                  f"median={stats['median_ms']:.1f}ms min={stats['min_ms']:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# benchmarks/llm_prefix_reuse.py
+"""Prompt-eval cost of the classifier prompt: query inside the template vs static system prompt.
+
+Usage (from repo root, against a real Ollama):
+    OLLAMA_BASE_URL=http://localhost:11434 python -m benchmarks.llm_prefix_reuse
+    python -m benchmarks.llm_prefix_reuse --queries 30 --model llama3
+
+"inline" rebuilds the old layout: one prompt with the user query near the
+top of the instructions, so everything after it is re-evaluated on every
+call. "system" is what SimplifiedCrew sends now: the instructions as the
+Ollama system prompt and only the query as the prompt, so the prefix KV is
+reused. Ollama reports only the tokens it actually evaluated in
+prompt_eval_count, which makes the reuse visible directly. Calls are
+sequential on purpose (one parallel slot keeps one cached prefix).
+"""
+import sys
+import argparse
+import statistics
+from typing import Any, Dict, List
+
+from benchmarks.nlu_microbench import generate_corpus
+from crews.simplified_crew import SimplifiedCrew
+from tools import tracing
+from tools.llm_gateway import LLMGateway
+
+# The old template had the query right after the KONTEKS SISTEM block
+_SPLIT_AT = "TUGAS:"
+
+
+def inline_prompt(user_query: str) -> str:
+    head, _, tail = SimplifiedCrew.CLASSIFIER_SYSTEM_PROMPT.partition(_SPLIT_AT)
+    return f'{head}QUERY USER: "{user_query}"\n\n{_SPLIT_AT}{tail}'
+
+
+def run_layout(gateway: LLMGateway, layout: str, queries: List[str], model: str) -> Dict[str, Any]:
+    calls = []
+    for user_query in queries:
+        tracing.start_trace()
+        if layout == "inline":
+            gateway.generate(inline_prompt(user_query), model=model, options={"num_predict": 40})
+        else:
+            gateway.generate(f'QUERY USER: "{user_query}"\n', model=model, options={"num_predict": 40},
+                             system=SimplifiedCrew.CLASSIFIER_SYSTEM_PROMPT)
+        calls.append(tracing.current_llm_usage().to_dict())
+        tracing.finish_trace()
+
+    warm = calls[1:] or calls
+    return {
+        "layout": layout,
+        "first_call_load_ms": round(calls[0]["load_seconds"] * 1000, 1),
+        "first_call_prompt_tokens": calls[0]["prompt_tokens"],
+        "prompt_tokens_mean": round(statistics.mean(c["prompt_tokens"] for c in warm), 1),
+        "prompt_eval_ms_mean": round(statistics.mean(c["prompt_eval_seconds"] for c in warm) * 1000, 1),
+        "total_ms_mean": round(statistics.mean(c["total_seconds"] for c in warm) * 1000, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classifier prompt-eval cost, inline template vs system prompt")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--model", help="Ollama model (default: OLLAMA_MODEL)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    gateway = LLMGateway()
+    model = args.model or gateway.default_model
+    queries = [item["query"] for item in generate_corpus(args.queries, seed=args.seed)]
+
+    # Load the model first so neither layout pays the cold start
+    gateway.warm_up([("", model)])
+    results = [run_layout(gateway, layout, queries, model) for layout in ("inline", "system")]
+
+    print(f"\n{'layout':<8} {'load ms':>9} {'prompt tok':>11} {'prompt eval ms':>15} {'total ms':>10}")
+    for result in results:
+        print(f"{result['layout']:<8} {result['first_call_load_ms']:>9} {result['prompt_tokens_mean']:>11} "
+              f"{result['prompt_eval_ms_mean']:>15} {result['total_ms_mean']:>10}")
+    inline, system = results
+    if inline["prompt_eval_ms_mean"]:
+        saved = 1 - system["prompt_eval_ms_mean"] / inline["prompt_eval_ms_mean"]
+        print(f"\n⚡ prompt eval time per classification: {saved:.0%} lower with the system prompt prefix")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
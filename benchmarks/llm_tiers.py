@@ -0,0 +1,141 @@
+# benchmarks/llm_tiers.py
+"""Latency and accuracy of each LLM call site per model tier.
+
+Usage (from repo root, against a real Ollama):
+    python -m benchmarks.llm_tiers --models llama3 qwen2.5:1.5b-instruct-q4_K_M
+    python -m benchmarks.llm_tiers --models llama3 llama3.2:1b --tasks classification --queries 100
+
+For every model the labelled call sites run with LLM_MODEL_MAP pointing at
+that model:
+    classification   SimplifiedCrew._llm_classify_uncached vs the corpus category label
+    followup         SimplifiedCrew._enhance_followup_with_llm vs the expected follow-up intent
+    date_extraction  TimeParser._extract_date_with_llm vs the generated date
+Queries come from the nlu_microbench corpus generator (same seed = same
+queries for every model). Reports accuracy, p50/p95 latency, and mean prompt /
+completion tokens and prompt-eval time from Ollama's own counters.
+"""
+import io
+import sys
+import time
+import random
+import argparse
+import contextlib
+import statistics
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Tuple
+
+from benchmarks.nlu_microbench import generate_corpus
+from config.api_config import LLM_MODEL_MAP
+from crews.simplified_crew import SimplifiedCrew
+from tools import tracing
+from tools.time_parser import TimeParser
+
+MONTHS = ["januari", "februari", "maret", "april", "mei", "juni", "juli",
+          "agustus", "september", "oktober", "november", "desember"]
+FOLLOWUPS = [("berikan contohnya", "list"), ("tampilkan contoh yang belum selesai", "list"),
+             ("berapa totalnya", "count"), ("jumlah berapa itu", "count"),
+             ("detail lebih lanjut", "detail"), ("ringkasan untuk itu", "summary"), ("buat laporannya", "summary")]
+
+
+def classification_cases(size: int, seed: int) -> List[Tuple[Any, Any]]:
+    return [(item["query"], item["labels"]["category"]) for item in generate_corpus(size, seed)]
+
+
+def followup_cases(size: int, seed: int) -> List[Tuple[Any, Any]]:
+    rng = random.Random(seed)
+    cases = []
+    for item in generate_corpus(size, seed):
+        if item["kind"] not in ("count", "summary", "list"):
+            continue
+        followup, intent = rng.choice(FOLLOWUPS)
+        context = {"previous_query": item["query"], "previous_query_type": item["kind"],
+                   "previous_entities": {"geographic": [{"value": item["labels"]["location"]}],
+                                         "temporal": [{"value": "hari ini"}]}}
+        cases.append(((followup, context), intent))
+    return cases[:size]
+
+
+def date_cases(size: int, seed: int) -> List[Tuple[Any, Any]]:
+    rng = random.Random(seed)
+    cases = []
+    for _ in range(size):
+        day = date(2025, 1, 1) + timedelta(days=rng.randint(0, 364))
+        text = rng.choice([f"tanggal {day.day} {MONTHS[day.month - 1]} {day.year}",
+                           f"{day.day} {MONTHS[day.month - 1][:3]} {day.year % 100}",
+                           f"{day.day}/{day.month}/{day.year % 100}"])
+        cases.append((text, (f"{day:%Y-%m-%d} 00:00", f"{day:%Y-%m-%d} 23:55")))
+    return cases
+
+
+def build_tasks(size: int, seed: int) -> Dict[str, Tuple[Callable[[Any], Any], List[Tuple[Any, Any]]]]:
+    """task -> (call(input) -> comparable output, [(input, expected)])"""
+    crew = SimplifiedCrew.__new__(SimplifiedCrew)
+    time_parser = TimeParser()
+    return {
+        "classification": (lambda query: crew._llm_classify_uncached(query, "llm_tiers")["intent_category"],
+                           classification_cases(size, seed)),
+        "followup": (lambda case: crew._enhance_followup_with_llm(case[0], case[1], "llm_tiers")
+                     ["enhanced_context"]["intent"], followup_cases(size, seed)),
+        "date_extraction": (time_parser._extract_date_with_llm, date_cases(size, seed))
+    }
+
+
+def run_task(call: Callable[[Any], Any], cases: List[Tuple[Any, Any]]) -> Dict[str, Any]:
+    latencies, usages, correct, errors = [], [], 0, 0
+    for case_input, expected in cases:
+        tracing.start_trace()
+        start = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                output = call(case_input)
+            correct += output == expected
+        except Exception:
+            errors += 1
+        latencies.append((time.perf_counter() - start) * 1000)
+        usages.append(tracing.current_llm_usage().to_dict())
+        tracing.finish_trace()
+
+    ordered = sorted(latencies)
+    return {
+        "cases": len(cases),
+        "accuracy": round(correct / len(cases), 3) if cases else None,
+        "errors": errors,
+        "p50_ms": round(ordered[len(ordered) // 2], 1) if ordered else None,
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 1) if ordered else None,
+        "prompt_tokens": round(statistics.mean(u["prompt_tokens"] for u in usages), 1) if usages else None,
+        "completion_tokens": round(statistics.mean(u["completion_tokens"] for u in usages), 1) if usages else None,
+        "prompt_eval_ms": round(statistics.mean(u["prompt_eval_seconds"] for u in usages) * 1000, 1) if usages else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per call site latency / accuracy for each model tier")
+    parser.add_argument("--models", nargs="+", required=True, help="Ollama models to compare")
+    parser.add_argument("--tasks", nargs="+", choices=["classification", "followup", "date_extraction"],
+                        default=["classification", "followup", "date_extraction"])
+    parser.add_argument("--queries", type=int, default=40, help="Cases per task")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    from tools.llm_gateway import get_llm_gateway
+    tasks = build_tasks(args.queries, args.seed)
+    rows = []
+    for model in args.models:
+        # Load the model outside the timed calls
+        get_llm_gateway().warm_up([("", model)])
+        for task in args.tasks:
+            LLM_MODEL_MAP[task] = model
+            call, cases = tasks[task]
+            print(f"⏱️ {model} / {task} ({len(cases)} cases)")
+            rows.append({"model": model, "task": task, **run_task(call, cases)})
+
+    print(f"\n{'model':<32} {'task':<16} {'acc':>6} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'prompt tok':>10} {'out tok':>8} {'prefill ms':>10}")
+    for row in rows:
+        print(f"{row['model']:<32} {row['task']:<16} {row['accuracy']:>6} {row['errors']:>4} {row['p50_ms']:>8} "
+              f"{row['p95_ms']:>8} {row['prompt_tokens']:>10} {row['completion_tokens']:>8} {row['prompt_eval_ms']:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+# benchmarks/load_test.py
+"""End-to-end load test of main.py against local fakes.
+
+Usage (from repo root):
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --concurrency 1 4 16 --requests 200 --token-ms 30
+    python -m benchmarks.load_test --url http://localhost:8002      # already running server
+
+Starts the Ollama / SmartCare fakes (benchmarks/fakes.py), launches main.py
+with ClickHouse answered from recorded result sets and Chroma in a temp
+directory, then replays fixtures/query_corpus.json at each concurrency level.
+Reports throughput and p50/p95/p99 latency per workflow and level, plus the
+mean Server-Timing stage breakdown.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import tempfile
+import argparse
+import statistics
+import subprocess
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from benchmarks.fakes import FIXTURES_DIR, start_fakes, stop_fakes
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def _parse_server_timing(header: str) -> Dict[str, float]:
+    stages = {}
+    for part in filter(None, (item.strip() for item in (header or "").split(","))):
+        name, _, duration = part.partition(";dur=")
+        try:
+            stages[name] = float(duration)
+        except ValueError:
+            continue
+    return stages
+
+
+def chat(base_url: str, query: str, session_id: str, timeout: float = 300) -> Dict[str, Any]:
+    body = json.dumps({"messages": [{"role": "user", "content": query}], "stream": False}).encode("utf-8")
+    request = urllib.request.Request(f"{base_url}/v1/chat/completions", data=body, method="POST",
+                                     headers={"Content-Type": "application/json", "X-Session-ID": session_id})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+            headers = response.headers
+    except urllib.error.HTTPError as e:
+        e.read()
+        status, headers = e.code, e.headers
+    except (urllib.error.URLError, OSError) as e:
+        return {"ok": False, "latency_ms": (time.perf_counter() - start) * 1000, "error": str(e)}
+    return {
+        "ok": status == 200,
+        "status": status,
+        "latency_ms": (time.perf_counter() - start) * 1000,
+        "workflow": headers.get("X-Debug-Workflow"),
+        "stages": _parse_server_timing(headers.get("Server-Timing"))
+    }
+
+
+def wait_ready(base_url: str, timeout: float, proc: Optional[subprocess.Popen] = None) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc is not None and proc.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(f"{base_url}/readyz", timeout=2) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def run_level(base_url: str, corpus: List[Dict[str, Any]], concurrency: int, total: int) -> Dict[str, Any]:
+    """Replay `total` corpus entries with `concurrency` clients"""
+    def one(index: int) -> Dict[str, Any]:
+        item = corpus[index % len(corpus)]
+        session_id = f"loadtest_c{concurrency}_{index}"
+        if item.get("setup"):
+            chat(base_url, item["setup"], session_id)
+        result = chat(base_url, item["query"], session_id)
+        result["expected_workflow"] = item["workflow"]
+        return result
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+
+    per_workflow = {}
+    for result in results:
+        per_workflow.setdefault(result["expected_workflow"], []).append(result)
+
+    workflows = {}
+    for workflow, items in sorted(per_workflow.items()):
+        latencies = [item["latency_ms"] for item in items if item["ok"]]
+        stage_totals = {}
+        for item in items:
+            for stage, ms in item.get("stages", {}).items():
+                stage_totals.setdefault(stage, []).append(ms)
+        workflows[workflow] = {
+            "requests": len(items),
+            "errors": sum(1 for item in items if not item["ok"]),
+            "routed_elsewhere": sum(1 for item in items if item["ok"] and item.get("workflow") not in (workflow, None)),
+            "p50_ms": _percentile(latencies, 0.50) if latencies else None,
+            "p95_ms": _percentile(latencies, 0.95) if latencies else None,
+            "p99_ms": _percentile(latencies, 0.99) if latencies else None,
+            "stages_mean_ms": {stage: round(statistics.mean(values), 1) for stage, values in stage_totals.items()}
+        }
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "seconds": round(elapsed, 2),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "errors": sum(1 for result in results if not result["ok"]),
+        "workflows": workflows
+    }
+
+
+def start_server(fakes_env: Dict[str, str], port: int, log_path: str) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update(fakes_env)
+    env.update({
+        "FLASK_PORT": str(port),
+        "FLASK_HOST": "127.0.0.1",
+        "FLASK_DEBUG": "false",
+        "STARTUP_MODE": env.get("STARTUP_MODE", "eager"),
+        "SNAPSHOT_ENABLED": "false",
+        "SESSION_BACKEND": "memory",
+        "LOG_LEVEL": env.get("LOG_LEVEL", "WARNING"),
+        "CHROMADB_PATH": env.get("CHROMADB_PATH") or tempfile.mkdtemp(prefix="loadtest_chroma_"),
+        "PYTHONPATH": REPO_ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    })
+    log_file = open(log_path, "w")
+    return subprocess.Popen([sys.executable, "main.py"], cwd=REPO_ROOT, env=env,
+                            stdout=log_file, stderr=subprocess.STDOUT)
+
+
+def print_report(levels: List[Dict[str, Any]]):
+    for level in levels:
+        print(f"\n{'=' * 78}\n⚡ concurrency={level['concurrency']}  requests={level['requests']}  "
+              f"{level['throughput_rps']} req/s  errors={level['errors']}  ({level['seconds']}s)")
+        print(f"   {'workflow':<16} {'n':>4} {'err':>4} {'p50':>9} {'p95':>9} {'p99':>9}  slowest stages")
+        for workflow, stats in level["workflows"].items():
+            fmt = lambda value: f"{value:>7.0f}ms" if value is not None else f"{'-':>9}"
+            stages = sorted(((ms, stage) for stage, ms in stats["stages_mean_ms"].items() if stage != "total"),
+                            reverse=True)[:3]
+            stage_text = ", ".join(f"{stage} {ms:.0f}ms" for ms, stage in stages)
+            print(f"   {workflow:<16} {stats['requests']:>4} {stats['errors']:>4} "
+                  f"{fmt(stats['p50_ms'])} {fmt(stats['p95_ms'])} {fmt(stats['p99_ms'])}  {stage_text}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test main.py against local fakes")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=100, help="Requests per concurrency level")
+    parser.add_argument("--corpus", default=os.path.join(FIXTURES_DIR, "query_corpus.json"))
+    parser.add_argument("--url", help="Use an already running server instead of starting main.py with fakes")
+    parser.add_argument("--prefill-ms", type=float, default=150)
+    parser.add_argument("--token-ms", type=float, default=20)
+    parser.add_argument("--smartcare-ms", type=float, default=80)
+    parser.add_argument("--clickhouse-ms", type=float, default=25)
+    parser.add_argument("--startup-timeout", type=float, default=300)
+    parser.add_argument("--seed-knowledge", action="store_true",
+                        help="POST /knowledge/upload before the run (indexes ./docs into the temp Chroma)")
+    parser.add_argument("--json", help="Also write the raw results to this file")
+    args = parser.parse_args()
+
+    with open(args.corpus, "r", encoding="utf-8") as f:
+        corpus = json.load(f)["queries"]
+
+    fakes, proc = None, None
+    base_url = args.url
+    try:
+        if not base_url:
+            fakes = start_fakes(args.prefill_ms, args.token_ms, args.smartcare_ms, args.clickhouse_ms)
+            port = _free_port()
+            log_path = os.path.join(tempfile.gettempdir(), f"loadtest_main_{port}.log")
+            print(f"🚀 Starting main.py on :{port} against fakes (log: {log_path})")
+            proc = start_server(fakes["env"], port, log_path)
+            base_url = f"http://127.0.0.1:{port}"
+
+        if not wait_ready(base_url, args.startup_timeout, proc):
+            print(f"❌ Server not ready at {base_url}/readyz")
+            return 1
+
+        if args.seed_knowledge:
+            request = urllib.request.Request(f"{base_url}/knowledge/upload", data=b"", method="POST")
+            with urllib.request.urlopen(request, timeout=args.startup_timeout) as response:
+                print(f"📚 Knowledge seeded: {json.loads(response.read()).get('total_chunks', 0)} chunks")
+
+        levels = []
+        for concurrency in args.concurrency:
+            print(f"⏱️ concurrency={concurrency} ...")
+            levels.append(run_level(base_url, corpus, concurrency, args.requests))
+
+        print_report(levels)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(levels, f, indent=2)
+        return 0
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        if fakes is not None:
+            stop_fakes(fakes)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
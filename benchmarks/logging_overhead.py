@@ -0,0 +1,98 @@
+# benchmarks/logging_overhead.py
+"""Request-thread CPU time of the SQL build hot path under different logging setups.
+
+Usage (from repo root, no ClickHouse needed):
+    python -m benchmarks.logging_overhead
+    python -m benchmarks.logging_overhead --iterations 2000 --output stdout
+
+Runs SmartQueryBuilder.build_plan (plan cache off, so intent detection,
+entity extraction and build_sql run every time) for a fixed query mix:
+
+    sync-debug     DEBUG, formatted and written in the request thread (the old print behaviour)
+    async-debug    DEBUG, formatted and written by the queue listener thread
+    sampled-debug  DEBUG at LOG_DEBUG_SAMPLE_RATE=0.1, async
+    info           INFO (production default), debug calls return before formatting
+
+Reports request-thread CPU (thread_time) and whole-process CPU (process_time,
+includes the writer thread) per build.
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+from typing import Dict, Any, List
+
+from tools.logger import setup_logging, get_logging_stats
+from tools.smart_query_builder import SmartQueryBuilder
+
+QUERIES = [
+    "berapa jumlah keluhan di jakarta bulan ini",
+    "ringkasan keluhan sinyal hilang di surabaya minggu lalu",
+    "tampilkan daftar keluhan internet lambat di bandung",
+    "detail tiket 12345678",
+    "keluhan jawa barat 3 bulan terakhir",
+    "summary komplain jaringan di medan kemarin",
+]
+
+SETUPS = {
+    "sync-debug": {"level": "DEBUG", "async_writer": False, "debug_sample_rate": 1.0},
+    "async-debug": {"level": "DEBUG", "async_writer": True, "debug_sample_rate": 1.0},
+    "sampled-debug": {"level": "DEBUG", "async_writer": True, "debug_sample_rate": 0.1},
+    "info": {"level": "INFO", "async_writer": True, "debug_sample_rate": 1.0},
+}
+
+
+class _NoDatabase:
+    """build_plan never executes SQL; keeps the builder from opening a ClickHouse pool"""
+
+
+def run_setup(builder: SmartQueryBuilder, name: str, iterations: int, stream) -> Dict[str, Any]:
+    setup_logging(stream=stream, **SETUPS[name])
+    thread_times = []
+    process_start = time.process_time()
+    for i in range(iterations):
+        query = QUERIES[i % len(QUERIES)]
+        start = time.thread_time()
+        builder.build_plan(query)
+        thread_times.append((time.thread_time() - start) * 1000)
+    dropped = get_logging_stats()["dropped"]
+    setup_logging(stream=stream, **SETUPS["info"])   # flushes and stops the writer thread
+    process_ms = (time.process_time() - process_start) * 1000
+    return {
+        "setup": name,
+        "thread_mean_ms": statistics.mean(thread_times),
+        "thread_p99_ms": sorted(thread_times)[int(len(thread_times) * 0.99) - 1],
+        "process_mean_ms": process_ms / iterations,
+        "dropped": dropped
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logging overhead on the SQL build hot path")
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--setups", nargs="+", default=list(SETUPS), choices=list(SETUPS))
+    parser.add_argument("--output", choices=["devnull", "stdout"], default="devnull",
+                        help="Where log lines go (stdout shows terminal/pipe write cost)")
+    args = parser.parse_args()
+
+    stream = open(os.devnull, "w") if args.output == "devnull" else sys.stdout
+    builder = SmartQueryBuilder(use_direct_db=True, db_tool=_NoDatabase())
+    builder.plan_cache_config = {"enabled": False}
+
+    # Warm-up: regex compilation, normalizer tables
+    setup_logging(stream=stream, **SETUPS["info"])
+    for query in QUERIES:
+        builder.build_plan(query)
+
+    results: List[Dict[str, Any]] = [run_setup(builder, name, args.iterations, stream) for name in args.setups]
+
+    print(f"\n📊 build_plan x {args.iterations} (log output: {args.output})")
+    print(f"   {'setup':<15} {'thread mean':>12} {'thread p99':>11} {'process mean':>13} {'dropped':>8}")
+    for result in results:
+        print(f"   {result['setup']:<15} {result['thread_mean_ms']:>10.3f}ms {result['thread_p99_ms']:>9.3f}ms "
+              f"{result['process_mean_ms']:>11.3f}ms {result['dropped']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+# benchmarks/nlu_microbench.py
+"""Microbenchmarks + correctness check for the query-understanding front end.
+
+Usage (from repo root, no ClickHouse / Ollama needed):
+    python -m benchmarks.nlu_microbench
+    python -m benchmarks.nlu_microbench --queries 5000 --rounds 5 --only detect_intent build_sql
+    python -m benchmarks.nlu_microbench --fail-under 0.95          # CI: exit 1 below 95% accuracy
+
+A seeded generator builds a few thousand labelled Indonesian queries
+(count / summary / list / detail / SmartCare / knowledge / system / off-topic
+templates x locations x topics x time phrases). Every function runs over the
+whole corpus once to check its output against the labels, then `rounds`
+timed passes give ops/sec; one traced pass (tracemalloc) gives allocated
+memory blocks and the peak per pass.
+
+The LLM gateway is replaced by one that fails immediately, so
+SimplifiedCrew._classify_query measures the rule path plus
+_fallback_classification, and TimeParser never leaves the process.
+"""
+import io
+import os
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+import contextlib
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List
+
+from tools.component_registry import registry
+from tools.llm_gateway import LLMGatewayError
+from tools.smart_query_builder import SmartQueryBuilder
+from tools.time_parser import TimeParser
+from tools.msisdn_validator import MSISDNValidator
+from tools.query_parser import SmartCareQueryParser
+from tools.query_normalizer import LOCATION_ALIASES
+from memory.session_store import InMemorySessionStore
+from memory.session_manager import SessionManager
+from crews.simplified_crew import SimplifiedCrew
+
+# (alias as typed, canonical gazetteer value expected in the geographic entities)
+LOCATIONS = sorted((alias, canonical.lower()) for alias, canonical in LOCATION_ALIASES.items())
+TOPICS = ["internet lambat", "sinyal hilang", "tidak bisa telepon", "kuota", "jaringan", "wifi"]
+# (phrase, recognised by TimeParser)
+TIME_PHRASES = [("hari ini", True), ("kemarin", True), ("2 jam lalu", True), ("3 hari lalu", True),
+                ("pagi ini", True), ("jam 10", True), ("bulan ini", False), ("minggu lalu", False)]
+TELKOMSEL_PREFIXES = ["811", "812", "813", "821", "822", "823", "852", "853"]
+OFF_TOPIC = ["resep nasi padang yang enak", "film terbaru minggu ini", "cuaca besok hujan tidak",
+             "harga beli motor bekas", "jadwal sepak bola malam ini"]
+SYSTEM = ["siapa kamu", "apa kemampuan kamu", "hello", "status sistem sekarang"]
+
+
+class _OfflineGateway:
+    """LLM gateway stand-in: every call fails at once, so only rule paths are measured"""
+
+    def generate(self, *args, **kwargs):
+        raise LLMGatewayError("offline (nlu_microbench)")
+
+
+def generate_corpus(size: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """Labelled queries; label keys are only set where the template determines them"""
+    rng = random.Random(seed)
+    corpus = []
+    while len(corpus) < size:
+        kind = rng.choice(["count", "summary", "list", "detail", "smartcare", "knowledge", "system", "off_topic"])
+        (location, canonical), topic = rng.choice(LOCATIONS), rng.choice(TOPICS)
+        time_phrase, time_known = rng.choice(TIME_PHRASES)
+        if kind == "count":
+            query = f"berapa jumlah keluhan {topic} di {location} {time_phrase}"
+            labels = {"intent": "count", "location": canonical, "category": "ticket_analysis"}
+        elif kind == "summary":
+            query = f"{rng.choice(['ringkasan', 'laporan', 'rekap'])} keluhan {topic} di {location} {time_phrase}"
+            labels = {"intent": "summary", "location": canonical, "category": "ticket_analysis"}
+        elif kind == "list":
+            query = f"tampilkan contoh keluhan {topic} di {location} {time_phrase}"
+            labels = {"intent": "list", "location": canonical, "category": "ticket_analysis"}
+        elif kind == "detail":
+            query = f"detail tiket INC{rng.randint(10**11, 10**12 - 1)}"
+            labels = {"intent": "detail"}
+        elif kind == "smartcare":
+            local = f"{rng.choice(TELKOMSEL_PREFIXES)}{rng.randint(10**7, 10**8 - 1)}"
+            number = rng.choice([f"0{local}", f"62{local}", f"+62{local}"])
+            query = f"{rng.choice(['cek', 'riwayat', 'grafik', 'detil'])} {number} {time_phrase}"
+            # msisdn label = API form (8xxxxxxxxx) that SmartCareWorkflow sends after normalization
+            labels = {"msisdn": local, "category": "smartcare_query", "time_parsed": time_known}
+        elif kind == "knowledge":
+            query = f"bagaimana cara mengatasi {topic} di {location}"
+            labels = {"category": "knowledge_query"}
+        elif kind == "system":
+            query = rng.choice(SYSTEM)
+            labels = {"category": "system_inquiry"}
+        else:
+            query = rng.choice(OFF_TOPIC)
+            labels = {"category": "off_topic"}
+        corpus.append({"kind": kind, "query": query, "labels": labels})
+    return corpus
+
+
+def build_components() -> Dict[str, Any]:
+    registry.set("llm_gateway", _OfflineGateway())
+    builder = SmartQueryBuilder(use_direct_db=True, db_tool=SimpleNamespace())
+    builder.plan_cache_config = {"enabled": False}
+    # Rule paths of SimplifiedCrew without constructing the workflows (no DB / Chroma)
+    crew = SimplifiedCrew.__new__(SimplifiedCrew)
+    crew.session_manager = SessionManager(InMemorySessionStore(start_sweeper=False))
+    crew.smartcare_workflow = SimpleNamespace(query_parser=SmartCareQueryParser())
+    return {
+        "builder": builder,
+        "time_parser": TimeParser(),
+        "msisdn": MSISDNValidator(),
+        "query_parser": SmartCareQueryParser(),
+        "crew": crew
+    }
+
+
+def _geographic_values(entities: Dict[str, Any]) -> str:
+    return " ".join(str(entity.get("value", "")) for entity in entities.get("geographic", [])).lower()
+
+
+def build_cases(components: Dict[str, Any], corpus: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """name -> {fn(item, prepared), prepare(item), check(item, output) -> Optional[str]}"""
+    builder, crew = components["builder"], components["crew"]
+
+    def check_intent(item, output):
+        expected = item["labels"].get("intent")
+        return None if expected is None or output == expected else f"intent {output!r} != {expected!r}"
+
+    def check_entities(item, output):
+        expected = item["labels"].get("location")
+        if expected is None:
+            return None
+        return None if expected in _geographic_values(output) else f"location {expected!r} not in {_geographic_values(output)!r}"
+
+    def check_time(item, output):
+        expected = item["labels"].get("time_parsed")
+        return None if expected is None or output["success"] == expected else f"time success {output['success']} != {expected}"
+
+    def check_msisdn(item, output):
+        expected = item["labels"].get("msisdn")
+        if item["kind"] != "smartcare":
+            return None if output is None or item["kind"] == "detail" else f"unexpected msisdn {output}"
+        api_form = output[3:] if output else None   # SmartCareWorkflow._convert_to_api_format
+        return None if api_form == expected else f"msisdn {output!r} -> API {api_form!r} != {expected!r}"
+
+    def check_parse_query(item, output):
+        if item["kind"] != "smartcare":
+            return None
+        return None if output["success"] else f"parse_query failed: {output['errors']}"
+
+    def check_category(item, output):
+        expected = item["labels"].get("category")
+        return None if output["intent_category"] == expected else f"category {output['intent_category']!r} != {expected!r}"
+
+    def prepare_build_sql(item):
+        intent = builder.detect_intent(item["query"])
+        return intent, builder.extract_all_entities(item["query"])
+
+    return {
+        "detect_intent": {"fn": lambda item, _: builder.detect_intent(item["query"]), "check": check_intent},
+        "extract_all_entities": {"fn": lambda item, _: builder.extract_all_entities(item["query"]),
+                                 "check": check_entities},
+        "build_sql": {"fn": lambda item, prepared: builder.build_sql(*prepared), "prepare": prepare_build_sql,
+                      "check": lambda item, output: None if output else "no SQL generated"},
+        "parse_time_expression": {"fn": lambda item, _: components["time_parser"].parse_time_expression(item["query"]),
+                                  "check": check_time},
+        "extract_msisdn": {"fn": lambda item, _: components["msisdn"].extract_msisdn(item["query"]),
+                           "check": check_msisdn},
+        "parse_query": {"fn": lambda item, _: components["query_parser"].parse_query(item["query"]),
+                        "check": check_parse_query},
+        "classify_query": {"fn": lambda item, _: crew._classify_query(item["query"], "bench"),
+                           "check": check_category},
+        "fallback_classification": {"fn": lambda item, _: crew._fallback_classification(item["query"], "bench"),
+                                    "check": check_category},
+    }
+
+
+def run_case(name: str, case: Dict[str, Any], corpus: List[Dict[str, Any]], rounds: int) -> Dict[str, Any]:
+    fn: Callable = case["fn"]
+    prepare = case.get("prepare")
+    prepared = [prepare(item) if prepare else None for item in corpus]
+
+    # Correctness pass
+    failures = []
+    for item, arg in zip(corpus, prepared):
+        try:
+            problem = case["check"](item, fn(item, arg))
+        except Exception as e:
+            problem = f"raised {type(e).__name__}: {e}"
+        if problem:
+            failures.append({"query": item["query"], "problem": problem})
+
+    # Timed passes
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for item, arg in zip(corpus, prepared):
+            fn(item, arg)
+    elapsed = time.perf_counter() - start
+    calls = rounds * len(corpus)
+
+    # Allocation pass
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    for item, arg in zip(corpus, prepared):
+        fn(item, arg)
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated_blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+
+    return {
+        "function": name,
+        "ops_per_sec": calls / elapsed if elapsed else 0.0,
+        "us_per_call": elapsed / calls * 1e6,
+        "peak_kb_per_pass": peak / 1024,
+        "retained_blocks_per_call": allocated_blocks / len(corpus),
+        "checked": len(corpus),
+        "failures": failures,
+        "accuracy": 1 - len(failures) / len(corpus)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NLU hot-path microbenchmarks with labelled queries")
+    parser.add_argument("--queries", type=int, default=3000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--only", nargs="+", help="Run only these functions")
+    parser.add_argument("--show-failures", type=int, default=3, help="Print N failing queries per function")
+    parser.add_argument("--fail-under", type=float, help="Exit 1 if any function's accuracy is below this")
+    parser.add_argument("--verbose", action="store_true", help="Keep the functions' own print output")
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.queries, args.seed)
+    # The rule paths still print per call; route that to /dev/null unless asked
+    quiet = contextlib.redirect_stdout(io.StringIO() if args.verbose else open(os.devnull, "w"))
+    with quiet:
+        components = build_components()
+        cases = build_cases(components, corpus)
+        names = [name for name in cases if not args.only or name in args.only]
+        results = [run_case(name, cases[name], corpus, args.rounds) for name in names]
+
+    print(f"\n🧪 NLU microbench: {len(corpus)} labelled queries x {args.rounds} rounds")
+    print(f"   {'function':<24} {'ops/sec':>10} {'us/call':>9} {'peak KB':>9} {'blocks/call':>12} {'accuracy':>9}")
+    for result in results:
+        print(f"   {result['function']:<24} {result['ops_per_sec']:>10,.0f} {result['us_per_call']:>9.1f} "
+              f"{result['peak_kb_per_pass']:>9.1f} {result['retained_blocks_per_call']:>12.2f} {result['accuracy']:>8.1%}")
+    for result in results:
+        for failure in result["failures"][:args.show_failures]:
+            print(f"   ❌ {result['function']}: {failure['query']!r} -> {failure['problem']}")
+
+    if args.fail_under is not None and any(result["accuracy"] < args.fail_under for result in results):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+# benchmarks/replay_diff.py
+"""Per-query SQL / read_rows / elapsed report, and the diff between two reports.
+
+Record once against the real ClickHouse, then work offline:
+    CLICKHOUSE_MODE=record python -m benchmarks.replay_diff run --out baseline.json
+    # ... change SQL generation ...
+    CLICKHOUSE_MODE=replay python -m benchmarks.replay_diff run --out candidate.json
+    python -m benchmarks.replay_diff compare baseline.json candidate.json [--markdown]
+
+`run` builds and executes every data query of the corpus through
+SmartQueryBuilder (plan/result caches off) and stores SQL, row count, a
+digest of the result rows and read_rows / elapsed_ms. In replay mode a
+changed SQL string is a recording miss, so `compare` lists it as needing a
+record run; unchanged SQL replays the recorded timings. `compare` exits 1
+when a query returns different rows, unless --allow-result-changes.
+"""
+import sys
+import json
+import hashlib
+import argparse
+from typing import Any, Dict, List, Optional
+
+from config.api_config import FINGERPRINT_CACHE_CONFIG, CLICKHOUSE_REPLAY_CONFIG
+from benchmarks.fakes import FIXTURES_DIR
+
+DATA_WORKFLOWS = ("count", "summary", "list", "detail")
+
+
+def load_corpus(path: Optional[str]) -> List[str]:
+    """Queries from a JSON corpus ({"queries": [{"workflow", "query"}]}) or a text file (one per line)"""
+    path = path or f"{FIXTURES_DIR}/query_corpus.json"
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".json"):
+            items = json.load(f)["queries"]
+            return [item["query"] for item in items if item.get("workflow") in DATA_WORKFLOWS]
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def _digest(rows: List[Any]) -> str:
+    return hashlib.sha1(json.dumps(rows, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def run(corpus: List[str]) -> Dict[str, Any]:
+    from tools.direct_database_tool import DirectDatabaseTool
+    from tools.smart_query_builder import SmartQueryBuilder
+
+    # Every query must reach ClickHouse (or the recording)
+    FINGERPRINT_CACHE_CONFIG["result"]["enabled"] = False
+    builder = SmartQueryBuilder(use_direct_db=True, db_tool=DirectDatabaseTool())
+    builder.plan_cache_config = {"enabled": False}
+
+    queries = {}
+    for user_query in corpus:
+        result = builder.build_and_execute(user_query)
+        execution = result.get("execution_result", {})
+        queries[user_query] = {
+            "intent": result.get("intent"),
+            "sql": " ".join((result.get("sql_query") or "").split()),
+            "success": bool(execution.get("success")),
+            "error": execution.get("error") or result.get("error"),
+            "row_count": len(execution.get("data", [])),
+            "result_digest": _digest(execution.get("data", [])) if execution.get("success") else None,
+            **(execution.get("query_stats") or {})
+        }
+        status = "✅" if execution.get("success") else "❌"
+        print(f"{status} {user_query[:60]:<60} rows={queries[user_query]['row_count']} "
+              f"read_rows={queries[user_query].get('read_rows')} elapsed={queries[user_query].get('elapsed_ms')}ms")
+    return {"mode": CLICKHOUSE_REPLAY_CONFIG["mode"], "queries": queries}
+
+
+def _delta(before: Optional[float], after: Optional[float]) -> str:
+    if before is None or after is None:
+        return "-"
+    if not before:
+        return f"{after - before:+g}"
+    return f"{(after - before) / before:+.0%}"
+
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any]) -> Dict[str, Any]:
+    rows = []
+    for user_query, base in baseline["queries"].items():
+        cand = candidate["queries"].get(user_query)
+        if cand is None:
+            rows.append({"query": user_query, "status": "missing"})
+            continue
+        sql_changed = base["sql"] != cand["sql"]
+        if not cand["success"] and "No recorded result" in str(cand.get("error")):
+            status = "needs_record"
+        elif not (base["success"] and cand["success"]):
+            status = "failed" if base["success"] else "fixed" if cand["success"] else "both_failed"
+        elif base["result_digest"] != cand["result_digest"]:
+            status = "result_changed"
+        else:
+            status = "same_result"
+        rows.append({
+            "query": user_query,
+            "status": status,
+            "sql_changed": sql_changed,
+            "read_rows": (base.get("read_rows"), cand.get("read_rows")),
+            "elapsed_ms": (base.get("elapsed_ms"), cand.get("elapsed_ms")),
+            "row_count": (base.get("row_count"), cand.get("row_count"))
+        })
+
+    def total(key: str, index: int) -> Optional[float]:
+        values = [row[key][index] for row in rows if key in row and row[key][index] is not None]
+        return sum(values) if values else None
+
+    return {
+        "rows": rows,
+        "totals": {key: (total(key, 0), total(key, 1)) for key in ("read_rows", "elapsed_ms")},
+        "result_changes": sum(1 for row in rows if row["status"] in ("result_changed", "failed"))
+    }
+
+
+def print_comparison(diff: Dict[str, Any], markdown: bool):
+    header = ["query", "status", "SQL", "read_rows", "Δ read", "elapsed ms", "Δ time"]
+    lines = []
+    for row in diff["rows"]:
+        if "read_rows" not in row:
+            lines.append([row["query"][:50], row["status"], "", "", "", "", ""])
+            continue
+        (base_read, cand_read), (base_ms, cand_ms) = row["read_rows"], row["elapsed_ms"]
+        lines.append([row["query"][:50], row["status"], "changed" if row["sql_changed"] else "same",
+                      f"{base_read} → {cand_read}", _delta(base_read, cand_read),
+                      f"{base_ms} → {cand_ms}", _delta(base_ms, cand_ms)])
+    (base_read, cand_read), (base_ms, cand_ms) = diff["totals"]["read_rows"], diff["totals"]["elapsed_ms"]
+    lines.append(["TOTAL", f"{diff['result_changes']} result changes", "",
+                  f"{base_read} → {cand_read}", _delta(base_read, cand_read),
+                  f"{base_ms and round(base_ms, 1)} → {cand_ms and round(cand_ms, 1)}", _delta(base_ms, cand_ms)])
+
+    if markdown:
+        print("| " + " | ".join(header) + " |")
+        print("|" + "---|" * len(header))
+        for line in lines:
+            print("| " + " | ".join(str(cell) for cell in line) + " |")
+        return
+    widths = [max(len(str(cell)) for cell in column) for column in zip(header, *lines)]
+    for line in [header] + lines:
+        print("  ".join(str(cell).ljust(width) for cell, width in zip(line, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline SQL regression report from recorded ClickHouse results")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Execute the corpus (CLICKHOUSE_MODE decides live/record/replay)")
+    run_parser.add_argument("--corpus", help="JSON corpus or text file (default: fixtures/query_corpus.json)")
+    run_parser.add_argument("--out", required=True, help="Report JSON to write")
+
+    compare_parser = subparsers.add_parser("compare", help="Diff two run reports")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--markdown", action="store_true", help="Markdown table for a PR description")
+    compare_parser.add_argument("--allow-result-changes", action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        report = run(load_corpus(args.corpus))
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"📝 {len(report['queries'])} queries ({report['mode']} mode) -> {args.out}")
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, "r", encoding="utf-8") as f:
+        candidate = json.load(f)
+    diff = compare(baseline, candidate)
+    print_comparison(diff, args.markdown)
+    return 1 if diff["result_changes"] and not args.allow_result_changes else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
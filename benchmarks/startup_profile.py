@@ -0,0 +1,92 @@
+# benchmarks/startup_profile.py
+"""Import time and memory of `import main` per STARTUP_MODE.
+
+Usage (from repo root):
+    python -m benchmarks.startup_profile
+    python -m benchmarks.startup_profile --modes lazy eager --top 15
+
+Each mode runs in a fresh interpreter. Reports wall time of the import,
+RSS/PSS right after it, and the slowest modules from -X importtime.
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+from typing import Dict, Any, List
+
+_PROBE = """
+import json, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+from tools.process_memory import get_memory_usage
+print("STARTUP_PROFILE " + json.dumps({"import_seconds": elapsed, "memory": get_memory_usage(),
+                                       "components": main.registry.get_report()["components"]}))
+"""
+
+
+def parse_importtime(stderr: str, top: int) -> List[Dict[str, Any]]:
+    """Top modules by cumulative import time from -X importtime output"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        try:
+            self_part, cumulative_part, name = line.split("|")
+            modules.append({
+                "module": name.strip(),
+                "depth": len(name) - len(name.lstrip()),
+                "self_ms": int(self_part.split(":")[-1]) / 1000,
+                "cumulative_ms": int(cumulative_part) / 1000
+            })
+        except ValueError:
+            continue
+    # Only imports made directly by the probe give a readable picture
+    min_depth = min((m["depth"] for m in modules), default=0)
+    top_level = [m for m in modules if m["depth"] == min_depth]
+    return sorted(top_level, key=lambda m: -m["cumulative_ms"])[:top]
+
+
+def profile_mode(mode: str, top: int) -> Dict[str, Any]:
+    env = dict(os.environ, STARTUP_MODE=mode, SNAPSHOT_ENABLED="false", FLASK_DEBUG="false")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _PROBE],
+                          capture_output=True, text=True, env=env)
+    result = {"mode": mode, "returncode": proc.returncode}
+    for line in proc.stdout.splitlines():
+        if line.startswith("STARTUP_PROFILE "):
+            result.update(json.loads(line[len("STARTUP_PROFILE "):]))
+    if "import_seconds" not in result:
+        result["error"] = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "no output"
+    result["slowest_imports"] = parse_importtime(proc.stderr, top)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup time / memory per STARTUP_MODE")
+    parser.add_argument("--modes", nargs="+", default=["lazy", "eager"], choices=["lazy", "eager", "preload"])
+    parser.add_argument("--top", type=int, default=10, help="Show N slowest top-level imports")
+    parser.add_argument("--json", action="store_true", help="Print raw JSON")
+    args = parser.parse_args()
+
+    results = [profile_mode(mode, args.top) for mode in args.modes]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for result in results:
+        print(f"\n{'=' * 60}\n📦 STARTUP_MODE={result['mode']}")
+        if "error" in result:
+            print(f"   ❌ {result['error']}")
+            continue
+        memory = result["memory"]
+        print(f"   import main: {result['import_seconds']:.2f}s  RSS {memory.get('rss_mb')}MB  PSS {memory.get('pss_mb')}MB")
+        built = [name for name, info in result["components"].items() if info["ready"]]
+        print(f"   components built: {', '.join(built) or '-'}")
+        print("   slowest imports:")
+        for item in result["slowest_imports"]:
+            print(f"      {item['cumulative_ms']:>9.1f}ms  {item['module']}")
+
+
+if __name__ == "__main__":
+    main()
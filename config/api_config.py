@@ -1,11 +1,13 @@
 # config/api_config.py
+import os
 
 # Telkomsel API Configuration
 TELKOMSEL_API = {
     "app_key": "d23cd17c-b89e-4e88-ac46-3fe0b35e6314",
     "app_secret": "c6ce9adb3a026ee61aa05681359cb2c5",
-    "token_url": "https://10.77.128.111:38443/apigovernance/tokens/aksk",
-    "query_url": "https://10.77.128.112:28701/apiaccess/cccommon/v1/query/queryHistoryInfo",
+    # Overridable so load tests can point at a local mock (benchmarks/fakes.py)
+    "token_url": os.getenv("TELKOMSEL_TOKEN_URL", "https://10.77.128.111:38443/apigovernance/tokens/aksk"),
+    "query_url": os.getenv("TELKOMSEL_QUERY_URL", "https://10.77.128.112:28701/apiaccess/cccommon/v1/query/queryHistoryInfo"),
     "timeout": 30,
     "max_retries": 2,
     "token_expiry_hours": 1,
@@ -127,5 +129,191 @@ LOGGING_CONFIG = {
     "log_api_requests": True,
     "log_response_size": True,
     "log_execution_time": True,
-    "max_log_response_length": 500
-}
\ No newline at end of file
+    "max_log_response_length": 500,
+    # tools/logger.py: hot-path logging (SQL build, query execution, request flow)
+    "level": os.getenv("LOG_LEVEL", "INFO"),                       # DEBUG restores the old [DEBUG] output
+    "debug_sample_rate": float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0")),
+    "async_writer": os.getenv("LOG_ASYNC", "true").lower() == "true",
+    "format": os.getenv("LOG_FORMAT", "text"),                     # text | json
+    "queue_size": 10000                                             # Records beyond this are dropped, not blocked on
+}
+
+# ClickHouse query cost guard
+QUERY_GUARD_CONFIG = {
+    "enabled": True,
+    # Budget (estimated rows to read) before an unbounded query is narrowed
+    "max_estimated_rows": 20_000_000,
+    # Default window applied when a query has no time filter and is over budget
+    "default_window_days": 30,
+    "time_column": "create_time",
+    # Only aggregate intents are guarded; list (ORDER BY ... LIMIT) and detail lookups are top-N reads
+    "guarded_intents": ["count", "summary"],
+    # SAMPLE can only be used when the table has a SAMPLE BY key
+    "table_has_sampling_key": False,
+    "sample_ratio": 0.1,
+    # Per-intent ClickHouse settings, applied on every query for that intent
+    "intent_limits": {
+        "count": {"max_execution_time": 10, "max_rows_to_read": 200_000_000, "max_threads": 4},
+        "summary": {"max_execution_time": 15, "max_rows_to_read": 100_000_000, "max_threads": 4},
+        "list": {"max_execution_time": 10, "max_rows_to_read": 50_000_000, "max_threads": 2},
+        "detail": {"max_execution_time": 5, "max_rows_to_read": 10_000_000, "max_threads": 2},
+        "default": {"max_execution_time": 10, "max_rows_to_read": 50_000_000, "max_threads": 2}
+    }
+}
+
+# Approximate answers for large count/summary scopes: SAMPLE when the table has a sampling key,
+# uniqCombined/topK sketches otherwise. Auto mode uses the cost guard's EXPLAIN ESTIMATE.
+APPROXIMATE_QUERY_CONFIG = {
+    "enabled": True,
+    "intents": ["count", "summary"],
+    # Switch to approximate mode automatically above this EXPLAIN ESTIMATE row count
+    "auto_threshold_rows": 5_000_000,
+    # SAMPLE ratio (only used when QUERY_GUARD_CONFIG["table_has_sampling_key"])
+    "sample_ratio": 0.1,
+    # Without a sampling key: uniqCombined(precision)(order_id) counts, topK breakdowns.
+    # Error bound shown to the user = confidence_z * 1.04 / sqrt(2^precision) (±0.6% at 17)
+    "sketch_precision": 17,
+    "confidence_z": 1.96,
+    # User phrases that request an approximate answer explicitly
+    "keywords": ["perkiraan", "kira-kira", "kira kira", "estimasi", "kurang lebih", "approx"]
+}
+
+# Memoized query plans (intent, entities, SQL) in SmartQueryBuilder
+QUERY_PLAN_CACHE_CONFIG = {
+    "enabled": True,
+    "max_entries": 512,
+    "ttl_seconds": 6 * 3600,
+    # enhanced_context fields that change the built plan
+    "context_fields": ["complete_geo_entities", "inherit_location", "location",
+                       "inherit_time", "timeframe", "filters"]
+}
+
+# Fingerprint-keyed caches (key = tools/query_normalizer fingerprint)
+FINGERPRINT_CACHE_CONFIG = {
+    # ClickHouse results per plan; short TTL since tickets keep arriving
+    "result": {"enabled": True, "max_entries": 256, "ttl_seconds": 120},
+    # Ollama COMPLAINT/KNOWLEDGE/... classification per query
+    "llm_classification": {"enabled": True, "max_entries": 1024, "ttl_seconds": 3600},
+    # RAG answers per query + knowledge base version
+    "knowledge_answer": {"enabled": True, "max_entries": 256, "ttl_seconds": 3600},
+    # Rewritten keluhan per raw complaint text (single and batched rewrites share it)
+    "keluhan_rewrite": {"enabled": True, "max_entries": 2048, "ttl_seconds": 86400}
+}
+
+# Chat session store (main.py conversation state)
+SESSION_STORE_CONFIG = {
+    "ttl_seconds": 3600,              # Idle time before a session expires
+    "max_sessions": 5000,
+    "max_history": 20,                # Entries kept per session
+    "max_total_bytes": 64 * 1024 * 1024,
+    "compress_threshold_bytes": 4096, # Responses above this are zlib-compressed (chart HTML)
+    "sweep_interval_seconds": 30,     # Timer-wheel slot width / sweeper tick
+    # memory = per-process (single worker), sqlite = shared by all workers on the host
+    "backend": os.getenv("SESSION_BACKEND", "memory"),
+    "sqlite_path": os.getenv("SESSION_DB_PATH", "./data/sessions.db"),
+    "sqlite_busy_timeout_ms": 5000
+}
+
+# Warm-start snapshot of caches + sessions across restarts (opt-in)
+SNAPSHOT_CONFIG = {
+    "enabled": os.getenv("SNAPSHOT_ENABLED", "false").lower() == "true",
+    "path": os.getenv("SNAPSHOT_PATH", "./data/warm_snapshot.pkl.gz"),
+    "interval_seconds": int(os.getenv("SNAPSHOT_INTERVAL_SECONDS", "300")),
+    "max_age_seconds": 6 * 3600     # Older snapshots are ignored (cold start)
+}
+
+# Component construction at startup (see tools/component_registry.py)
+STARTUP_CONFIG = {
+    "mode": os.getenv("STARTUP_MODE", "eager"),   # eager | lazy | preload
+    "components": ["db_tool", "embedding_model", "chroma_client", "llm_gateway",
+                   "smartcare_api", "query_builder", "rag_tool", "simplified_crew"],
+    # Read-only after construction: built once in the gunicorn master, shared copy-on-write
+    "preload_components": ["embedding_model", "db_tool", "query_builder", "smartcare_api"],
+    # Hold sockets, sqlite handles or threads: rebuilt in every worker after fork
+    "fork_unsafe_components": ["chroma_client", "rag_tool", "llm_gateway", "simplified_crew"]
+}
+
+# Dependency health checks (tools/health_monitor.py)
+HEALTH_CONFIG = {
+    "refresh_interval_seconds": 15,
+    "stale_after_seconds": 60,          # /readyz fails if the monitor stops refreshing
+    "critical": ["clickhouse"],         # Must be up for /readyz; the rest only degrade features
+    "diagnostics_min_interval_seconds": 300   # Table count/schema at most every 5 minutes
+}
+
+# Per-request stage spans -> /metrics histograms + Server-Timing header (tools/tracing.py)
+TRACING_CONFIG = {
+    "enabled": os.getenv("TRACING_ENABLED", "true").lower() == "true",
+    "server_timing_header": True,
+    "buckets_seconds": [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0]
+}
+
+# ClickHouse record / replay (tools/query_recorder.py, benchmarks/replay_diff.py)
+CLICKHOUSE_REPLAY_CONFIG = {
+    "mode": os.getenv("CLICKHOUSE_MODE", "live"),            # live | record | replay
+    "path": os.getenv("CLICKHOUSE_RECORDING_PATH", "./data/clickhouse_recording.pkl.gz"),
+    "latency_scale": float(os.getenv("CLICKHOUSE_REPLAY_LATENCY_SCALE", "1.0")),   # 0 = no delay
+    "flush_every": 20                                        # Write the recording every N new queries (and at exit)
+}
+
+# On-demand request profiler (tools/request_profiler.py)
+# Send X-Profile: 1 + X-Admin-Token: $ADMIN_TOKEN on a chat request; disabled while ADMIN_TOKEN is empty
+PROFILER_CONFIG = {
+    "admin_token": os.getenv("ADMIN_TOKEN", ""),
+    "interval_ms": float(os.getenv("PROFILER_INTERVAL_MS", "5")),
+    "max_seconds": 120,                  # Sampler stops on its own after this
+    "max_depth": 128,
+    "directory": os.getenv("PROFILER_DIR", "./data/profiles"),
+    "keep": 50                           # Oldest profiles are deleted beyond this
+}
+
+# Per-component memory estimates + tracemalloc diffs (tools/memory_inspector.py, /admin/memory)
+MEMORY_INSPECTOR_CONFIG = {
+    "top_items": 5,                      # Largest entries per component / top growth lines
+    "max_objects_per_item": 100000,      # Stop walking one cache entry after this many objects
+    "tracemalloc_frames": 1              # Frames kept per allocation (more = slower, deeper tracebacks)
+}
+
+# Ollama model residency (tools/llm_gateway.py)
+OLLAMA_CONFIG = {
+    "keep_alive": os.getenv("OLLAMA_KEEP_ALIVE", "30m"),     # Sent on every call; "-1" = never unload
+    # Load the models and evaluate the static system prompts once per worker, in the background
+    "warm_up": os.getenv("OLLAMA_WARM_UP", "true").lower() == "true",
+    "warm_up_timeout_seconds": 300,
+    # Ollama >= 0.5 constrains output to a JSON schema; older servers only understand format="json"
+    "json_schema": os.getenv("OLLAMA_JSON_SCHEMA", "true").lower() == "true"
+}
+
+# Rule-based keluhan rewrite (tools/keluhan_normalizer.py) before the LLM rewrite in StoryAgentSummary
+KELUHAN_NORMALIZER_CONFIG = {
+    # false = every keluhan goes to the LLM (the normalized text is still what the LLM sees)
+    "fast_path": os.getenv("KELUHAN_FAST_PATH", "true").lower() == "true",
+    # Quality score (share of tokens that look like formal words) at which the LLM is skipped.
+    # 1.0 = only when nothing is left to fix; any ambiguous abbreviation ("ket", "call") or unknown
+    # short token goes to the LLM. Lower it with the fast-path report: python -m tools.keluhan_normalizer
+    "min_quality": float(os.getenv("KELUHAN_MIN_QUALITY", "1.0")),
+    # List views: true = one batched LLM rewrite per response; false = dictionary/cached rewrites only
+    "list_view_rewrite": os.getenv("KELUHAN_LIST_VIEW_REWRITE", "false").lower() == "true"
+}
+
+# Model per LLM call site (tools/llm_gateway.py). Empty = OLLAMA_MODEL.
+# Label/extraction calls only need a small quantized model, e.g. LLM_MODEL_SMALL=qwen2.5:1.5b-instruct-q4_K_M;
+# compare tiers with: python -m benchmarks.llm_tiers --models llama3 qwen2.5:1.5b-instruct-q4_K_M
+_LLM_MODEL_SMALL = os.getenv("LLM_MODEL_SMALL", "")
+LLM_MODEL_MAP = {
+    "classification": os.getenv("LLM_MODEL_CLASSIFICATION", _LLM_MODEL_SMALL),    # SimplifiedCrew._llm_classify
+    "followup": os.getenv("LLM_MODEL_FOLLOWUP", _LLM_MODEL_SMALL),                # _enhance_followup_with_llm
+    "date_extraction": os.getenv("LLM_MODEL_DATE_EXTRACTION", _LLM_MODEL_SMALL),  # TimeParser._extract_date_with_llm
+    "keluhan_rewrite": os.getenv("LLM_MODEL_KELUHAN_REWRITE", _LLM_MODEL_SMALL),  # StoryAgentSummary._improve_keluhan_with_llm
+    "rag_answer": os.getenv("LLM_MODEL_RAG_ANSWER", "")                           # RAGTool.generate_rag_answer
+}
+
+# Output caps per call site, merged into the Ollama options (structured calls stop after a few dozen tokens).
+# No stop sequences on schema-constrained (generate_json) tasks: valid JSON may contain blank-line
+# whitespace, and a stop there cuts the object short. The schema and num_predict bound the output.
+LLM_TASK_OPTIONS = {
+    "classification": {"num_predict": 32},
+    "followup": {"num_predict": 64},
+    "date_extraction": {"num_predict": 32},
+    "keluhan_rewrite": {"num_predict": 96}
+}
@@ -1,9 +1,14 @@
 # crews/simplified_crew.py
 import time
-import re
-import requests
+import copy
 from typing import Dict, Any
+from config.api_config import FINGERPRINT_CACHE_CONFIG
 from memory.session_manager import SessionManager
+from tools.llm_gateway import get_llm_gateway
+from tools.lru_cache import LRUCache
+from tools.direct_database_tool import append_guard_note
+from tools.tracing import span, rename_current_span
+from tools.query_normalizer import get_normalizer
 from workflows.detail_workflow import DetailWorkflow
 from workflows.summary_workflow import SummaryWorkflow
 from workflows.followup_workflow import FollowupWorkflow
@@ -25,6 +30,109 @@ class SimplifiedCrew:
         "system_inquiry": "System capability questions"
     }
     
+    # Static instructions go out as the Ollama system prompt (same prefix every call, KV cached);
+    # only the user query is in the prompt
+    CLASSIFIER_SYSTEM_PROMPT = """Anda adalah classifier untuk sistem analisis keluhan pelanggan telekomunikasi.
+
+KONTEKS SISTEM:
+- Database berisi keluhan pelanggan telekomunikasi (internet, wifi, jaringan, billing, sinyal)
+- Data tersimpan per lokasi geografis (provinsi, kota, kecamatan, daerah)
+- Sistem dapat melakukan: analisis statistik, summary/ringkasan, counting, pencarian contoh
+- Sistem dapat menjawab pertanyaan tentang data keluhan dan capabilities
+
+TUGAS: Klasifikasi query berdasarkan RELEVANSI dengan sistem keluhan telekomunikasi.
+
+LOGIKA KLASIFIKASI:
+
+SMARTCARE = Query yang butuh data real-time MSISDN dari API:
+- Mengandung nomor MSISDN (08xxx, 628xxx, 8xxx format)
+- Permintaan data usage/traffic individual ("cek 08111992172", "detil 628xxx")
+- Analisis historis per nomor ("riwayat 08111992172 hari ini")
+- Status real-time user ("kondisi 628xxx sekarang")
+- Visualisasi data individual ("grafik 08111992172 kemarin")
+
+COMPLAINT = Query yang BISA dijawab dengan data keluhan telco:
+- Mencari informasi/statistik keluhan berdasarkan lokasi atau waktu
+- Analisis data keluhan (summary, trend, pola, perbandingan)
+- Counting/jumlah keluhan di area tertentu
+- Contoh kasus keluhan dari daerah tertentu
+- Pertanyaan tentang jenis masalah telco (internet, sinyal, wifi)
+- Query geografis + konteks telco (Jakarta + internet/keluhan/berapa)
+
+KNOWLEDGE_QUERY = Query tentang troubleshooting, SOP, atau prosedur:
+- Pertanyaan cara mengatasi masalah teknis ("bagaimana troubleshoot internet lambat")
+- Request panduan atau prosedur ("apa sop handle keluhan prioritas tinggi")
+- Pertanyaan parameter teknis ("berapa nilai RSRP yang bagus")
+- Best practices atau rekomendasi
+
+SYSTEM_INQUIRY = Query tentang sistem/AI ini:
+- Pertanyaan tentang kemampuan sistem ("apa yang bisa kamu lakukan")
+- Status sistem ("apakah kamu sehat", "ada masalah dengan sistem")
+- Identitas sistem ("siapa kamu", "kamu AI apa")
+
+OFF_TOPIC = Query yang TIDAK BISA dijawab dengan data keluhan telco:
+- Orang/selebriti/politikus (siapa itu suharto, jokowi, biografi tokoh)
+- Makanan/restoran (nasi padang, cafe, resep masakan)
+- Hiburan (film, musik, game, olahraga)
+- Cuaca, belanja, topik umum yang tidak ada hubungan dengan telco
+- Pertanyaan personal umum tanpa konteks telekomunikasi
+
+JAWAB HANYA DENGAN JSON SATU BARIS, TANPA PENJELASAN:
+{"classification": "SMARTCARE|COMPLAINT|KNOWLEDGE_QUERY|SYSTEM_INQUIRY|OFF_TOPIC", "confidence": 0.1-1.0}
+
+CONTOH:
+- "detil 08111992172 2 jam lalu" → {"classification": "SMARTCARE", "confidence": 0.95}
+- "cek 628111992172 jam 10" → {"classification": "SMARTCARE", "confidence": 0.95}
+- "berapa keluhan di Jakarta?" → {"classification": "COMPLAINT", "confidence": 0.95}
+- "cara troubleshoot internet lambat" → {"classification": "KNOWLEDGE_QUERY", "confidence": 0.9}
+"""
+
+    CLASSIFIER_SCHEMA = {
+        "type": "object",
+        "properties": {
+            "classification": {"type": "string",
+                               "enum": ["SMARTCARE", "COMPLAINT", "KNOWLEDGE_QUERY", "SYSTEM_INQUIRY", "OFF_TOPIC"]},
+            "confidence": {"type": "number"}
+        },
+        "required": ["classification", "confidence"]
+    }
+
+    FOLLOWUP_SYSTEM_PROMPT = """Analyze follow-up query dengan context sebelumnya.
+
+ATURAN INTENT UNTUK FOLLOW-UP:
+- "berikan contohnya", "tampilkan contoh", "show examples" → intent: list
+- "berapa total", "jumlah berapa" → intent: count
+- "detail lebih", "informasi lengkap" → intent: detail
+- "ringkasan", "summary", "laporan" → intent: summary
+
+Tentukan:
+1. intent: summary/list/detail/count
+2. inherit_location: true/false (pakai lokasi query sebelumnya)
+3. inherit_time: true/false (pakai waktu query sebelumnya)
+4. filters: filter tambahan (status, dll), "" jika tidak ada
+
+JAWAB HANYA DENGAN JSON SATU BARIS, contoh:
+{"intent": "list", "inherit_location": true, "inherit_time": true, "filters": ""}
+"""
+
+    FOLLOWUP_SCHEMA = {
+        "type": "object",
+        "properties": {
+            "intent": {"type": "string", "enum": ["summary", "list", "detail", "count"]},
+            "inherit_location": {"type": "boolean"},
+            "inherit_time": {"type": "boolean"},
+            "filters": {"type": "string"}
+        },
+        "required": ["intent", "inherit_location", "inherit_time", "filters"]
+    }
+
+    # LLM classification per query fingerprint (classification ignores session state)
+    _classification_cache = LRUCache(
+        max_entries=FINGERPRINT_CACHE_CONFIG["llm_classification"].get("max_entries", 1024),
+        ttl_seconds=FINGERPRINT_CACHE_CONFIG["llm_classification"].get("ttl_seconds"),
+        name="LLMClassificationCache"
+    )
+    
     def __init__(self, shared_db_tool=None):
         """Initialize workflows with SHARED database tool"""
         print("🤖 Initializing SimplifiedCrew with shared DB...")
@@ -59,7 +167,9 @@ class SimplifiedCrew:
             print(f"[{session_id}] SimplifiedCrew processing: {user_query[:50]}...")
             
             # Step 1: Classification and follow-up detection
-            classification_result = self._classify_query(user_query, session_id)
+            # Span is relabelled inside when the LLM / follow-up enhancement path is taken
+            with span("classification_rule"):
+                classification_result = self._classify_query(user_query, session_id)
             
             # Step 2: Handle different classification results
             if classification_result.get("intent_category") == "system_prompt":
@@ -288,11 +398,13 @@ class SimplifiedCrew:
             
             if session_context["is_followup"]:
                 print(f"[{session_id}] 🔄 FOLLOW-UP DETECTED - BYPASSING LLM CLASSIFICATION")
+                rename_current_span("followup_enhancement")
                 enhanced_result = self._enhance_followup_with_llm(user_query, session_context, session_id)
                 return enhanced_result
             
             # Continue with LLM classification
             print(f"[{session_id}] No hard rules matched, proceeding with LLM classification")
+            rename_current_span("classification_llm")
             try:
                 return self._llm_classify(user_query, session_id)
             except Exception as llm_error:
@@ -308,91 +420,39 @@ class SimplifiedCrew:
 
     
     def _llm_classify(self, user_query: str, session_id: str) -> Dict[str, Any]:
+        """LLM classification, cached per query fingerprint"""
+        if not FINGERPRINT_CACHE_CONFIG["llm_classification"].get("enabled", True):
+            return self._llm_classify_uncached(user_query, session_id)
+        
+        cache_key = get_normalizer().fingerprint(user_query)
+        cached = self._classification_cache.get(cache_key)
+        if cached is not None:
+            print(f"[{session_id}] 💾 Classification cache HIT: {cached['intent_category']}")
+            return copy.deepcopy(cached)
+        
+        classification = self._llm_classify_uncached(user_query, session_id)
+        self._classification_cache.set(cache_key, copy.deepcopy(classification))
+        return classification
+    
+    @classmethod
+    def get_cache_stats(cls) -> Dict[str, Any]:
+        return cls._classification_cache.get_stats()
+    
+    def _llm_classify_uncached(self, user_query: str, session_id: str) -> Dict[str, Any]:
         """LLM classification using Ollama"""
-        classification_prompt = f"""
-Anda adalah classifier untuk sistem analisis keluhan pelanggan telekomunikasi.
-
-KONTEKS SISTEM:
-- Database berisi keluhan pelanggan telekomunikasi (internet, wifi, jaringan, billing, sinyal)
-- Data tersimpan per lokasi geografis (provinsi, kota, kecamatan, daerah)
-- Sistem dapat melakukan: analisis statistik, summary/ringkasan, counting, pencarian contoh
-- Sistem dapat menjawab pertanyaan tentang data keluhan dan capabilities
-
-QUERY USER: "{user_query}"
-
-TUGAS: Klasifikasi query berdasarkan RELEVANSI dengan sistem keluhan telekomunikasi.
-
-LOGIKA KLASIFIKASI:
-
-SMARTCARE = Query yang butuh data real-time MSISDN dari API:
-- Mengandung nomor MSISDN (08xxx, 628xxx, 8xxx format)
-- Permintaan data usage/traffic individual ("cek 08111992172", "detil 628xxx")
-- Analisis historis per nomor ("riwayat 08111992172 hari ini")
-- Status real-time user ("kondisi 628xxx sekarang")
-- Visualisasi data individual ("grafik 08111992172 kemarin")
-
-COMPLAINT = Query yang BISA dijawab dengan data keluhan telco:
-- Mencari informasi/statistik keluhan berdasarkan lokasi atau waktu
-- Analisis data keluhan (summary, trend, pola, perbandingan)
-- Counting/jumlah keluhan di area tertentu
-- Contoh kasus keluhan dari daerah tertentu
-- Pertanyaan tentang jenis masalah telco (internet, sinyal, wifi)
-- Query geografis + konteks telco (Jakarta + internet/keluhan/berapa)
-
-KNOWLEDGE_QUERY = Query tentang troubleshooting, SOP, atau prosedur:
-- Pertanyaan cara mengatasi masalah teknis ("bagaimana troubleshoot internet lambat")
-- Request panduan atau prosedur ("apa sop handle keluhan prioritas tinggi")
-- Pertanyaan parameter teknis ("berapa nilai RSRP yang bagus")
-- Best practices atau rekomendasi
-
-SYSTEM_INQUIRY = Query tentang sistem/AI ini:
-- Pertanyaan tentang kemampuan sistem ("apa yang bisa kamu lakukan")
-- Status sistem ("apakah kamu sehat", "ada masalah dengan sistem")
-- Identitas sistem ("siapa kamu", "kamu AI apa")
-
-OFF_TOPIC = Query yang TIDAK BISA dijawab dengan data keluhan telco:
-- Orang/selebriti/politikus (siapa itu suharto, jokowi, biografi tokoh)
-- Makanan/restoran (nasi padang, cafe, resep masakan)
-- Hiburan (film, musik, game, olahraga)
-- Cuaca, belanja, topik umum yang tidak ada hubungan dengan telco
-- Pertanyaan personal umum tanpa konteks telekomunikasi
-
-JAWAB DALAM FORMAT:
-CLASSIFICATION: [SMARTCARE/COMPLAINT/KNOWLEDGE_QUERY/SYSTEM_INQUIRY/OFF_TOPIC]
-CONFIDENCE: [0.1-1.0]
-REASONING: [jelaskan mengapa masuk kategori ini berdasarkan konteks]
-
-CONTOH:
-- "detil 08111992172 2 jam lalu" → CLASSIFICATION: SMARTCARE, CONFIDENCE: 0.95, REASONING: Mengandung MSISDN dengan request data historis individual
-- "cek 628111992172 jam 10" → CLASSIFICATION: SMARTCARE, CONFIDENCE: 0.95, REASONING: Request data real-time untuk nomor spesifik
-- "berapa keluhan di Jakarta?" → CLASSIFICATION: COMPLAINT, CONFIDENCE: 0.95, REASONING: Analisis geografis keluhan dari database
-- "cara troubleshoot internet lambat" → CLASSIFICATION: KNOWLEDGE_QUERY, CONFIDENCE: 0.9, REASONING: Request panduan teknis telco
-"""
+        classification_prompt = f'QUERY USER: "{user_query}"\n'
 
         try:
-            llm_response = requests.post("http://host.docker.internal:11434/api/generate", 
-                json={
-                    "model": "llama3",
-                    "prompt": classification_prompt,
-                    "stream": False,
-                    "options": {"temperature": 0.0}
-                })
-            
-            if llm_response.status_code != 200:
-                raise Exception(f"Ollama API error: {llm_response.status_code}")
-            
-            response_text = llm_response.json()["response"].strip()
-            print(f"[{session_id}] LLM Response: {response_text}")
-            
-            # Parse LLM response
-            classification_match = re.search(r'CLASSIFICATION:\s*(\w+)', response_text.upper())
-            classification = classification_match.group(1).strip() if classification_match else "OFF_TOPIC"
+            response = get_llm_gateway().generate_json(classification_prompt, self.CLASSIFIER_SCHEMA, temperature=0.0,
+                                                       task="classification", system=self.CLASSIFIER_SYSTEM_PROMPT)
+            print(f"[{session_id}] LLM Response: {response}")
 
-            confidence_match = re.search(r'CONFIDENCE:\s*([\d.]+)', response_text)
-            confidence = float(confidence_match.group(1)) if confidence_match else 0.7
-
-            reasoning_match = re.search(r'REASONING:\s*(.+?)(?=\n|$)', response_text, re.IGNORECASE | re.DOTALL)
-            reasoning = reasoning_match.group(1).strip() if reasoning_match else "LLM classification"
+            classification = str(response.get("classification", "OFF_TOPIC")).upper()
+            try:
+                confidence = min(max(float(response.get("confidence", 0.7)), 0.1), 1.0)
+            except (TypeError, ValueError):
+                confidence = 0.7
+            reasoning = classification.lower()   # Structured output carries no free-text reasoning
 
             print(f"[{session_id}] ✅ Parsed - Classification: {classification}, Confidence: {confidence}")
             
@@ -461,63 +521,32 @@ CONTOH:
             temp_entity = previous_entities["temporal"][0] if previous_entities["temporal"] else {}
             last_timeframe = temp_entity.get("value", "")
         
-        prompt = f"""
-Analyze follow-up query dengan context sebelumnya:
-
-CONTEXT SEBELUMNYA:
+        prompt = f"""CONTEXT SEBELUMNYA:
 - Query: "{previous_query}"
-- Lokasi: "{last_location}"  
+- Lokasi: "{last_location}"
 - Waktu: "{last_timeframe}"
 - Type: "{session_context.get('previous_query_type', '')}"
 
 FOLLOW-UP QUERY: "{user_query}"
-
-ATURAN INTENT UNTUK FOLLOW-UP:
-- "berikan contohnya", "tampilkan contoh", "show examples" → INTENT: list
-- "berapa total", "jumlah berapa" → INTENT: count  
-- "detail lebih", "informasi lengkap" → INTENT: detail
-- "ringkasan", "summary", "laporan" → INTENT: summary
-
-Tentukan:
-1. Intent: [summary/list/detail/count] 
-2. Inherit lokasi: [yes/no]
-3. Inherit waktu: [yes/no] 
-4. Filter tambahan: [status filter, dll]
-
-Format jawaban:
-INTENT: list
-INHERIT_LOCATION: yes
-INHERIT_TIME: yes
-LOCATION: {last_location if last_location else "N/A"}
-TIMEFRAME: {last_timeframe if last_timeframe else "N/A"}
-FILTERS: [additional conditions]
 """
 
         try:
-            llm_response = requests.post("http://host.docker.internal:11434/api/generate", 
-                json={
-                    "model": "llama3",
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {"temperature": 0.0}
-                })
+            response = get_llm_gateway().generate_json(prompt, self.FOLLOWUP_SCHEMA, temperature=0.0,
+                                                       system=self.FOLLOWUP_SYSTEM_PROMPT, task="followup")
+            enhanced_context = self._parse_followup_enhancement(response, last_location, last_timeframe)
+            enhanced_context["complete_geo_entities"] = complete_geo_entities
             
-            if llm_response.status_code == 200:
-                response_text = llm_response.json()["response"]
-                enhanced_context = self._parse_followup_enhancement(response_text, last_location, last_timeframe)
-                enhanced_context["complete_geo_entities"] = complete_geo_entities
-                
-                print(f"[{session_id}] 🤖 LLM Enhanced: {enhanced_context}")
-                
-                return {
-                    "is_ticket_related": True,
-                    "relevance_score": 0.9,
-                    "intent_category": "followup_enhanced",
-                    "confidence": 0.9,
-                    "reasoning": "Follow-up query enhanced with LLM",
-                    "enhanced_context": enhanced_context,
-                    "original_context": session_context
-                }
+            print(f"[{session_id}] 🤖 LLM Enhanced: {enhanced_context}")
+            
+            return {
+                "is_ticket_related": True,
+                "relevance_score": 0.9,
+                "intent_category": "followup_enhanced",
+                "confidence": 0.9,
+                "reasoning": "Follow-up query enhanced with LLM",
+                "enhanced_context": enhanced_context,
+                "original_context": session_context
+            }
         
         except Exception as e:
             print(f"[{session_id}] LLM Enhancement error: {str(e)}")
@@ -540,46 +569,25 @@ FILTERS: [additional conditions]
             "original_context": session_context
         }
     
-    def _parse_followup_enhancement(self, llm_response: str, actual_location: str = "", actual_timeframe: str = "") -> Dict[str, Any]:
-        """Parse LLM response for follow-up enhancement"""
-        enhancement = {
-            "intent": "list",
-            "inherit_location": False,
-            "inherit_time": False,
-            "location": "",
-            "timeframe": "",
-            "filters": "",
+    @staticmethod
+    def _as_flag(value: Any) -> bool:
+        """JSON boolean, or a "true"/"yes" string (bool("false") would be True)"""
+        return value is True or (isinstance(value, str) and value.strip().lower() in ("true", "yes"))
+    
+    def _parse_followup_enhancement(self, llm_response: Dict[str, Any], actual_location: str = "", actual_timeframe: str = "") -> Dict[str, Any]:
+        """Map the structured follow-up answer onto the enhanced context"""
+        intent = str(llm_response.get("intent", "list")).lower()
+        inherit_location = self._as_flag(llm_response.get("inherit_location"))
+        inherit_time = self._as_flag(llm_response.get("inherit_time"))
+        return {
+            "intent": intent if intent in ("summary", "list", "detail", "count") else "list",
+            "inherit_location": inherit_location,
+            "inherit_time": inherit_time,
+            "location": actual_location if inherit_location else "",
+            "timeframe": actual_timeframe if inherit_time else "",
+            "filters": str(llm_response.get("filters") or ""),
             "complete_geo_entities": []
         }
-        
-        try:
-            # Extract intent
-            intent_match = re.search(r'INTENT:\s*(\w+)', llm_response, re.IGNORECASE)
-            if intent_match:
-                enhancement["intent"] = intent_match.group(1).lower()
-            
-            # Extract inherit flags
-            inherit_loc_match = re.search(r'INHERIT_LOCATION:\s*(yes|no)', llm_response, re.IGNORECASE)
-            if inherit_loc_match:
-                enhancement["inherit_location"] = inherit_loc_match.group(1).lower() == "yes"
-                if enhancement["inherit_location"]:
-                    enhancement["location"] = actual_location
-            
-            inherit_time_match = re.search(r'INHERIT_TIME:\s*(yes|no)', llm_response, re.IGNORECASE)
-            if inherit_time_match:
-                enhancement["inherit_time"] = inherit_time_match.group(1).lower() == "yes"
-                if enhancement["inherit_time"]:
-                    enhancement["timeframe"] = actual_timeframe
-            
-            # Extract filters
-            filters_match = re.search(r'FILTERS:\s*([^\n]+)', llm_response, re.IGNORECASE)
-            if filters_match:
-                enhancement["filters"] = filters_match.group(1).strip()
-        
-        except Exception as e:
-            print(f"Parse enhancement error: {e}")
-        
-        return enhancement
     
     # def _fallback_classification(self, user_query: str, session_id: str) -> Dict[str, Any]:
     #     """Fallback classification if LLM fails"""
@@ -634,8 +642,7 @@ FILTERS: [additional conditions]
         query_lower = user_query.lower()
         
         # PRIORITY 1: Check for MSISDN (SmartCare)
-        from tools.query_parser import SmartCareQueryParser
-        parser = SmartCareQueryParser()
+        parser = self.smartcare_workflow.query_parser
         validation = parser.validate_query(user_query)
         
         if validation["is_smartcare_query"]:
@@ -824,19 +831,20 @@ FILTERS: [additional conditions]
         """Route to appropriate workflow"""
         user_query = crew_input.get("user_query", "")
         session_id = crew_input.get("session_id", "")
+        approximate = crew_input.get("approximate")
         
         if workflow_type == "detail":
             return self.detail_workflow.execute(user_query, None, session_id)
         elif workflow_type == "summary":
-            return self.summary_workflow.execute(user_query, None, session_id)
+            summary_context = {"approximate": approximate} if approximate is not None else None
+            return self.summary_workflow.execute(user_query, summary_context, session_id)
         elif workflow_type == "smartcare":  # NEW ROUTING
             return self.smartcare_workflow.execute(user_query, None, session_id)
         elif workflow_type == "count":
             # Direct count handling (existing code)
             try:
-                from tools.smart_query_builder import SmartQueryBuilder
-                query_builder = SmartQueryBuilder(use_direct_db=True)
-                result = query_builder.build_and_execute(user_query)
+                query_builder = self.summary_workflow.query_builder
+                result = query_builder.build_and_execute(user_query, approximate=approximate)
                 
                 if result.get("execution_result", {}).get("success"):
                     data = result["execution_result"]["data"]
@@ -852,7 +860,19 @@ FILTERS: [additional conditions]
                         if "month" in entities["temporal"][0].get("value", "").lower():
                             time_period = "bulan lalu" if "interval" in entities["temporal"][0].get("value", "") else "bulan ini"
                     
-                    narrative = f"🔢 Ditemukan **{count} keluhan** di {location} {time_period}."
+                    approximation = result.get("approximation")
+                    if approximation:
+                        from agents.story_agent import StoryAgentSummary
+                        bound = StoryAgentSummary().format_error_bound(approximation)
+                        narrative = f"🔢 Ditemukan **sekitar {count} keluhan** {bound} di {location} {time_period}."
+                        top_kota = data[0].get("top_kota") if data else None
+                        if top_kota:
+                            narrative += f"\n\n📍 Kota terbanyak: {', '.join(top_kota)}"
+                    else:
+                        narrative = f"🔢 Ditemukan **{count} keluhan** di {location} {time_period}."
+                    
+                    guard_info = result["execution_result"].get("guard")
+                    narrative = append_guard_note(narrative, result["execution_result"])
                     
                     return {
                         "response": narrative,
@@ -861,7 +881,9 @@ FILTERS: [additional conditions]
                             "sql_query": result.get("sql_query"),
                             "intent": result.get("intent"),
                             "entities": entities,
-                            "count": count
+                            "count": count,
+                            "guard": guard_info,
+                            "approximation": approximation
                         }
                     }
                 else:
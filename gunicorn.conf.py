@@ -0,0 +1,30 @@
+# gunicorn.conf.py
+# Prefork deployment: gunicorn -c gunicorn.conf.py main:app
+#
+# The master imports main.py once (preload_app) and builds the read-only
+# components - MiniLM embedding weights, semantic mapping / query builder,
+# SmartCare client - before forking, so workers share those pages
+# copy-on-write. Sockets, Chroma handles and background threads are created
+# per worker in post_fork (main.on_worker_start).
+import os
+
+os.environ.setdefault("STARTUP_MODE", "preload")
+# Workers are separate processes: share conversation state through SQLite
+os.environ.setdefault("SESSION_BACKEND", "sqlite")
+
+bind = f"{os.getenv('FLASK_HOST', '0.0.0.0')}:{os.getenv('FLASK_PORT', '8002')}"
+workers = int(os.getenv("GUNICORN_WORKERS", "2"))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "180"))   # Ollama calls can be slow
+preload_app = True
+
+
+def when_ready(server):
+    from tools.process_memory import get_memory_usage
+    server.log.info(f"Master ready, memory: {get_memory_usage()}")
+
+
+def post_fork(server, worker):
+    import main
+    main.on_worker_start()
@@ -1,60 +1,34 @@
 # knowledge/rag_tool.py
-import chromadb
-import os
 from typing import List, Dict, Any
-from sentence_transformers import SentenceTransformer
-import requests
+from tools.llm_gateway import get_llm_gateway
+from tools.tracing import traced
 
 class RAGTool:
-    """RAG tool for document knowledge retrieval with external ChromaDB"""
+    """RAG tool for document knowledge retrieval with ChromaDB"""
     
-    def __init__(self):
-        # Get ChromaDB connection details from environment
-        chromadb_host = os.getenv('CHROMADB_HOST', 'localhost')
-        chromadb_port = int(os.getenv('CHROMADB_PORT', '8000'))
-        
-        print(f"🔗 Connecting to ChromaDB at {chromadb_host}:{chromadb_port}")
-        
-        # Connect to external ChromaDB service
-        try:
-            self.chroma_client = chromadb.HttpClient(
-                host=chromadb_host,
-                port=chromadb_port
-            )
-            
-            # Test connection
-            self.chroma_client.heartbeat()
-            print(f"✅ Connected to ChromaDB at {chromadb_host}:{chromadb_port}")
-            
-        except Exception as e:
-            print(f"❌ Failed to connect to ChromaDB: {e}")
-            # Fallback to local ChromaDB for development
-            self.chroma_client = chromadb.PersistentClient(path="./chromadb_knowledge")
-            print("⚠️ Using local ChromaDB as fallback")
+    # Static answer instructions (Ollama system prompt); retrieved documents + question go in the prompt
+    ANSWER_SYSTEM_PROMPT = """Anda adalah AI assistant untuk customer service Telkomsel. Jawab pertanyaan berdasarkan dokumen knowledge base yang disediakan.
+
+INSTRUCTIONS:
+- Jawab SELALU dalam Bahasa Indonesia
+- Jawab berdasarkan informasi dari dokumen yang relevan
+- Jika tidak ada informasi yang cukup, katakan "Informasi tidak tersedia dalam knowledge base"
+- Berikan jawaban yang praktis dan mudah dipahami
+- Format dengan emoji dan struktur yang jelas
+- Sebutkan sumber dokumen jika membantu
+- Jangan gunakan bahasa Inggris kecuali untuk istilah teknis
+"""
+
+    def __init__(self, chroma_client=None, embedding_model=None):
+        """Use the shared Chroma client / embedding model from the component registry unless given"""
+        if chroma_client is None or embedding_model is None:
+            from tools.component_registry import get_component
+            chroma_client = chroma_client or get_component("chroma_client")
+            embedding_model = embedding_model or get_component("embedding_model")
         
+        self.chroma_client = chroma_client
         self.collection_name = "complaint_knowledge"
-        
-        # Initialize embedding model
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-        
-        # Get or create collection
-        try:
-            self.collection = self.chroma_client.get_collection(name=self.collection_name)
-            print(f"✅ Connected to existing knowledge collection: {self.collection.count()} documents")
-        except:
-            self.collection = self.chroma_client.create_collection(
-                name=self.collection_name,
-                metadata={"description": "Complaint handling knowledge base"}
-            )
-            print("🆕 Created new knowledge collection")
-    
-    def __init__(self):
-        # Initialize ChromaDB
-        self.chroma_client = chromadb.PersistentClient(path="./chromadb_knowledge")
-        self.collection_name = "complaint_knowledge"
-        
-        # Initialize embedding model
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.embedding_model = embedding_model
         
         # Get or create collection
         try:
@@ -89,6 +63,15 @@ class RAGTool:
         except Exception as e:
             print(f"❌ Error adding document: {str(e)}")
     
+    def knowledge_version(self) -> int:
+        """Version of the knowledge base, the same in every worker process
+
+        Documents are only ever added (a re-added id is ignored), so the
+        persisted document count changes exactly when the content does.
+        """
+        return self.collection.count()
+    
+    @traced("rag_retrieval")
     def search_knowledge(self, query: str, n_results: int = 3) -> List[Dict[str, Any]]:
         """Search for relevant knowledge"""
         try:
@@ -118,6 +101,7 @@ class RAGTool:
             print(f"❌ Error searching knowledge: {str(e)}")
             return []
     
+    @traced("rag_generation")
     def generate_rag_answer(self, user_query: str, relevant_docs: List[Dict]) -> str:
         """Generate answer using LLM with RAG context"""
         
@@ -133,46 +117,24 @@ class RAGTool:
         context = "\n---\n".join(context_parts)
         
         # Create prompt for LLM
-        prompt = f"""
-Anda adalah AI assistant untuk customer service Telkomsel. Jawab pertanyaan berdasarkan dokumen knowledge base yang disediakan.
-
-KNOWLEDGE BASE CONTEXT:
+        prompt = f"""KNOWLEDGE BASE CONTEXT:
 {context}
 
 PERTANYAAN USER: "{user_query}"
 
-INSTRUCTIONS:
-- Jawab SELALU dalam Bahasa Indonesia
-- Jawab berdasarkan informasi dari dokumen yang relevan
-- Jika tidak ada informasi yang cukup, katakan "Informasi tidak tersedia dalam knowledge base"
-- Berikan jawaban yang praktis dan mudah dipahami
-- Format dengan emoji dan struktur yang jelas
-- Sebutkan sumber dokumen jika membantu
-- Jangan gunakan bahasa Inggris kecuali untuk istilah teknis
-
 JAWABAN (BAHASA INDONESIA):
 """
 
         try:
             # Call Ollama LLM
-            response = requests.post("http://localhost:11434/api/generate", 
-                json={
-                    "model": "llama3",
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {"temperature": 0.3}
-                })
+            llm_response = get_llm_gateway().generate(prompt, temperature=0.3, system=self.ANSWER_SYSTEM_PROMPT,
+                                                       task="rag_answer").strip()
             
-            if response.status_code == 200:
-                llm_response = response.json()["response"].strip()
-                
-                # Add source information
-                sources = [doc['metadata'].get('title', 'Unknown') for doc in relevant_docs[:3]]
-                source_text = f"\n\n📚 **Sumber:** {', '.join(sources)}"
-                
-                return llm_response + source_text
-            else:
-                return "❌ Error generating response from LLM"
+            # Add source information
+            sources = [doc['metadata'].get('title', 'Unknown') for doc in relevant_docs[:3]]
+            source_text = f"\n\n📚 **Sumber:** {', '.join(sources)}"
+            
+            return llm_response + source_text
                 
         except Exception as e:
             print(f"❌ LLM generation error: {str(e)}")
@@ -1,11 +1,23 @@
 # main.py - Flask Entry Point with Direct Database Access
-from flask import Flask, request, jsonify, make_response
+from flask import Flask, request, jsonify, make_response, g
 from flask_cors import CORS
 from crews.simplified_crew import SimplifiedCrew
 from memory.session_manager import SessionManager
+from memory.session_store import get_session_store, InMemorySessionStore
+from memory.snapshot import SnapshotManager
 from tools.direct_database_tool import DirectDatabaseTool
 from knowledge.document_processor import DocumentProcessor
-from knowledge.rag_tool import RAGTool
+from tools.smart_query_builder import SmartQueryBuilder
+from tools.component_registry import registry
+from tools.process_memory import get_memory_usage, get_worker_memory
+from tools.memory_inspector import memory_inspector, estimate_entries, estimate_model
+from tools.health_monitor import HealthMonitor, RateLimitedDiagnostics
+from tools import tracing
+from tools.logger import get_logger, get_logging_stats
+from tools import request_profiler
+from config.api_config import STARTUP_CONFIG, HEALTH_CONFIG, TRACING_CONFIG
+from workflows.knowledge_workflow import KnowledgeWorkflow
+from agents.story_agent import StoryAgentSummary
 import time
 import json
 import hashlib
@@ -26,84 +38,181 @@ if os.getenv('CLICKHOUSE_HOST'):
     
     print(f"🔗 Using ClickHouse: {CLICKHOUSE_HOST}:{CLICKHOUSE_PORT}")
 
-# Configuration
-SESSION_CLEANUP_TIME = 3600  # 1 hour in seconds
-
-class DatabaseManager:
-    """Singleton Database Manager - 1 connection untuk semua"""
-    _instance = None
-    _db_tool = None
-    _initialized = False
-    
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(DatabaseManager, cls).__new__(cls)
-        return cls._instance
-    
-    def get_db_tool(self):
-        if not self._initialized:
-            try:
-                # FIX: Use same SSL parameters as manual test
-                import clickhouse_connect
-                client = clickhouse_connect.get_client(
-                    host=os.getenv('CLICKHOUSE_HOST', 'localhost'),
-                    port=int(os.getenv('CLICKHOUSE_PORT', 9443)),
-                    username=os.getenv('CLICKHOUSE_USER', 'default'),
-                    password=os.getenv('CLICKHOUSE_PASSWORD', ''),
-                    database=os.getenv('CLICKHOUSE_DB', 'default'),
-                    secure=os.getenv('CLICKHOUSE_SECURE', 'false').lower() == 'true',
-                    verify=os.getenv('CLICKHOUSE_VERIFY', 'false').lower() == 'true',
-                    ca_cert=None  # ← KEY FIX
-                )
-                
-                # Create DirectDatabaseTool with working client
-                from tools.direct_database_tool import DirectDatabaseTool
-                self._db_tool = DirectDatabaseTool()
-                self._db_tool.client = client  # Override with working client
-                
-                self._initialized = True
-                print("✅ SINGLETON: Shared database connection created")
-            except Exception as e:
-                print(f"❌ SINGLETON: Database connection failed: {e}")
-                self._db_tool = None
-        return self._db_tool
-
 # Initialize Flask app
 app = Flask(__name__)
+log = get_logger("api")
 CORS(app)
 
-simplified_crew = SimplifiedCrew()
+# Heavy components (ClickHouse pool, embedding model, Chroma, LLM gateway, SmartCare client)
+# are built once per process and shared by every workflow. STARTUP_MODE:
+#   eager   - build everything in parallel now (python main.py)
+#   lazy    - build on first use, heavy imports deferred too
+#   preload - gunicorn master builds fork-safe components, workers the rest (gunicorn.conf.py)
+STARTUP_MODE = STARTUP_CONFIG["mode"]
+if STARTUP_MODE == "eager":
+    startup_report = registry.warm_up(STARTUP_CONFIG["components"])
+elif STARTUP_MODE == "preload":
+    startup_report = registry.warm_up(STARTUP_CONFIG["preload_components"])
+else:
+    startup_report = registry.get_report()
+registry.print_report(startup_report)
+print(f"📦 Startup mode: {STARTUP_MODE}, memory: {get_memory_usage()}")
+
+def get_db_tool():
+    return registry.get_optional("db_tool")
 
-# Initialize components
-db_manager = DatabaseManager()
-db_tool = db_manager.get_db_tool()
+def get_rag_tool():
+    """Optional - same instance as KnowledgeWorkflow"""
+    return registry.get_optional("rag_tool")
 
-if db_tool:
-    print("✅ Singleton database tool initialized")
-else:
-    print("⚠️ Singleton database tool failed")
+def get_simplified_crew():
+    return registry.get_optional("simplified_crew")
 
 doc_processor = DocumentProcessor()
 
-# Initialize RAG tool (optional)
-try:
-    rag_tool = RAGTool()
-    print("✅ RAG tool initialized")
-except Exception as e:
-    print(f"⚠️  RAG tool initialization failed: {str(e)}")
-    rag_tool = None
-
-# Initialize SimplifiedCrew
-try:
-    # Pass shared database tool ke SimplifiedCrew
-    simplified_crew = SimplifiedCrew(shared_db_tool=db_tool)
-    print("✅ SimplifiedCrew initialized with shared DB connection")
-except Exception as e:
-    print(f"❌ SimplifiedCrew failed: {e}")
-    simplified_crew = None
-
-# Session storage - maps session_id to session data
-chat_sessions = {}
+# Session storage - SESSION_BACKEND=memory (single worker) or sqlite (shared by all workers)
+session_store = get_session_store(start_sweeper=STARTUP_MODE != "preload")
+# Same store as SimplifiedCrew's SessionManager - each interaction is recorded once
+session_manager = SessionManager(session_store)
+
+def _data_watermark():
+    """Latest ticket create_time - cached ClickHouse results are only reused while unchanged"""
+    db_tool = get_db_tool()
+    if not db_tool:
+        return None
+    table_name = registry.get("query_builder").table_name
+    with db_tool.pool.get_client() as client:
+        result = client.query(f"SELECT max(create_time) FROM {table_name}")
+        return str(result.result_rows[0][0]) if result.result_rows else None
+
+# Warm-start snapshot (SNAPSHOT_ENABLED=true): caches + sessions survive restarts
+snapshot_manager = SnapshotManager(watermark_fn=_data_watermark)
+snapshot_manager.register("query_plan", SmartQueryBuilder._plan_cache.export_entries,
+                          SmartQueryBuilder._plan_cache.load_entries)
+snapshot_manager.register("query_result", SmartQueryBuilder._result_cache.export_entries,
+                          SmartQueryBuilder._result_cache.load_entries, data_dependent=True)
+snapshot_manager.register("llm_classification", SimplifiedCrew._classification_cache.export_entries,
+                          SimplifiedCrew._classification_cache.load_entries)
+snapshot_manager.register("knowledge_answer", KnowledgeWorkflow.export_cache_entries,
+                          KnowledgeWorkflow.load_cache_entries)
+snapshot_manager.register("keluhan_rewrite", StoryAgentSummary._keluhan_cache.export_entries,
+                          StoryAgentSummary._keluhan_cache.load_entries)
+smartcare_api = registry.get_optional("smartcare_api")
+if smartcare_api is not None and hasattr(smartcare_api, "cache"):
+    snapshot_manager.register("smartcare_api", smartcare_api.cache.export_entries, smartcare_api.cache.load_entries)
+if isinstance(session_store, InMemorySessionStore):
+    # SQLite sessions are already on disk
+    snapshot_manager.register("sessions", session_store.export_sessions, session_store.load_sessions)
+if STARTUP_MODE != "preload":
+    snapshot_manager.start()
+
+# Per-component memory estimates for /admin/memory (same export hooks as the snapshot)
+def _session_memory():
+    stats = session_store.get_stats()
+    estimate = {"entries": stats["sessions"], "bytes": stats.get("total_bytes"), "backend": stats["backend"],
+                "used_by": ["main.py", "SessionManager", "SimplifiedCrew"]}
+    if isinstance(session_store, InMemorySessionStore):
+        estimate["largest"] = [{"key": session_id, "bytes": size}
+                               for session_id, size in session_store.largest_sessions()]
+    return estimate
+
+def _smartcare_cache_memory():
+    smartcare_api = registry.get_optional("smartcare_api") if registry.is_ready("smartcare_api") else None
+    if smartcare_api is None or not hasattr(smartcare_api, "cache"):
+        return None
+    return estimate_entries(smartcare_api.cache.export_entries())
+
+def _embedding_model_memory():
+    if not registry.is_ready("embedding_model"):
+        return None
+    return estimate_model(registry.get("embedding_model"))
+
+def _chroma_memory():
+    if not registry.is_ready("chroma_client"):
+        return None
+    collections = {}
+    for collection in registry.get("chroma_client").list_collections():
+        name = getattr(collection, "name", collection)
+        collections[name] = registry.get("chroma_client").get_collection(name).count()
+    # HNSW index + sqlite live outside the Python heap; the on-disk size is the best proxy
+    chroma_path = os.getenv("CHROMADB_PATH", "./chromadb_knowledge")
+    disk_bytes = sum(os.path.getsize(os.path.join(root, name))
+                     for root, _, names in os.walk(chroma_path) for name in names)
+    return {"entries": sum(collections.values()), "bytes": None, "collections": collections,
+            "disk_bytes": disk_bytes}
+
+memory_inspector.register("sessions", _session_memory)
+memory_inspector.register("query_plan", lambda: estimate_entries(SmartQueryBuilder._plan_cache.export_entries()))
+memory_inspector.register("query_result", lambda: estimate_entries(SmartQueryBuilder._result_cache.export_entries()))
+memory_inspector.register("llm_classification",
+                          lambda: estimate_entries(SimplifiedCrew._classification_cache.export_entries()))
+memory_inspector.register("knowledge_answer",
+                          lambda: estimate_entries(KnowledgeWorkflow._answer_cache.export_entries()))
+memory_inspector.register("keluhan_rewrite",
+                          lambda: estimate_entries(StoryAgentSummary._keluhan_cache.export_entries()))
+memory_inspector.register("smartcare_api_cache", _smartcare_cache_memory)
+memory_inspector.register("embedding_model", _embedding_model_memory)
+memory_inspector.register("chroma_client", _chroma_memory)
+
+# Dependency status refreshed in the background - probes never touch ClickHouse/Ollama themselves
+def _check_clickhouse():
+    db_tool = get_db_tool()
+    return db_tool.ping() if db_tool else {"ok": False, "error": "No shared DB connection"}
+
+def _check_ollama():
+    llm_gateway = registry.get_optional("llm_gateway")
+    return llm_gateway.ping() if llm_gateway else {"ok": False, "error": "LLM gateway not available"}
+
+def _check_chroma():
+    if not registry.is_ready("chroma_client"):
+        return {"ok": False, "status": "not_initialized"}
+    registry.get("chroma_client").heartbeat()
+    return {"ok": True}
+
+def _check_telkomsel_token():
+    smartcare_api = registry.get_optional("smartcare_api")
+    if smartcare_api is None:
+        return {"ok": False, "error": "SmartCare client not available"}
+    result = smartcare_api.test_connection()   # Token is reused until 5 minutes before expiry
+    return {"ok": result.get("success", False), "expires_at": result.get("expires_at"), "error": result.get("error")}
+
+def _check_session_store():
+    # SQLite stats are COUNT(*) + PRAGMA queries: refreshed here instead of on every /health probe
+    return {"ok": True, **session_store.get_stats()}
+
+health_monitor = HealthMonitor()
+health_monitor.register("clickhouse", _check_clickhouse)
+health_monitor.register("ollama", _check_ollama)
+health_monitor.register("chroma", _check_chroma)
+health_monitor.register("telkomsel_token", _check_telkomsel_token)
+health_monitor.register("session_store", _check_session_store, critical=False)
+if STARTUP_MODE != "preload":
+    health_monitor.start()
+
+def _database_diagnostics():
+    """Full connection test + table row count/schema (expensive: full-table count)"""
+    db_tool = get_db_tool()
+    if not db_tool:
+        return {"connection": {"success": False, "error": "No shared database connection available"}}
+    connection_result = db_tool.test_connection()
+    table_info = db_tool.get_table_info() if connection_result["success"] else {"success": False, "error": "Connection failed"}
+    return {"connection": connection_result, "table_info": table_info, "connection_type": "shared_singleton"}
+
+database_diagnostics = RateLimitedDiagnostics(_database_diagnostics, HEALTH_CONFIG["diagnostics_min_interval_seconds"])
+
+def on_worker_start():
+    """gunicorn post_fork hook: replace inherited sockets/threads, build per-worker components"""
+    from tools.direct_database_tool import DatabaseConnectionPool
+    if DatabaseConnectionPool._instance is not None:
+        DatabaseConnectionPool._instance.reset_connection()
+    registry.reset(STARTUP_CONFIG["fork_unsafe_components"])
+    session_store.start_sweeper()
+    snapshot_manager.start()
+    health_monitor.start()
+
+    report = registry.warm_up(STARTUP_CONFIG["components"])
+    registry.print_report(report)
+    print(f"👷 Worker {os.getpid()} ready, memory: {get_memory_usage()}")
 
 def generate_consistent_session_id(messages):
     """Generate session ID yang konsisten berdasarkan first user message"""
@@ -129,36 +238,69 @@ def generate_consistent_session_id(messages):
 
 def get_or_create_session(session_id, chat_id):
     """Get existing session or create new one"""
-    if session_id not in chat_sessions:
-        chat_sessions[session_id] = {
-            "chat_id": chat_id,
-            "created_at": time.time(),
-            "history": [], 
-            "context": {},
-            "message_count": 0
-        }
-        print(f"[SESSION] New session created: {session_id}")
-    else:
-        print(f"[SESSION] Existing session found: {session_id}")
-    
-    session = chat_sessions[session_id]
-    session["message_count"] += 1
-    session["last_activity"] = time.time()
-    
-    return session
-
-def store_conversation(session, user_query, response, intent, sql_query=None, entities=None):
-    """Store conversation entry in session history"""
-    conversation_entry = {
-        "message_id": session["message_count"],
-        "query": user_query,
-        "intent": intent,
-        "sql": sql_query or "handled_by_simplified_crew",
-        "response": response,
-        "timestamp": time.time(),
-        "entities": entities or []
-    }
-    session["history"].append(conversation_entry)
+    return session_store.touch(session_id, chat_id)
+
+def store_conversation(session, user_query, response, intent, entities=None):
+    """Store conversation entry for responses the crew does not record (off-topic/system)"""
+    session_manager.save_interaction(session["session_id"], user_query, response, intent, entities)
+
+# Stage spans for chat requests -> /metrics histograms + Server-Timing header
+TRACED_ENDPOINTS = {"openai_compatible"}
+
+@app.before_request
+def _start_request_trace():
+    if request.endpoint in TRACED_ENDPOINTS and request.method == 'POST':
+        tracing.start_trace()
+        if 'X-Profile' in request.headers and request_profiler.should_profile(request.headers):
+            g.profiler = request_profiler.start_request_profile()
+
+@app.after_request
+def _finish_request_trace(response):
+    trace = tracing.finish_trace() if request.endpoint in TRACED_ENDPOINTS else None
+    if trace is not None and TRACING_CONFIG["server_timing_header"]:
+        response.headers['Server-Timing'] = trace.server_timing()
+        response.headers['Access-Control-Expose-Headers'] = 'Server-Timing, X-Session-ID, X-Profile-Id'
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profile = request_profiler.finish_request_profile(profiler, trace)
+        response.headers['X-Profile-Id'] = profile["id"]
+    elif 'X-Profile' in request.headers and request.endpoint in TRACED_ENDPOINTS:
+        response.headers['X-Profile-Id'] = 'busy' if request_profiler.is_authorized(
+            request.headers.get('X-Admin-Token')) else 'unauthorized'
+    return response
+
+@app.teardown_request
+def _release_request_profiler(exc):
+    # after_request is skipped when the response itself fails
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        request_profiler.finish_request_profile(profiler)
+
+def _require_admin():
+    """403 response unless X-Admin-Token matches ADMIN_TOKEN"""
+    if not request_profiler.is_authorized(request.headers.get('X-Admin-Token')):
+        return jsonify({"error": "Admin token required"}), 403
+    return None
+
+@app.route('/admin/profiles', methods=['GET'])
+def list_profiles():
+    denied = _require_admin()
+    if denied:
+        return denied
+    return jsonify({"profiles": request_profiler.profile_store.list()})
+
+@app.route('/admin/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """Folded stacks: flamegraph.pl request.folded > request.svg, or drop into speedscope"""
+    denied = _require_admin()
+    if denied:
+        return denied
+    folded = request_profiler.profile_store.load(profile_id)
+    if folded is None:
+        return jsonify({"error": "Profile not found"}), 404
+    response = make_response(folded, 200)
+    response.headers['Content-Type'] = 'text/plain; charset=utf-8'
+    return response
 
 @app.route('/v1/chat/completions', methods=['POST', 'OPTIONS'])
 @app.route('/chat/completions', methods=['POST', 'OPTIONS'])
@@ -168,7 +310,7 @@ def openai_compatible():
         response = make_response('', 200)
         response.headers['Access-Control-Allow-Origin'] = '*'
         response.headers['Access-Control-Allow-Methods'] = 'POST, OPTIONS'
-        response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, X-Session-ID'
+        response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, X-Session-ID, X-Profile, X-Admin-Token'
         return response
         
     data = request.json or {}
@@ -200,6 +342,7 @@ def openai_compatible():
     
     try:
         # Check if SimplifiedCrew is available
+        simplified_crew = get_simplified_crew()
         if simplified_crew is None:
             return _error_response("SimplifiedCrew not initialized", is_streaming, 500)
         
@@ -208,50 +351,52 @@ def openai_compatible():
             "user_query": user_query,
             "session_id": session_id,
             "context": session.get("context", {}),
-            "chat_history": session.get("history", [])
+            # Optional: true/false forces approximate counts, absent = auto
+            "approximate": data.get('approximate')
         }
         
-        print(f"DEBUG: About to call execute_query with: {user_query}")
+        log.debug("About to call execute_query with: %s", user_query)
         crew_result = simplified_crew.execute_query(crew_input)
-        print(f"DEBUG: crew_result keys: {crew_result.keys()}")
-        print(f"DEBUG: crew_result status: {crew_result.get('status')}")
-        print(f"DEBUG: crew_result workflow: {crew_result.get('workflow')}")
+        log.debug("crew_result keys: %s", crew_result.keys())
+        log.debug("crew_result status: %s", crew_result.get('status'))
+        log.debug("crew_result workflow: %s", crew_result.get('workflow'))
         
         result = crew_result.get("response", "No response generated")
         status = crew_result.get("status", "unknown")
         workflow = crew_result.get("workflow", "unknown")
+        tracing.set_workflow(workflow)
         
-        print(f"DEBUG: Extracted result preview: {result[:100]}...")
-        print(f"DEBUG: Extracted status: {status}")
-        print(f"DEBUG: Extracted workflow: {workflow}")
+        log.debug("Extracted result preview: %.100s...", result)
+        log.debug("Extracted status: %s", status)
+        log.debug("Extracted workflow: %s", workflow)
         
         # Handle based on status
         if status in ["off_topic", "off_topic_fallback", "system_inquiry", "system_prompt"]:
-            print(f"DEBUG: Entering off_topic/system branch")
+            log.debug("Entering off_topic/system branch")
             store_conversation(session, user_query, result, status)
             return _format_response(result, session_id, is_streaming, crew_result)
         
         elif status == "error":
-            print(f"DEBUG: Entering error branch")
+            log.debug("Entering error branch")
             return _error_response(result, is_streaming, 500)
         
         else:
-            print(f"DEBUG: Entering else branch (success case)")
+            log.debug("Entering else branch (success case)")
             # Update session context if available
+            context_updates = {}
             if crew_result.get("debug", {}).get("raw_result", {}).get("metadata", {}).get("entities"):
                 entities = crew_result["debug"]["raw_result"]["metadata"]["entities"]
                 geo_entities = entities.get("geographic", [])
                 if geo_entities:
-                    session["context"]["last_location"] = geo_entities[0].get("value", "")
-            
-            session["context"]["last_query_type"] = workflow
-            session["context"]["last_query"] = user_query
+                    context_updates["last_location"] = geo_entities[0].get("value", "")
             
-            print(f"DEBUG: About to call store_conversation")
-            store_conversation(session, user_query, result, workflow)
+            context_updates["last_query_type"] = workflow
+            context_updates["last_query"] = user_query
+            session_store.update_context(session_id, context_updates)
+            # Interaction already recorded by SimplifiedCrew._save_session_interaction
             
-            print(f"DEBUG: About to call _format_response")
-            print(f"DEBUG: Final result being passed: {result[:100]}...")
+            log.debug("About to call _format_response")
+            log.debug("Final result being passed: %.100s...", result)
             
             return _format_response(result, session_id, is_streaming, crew_result)
             
@@ -261,10 +406,22 @@ def openai_compatible():
         traceback.print_exc()
         return _error_response(str(e), is_streaming)
 
+def _llm_usage():
+    """OpenAI usage block from the Ollama calls of this request, plus their timings"""
+    usage = tracing.current_llm_usage() or tracing.LLMUsage()
+    return {
+        **usage.as_openai_usage(),
+        "llm_calls": usage.calls,
+        "prompt_eval_ms": round(usage.prompt_eval_seconds * 1000, 1),
+        "eval_ms": round(usage.eval_seconds * 1000, 1),
+        "load_ms": round(usage.load_seconds * 1000, 1)
+    }
+
 def _format_response(result, session_id, is_streaming, debug_info=None):
     """Format response untuk streaming atau non-streaming"""
     try:
         if is_streaming:
+            usage = _llm_usage()   # The generator runs after the request has finished
             def generate():
                 chunk_response = {
                     "id": f"chatcmpl-{int(time.time())}",
@@ -284,7 +441,8 @@ def _format_response(result, session_id, is_streaming, debug_info=None):
                     "object": "chat.completion.chunk", 
                     "created": int(time.time()),
                     "model": "NSQM Support Assistant",
-                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                    "usage": usage
                 }
                 yield f"data: {json.dumps(finish_chunk)}\n\n"
                 yield "data: [DONE]\n\n"
@@ -312,11 +470,7 @@ def _format_response(result, session_id, is_streaming, debug_info=None):
                     "message": {"role": "assistant", "content": result},
                     "finish_reason": "stop"
                 }],
-                "usage": {
-                    "prompt_tokens": len(result.split()) if result else 0,
-                    "completion_tokens": len(result.split()) if result else 0,
-                    "total_tokens": len(result.split()) * 2 if result else 0
-                }
+                "usage": _llm_usage()
             }
             
             response = make_response(jsonify(response_data))
@@ -357,26 +511,63 @@ def _error_response(error_msg, is_streaming, status_code=500):
         response.headers['Access-Control-Allow-Origin'] = '*'
         return response
 
+@app.route('/livez', methods=['GET'])
+def livez():
+    """Liveness probe - process is serving requests, no dependency checks"""
+    return jsonify({"status": "alive", "uptime_seconds": round(time.time() - health_monitor.started_at, 1)})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness probe - cached status of critical dependencies (refreshed in background)"""
+    readiness = health_monitor.readiness()
+    return jsonify({"status": "ready" if readiness["ready"] else "not_ready", **readiness}), \
+        (200 if readiness["ready"] else 503)
+
 @app.route('/health', methods=['GET'])
 def health():
-    """Health check endpoint - GUNAKAN SHARED CONNECTION"""
-    # Test SHARED database connection - BUKAN buat connection baru
-    if db_tool:
-        db_status = db_tool.test_connection()
-    else:
-        db_status = {"success": False, "error": "No shared DB connection"}
+    """Health check endpoint - cached dependency status, no queries on the request path"""
+    dependencies = health_monitor.get_status()
+    db_status = dependencies.get("clickhouse", {"ok": False, "error": "Not checked yet"})
+    session_stats = dependencies.pop("session_store", {"error": "Not checked yet"})
     
     return jsonify({
-        "status": "healthy" if db_status["success"] else "unhealthy", 
+        "status": "healthy" if health_monitor.readiness()["ready"] else "unhealthy", 
         "service": "Telkomsel AI Labs - Shared Database Connection",
-        "database": db_status,
-        "active_sessions": len(chat_sessions),
-        "shared_connection": "✅ Using singleton DB manager" if db_tool else "❌ No shared connection",
+        "database": {"success": db_status.get("ok", False), **db_status},
+        "dependencies": dependencies,
+        "active_sessions": session_stats.get("sessions"),
+        "session_store": session_stats,
+        "logging": get_logging_stats(),
+        "shared_connection": "✅ Using component registry DB tool" if registry.is_ready("db_tool") else "❌ No shared connection",
+        "diagnostics": "/db/test (rate limited)",
         "endpoints": ["/v1/chat/completions", "/chat/completions"],
         "features": ["Shared PostgreSQL Connection", "SimplifiedCrew", "Follow-up Context"],
         "ollama_url": os.getenv("OLLAMA_BASE_URL", "http://host.docker.internal:11434")
     })
 
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Per-workflow request/stage latency histograms (Prometheus text format)"""
+    return app.response_class(tracing.metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/metrics/summary', methods=['GET'])
+def metrics_summary():
+    """Same histograms as /metrics, as count / mean / p50 / p99 per stage"""
+    return jsonify(tracing.metrics.get_summary())
+
+@app.route('/startup', methods=['GET'])
+def startup_info():
+    """Component construction timings (startup warm-up + lazy builds since)"""
+    report = registry.get_report()
+    report["warm_up_seconds"] = startup_report.get("warm_up_seconds")
+    report["startup_mode"] = STARTUP_MODE
+    report["memory"] = get_memory_usage()
+    if STARTUP_MODE == "preload":
+        report["worker_memory"] = get_worker_memory()
+    llm_gateway = registry.get_optional("llm_gateway")
+    report["llm_gateway"] = llm_gateway.get_stats() if llm_gateway else None
+    return jsonify(report)
+
 @app.route('/v1/models', methods=['GET'])
 def list_models():
     return jsonify({
@@ -393,30 +584,10 @@ def list_models():
 
 @app.route('/db/test', methods=['GET'])
 def test_database():
-    """Test SHARED database connection"""
+    """Database diagnostics (row count + schema) - runs at most every diagnostics_min_interval_seconds"""
     try:
-        if not db_tool:
-            return jsonify({
-                "error": "No shared database connection available"
-            }), 500
-        
-        # Test SHARED connection - BUKAN buat baru
-        connection_result = db_tool.test_connection()
-        
-        if connection_result["success"]:
-            table_info = db_tool.get_table_info()
-            return jsonify({
-                "connection": connection_result,
-                "table_info": table_info,
-                "connection_type": "shared_singleton"
-            })
-        else:
-            return jsonify({
-                "connection": connection_result,
-                "table_info": {"success": False, "error": "Connection failed"},
-                "connection_type": "shared_singleton"
-            }), 500
-            
+        result = database_diagnostics.get()
+        return jsonify(result), (200 if result["connection"].get("success") else 500)
     except Exception as e:
         return jsonify({
             "error": str(e),
@@ -427,33 +598,25 @@ def test_database():
 @app.route('/sessions', methods=['GET'])
 def list_sessions():
     """List all active chat sessions"""
-    sessions_info = {}
-    for session_id, session_data in chat_sessions.items():
-        sessions_info[session_id] = {
-            "chat_id": session_data.get("chat_id"),
-            "created_at": session_data.get("created_at"),
-            "message_count": session_data.get("message_count", 0),
-            "last_activity": session_data.get("last_activity"),
-            "has_context": bool(session_data.get("context", {}))
-        }
+    sessions_info = session_store.list_sessions()
     
     return jsonify({
-        "total_sessions": len(chat_sessions),
+        "total_sessions": len(sessions_info),
         "sessions": sessions_info
     })
 
 @app.route('/session/<session_id>', methods=['GET'])
 def get_session(session_id):
     """Get specific session details"""
-    if session_id in chat_sessions:
-        return jsonify(chat_sessions[session_id])
+    session_data = session_store.get(session_id)
+    if session_data:
+        return jsonify(session_data)
     return jsonify({"error": "Session not found"}), 404
 
 @app.route('/session/<session_id>', methods=['DELETE'])
 def clear_session(session_id):
     """Clear specific session"""
-    if session_id in chat_sessions:
-        del chat_sessions[session_id]
+    if session_store.delete(session_id):
         return jsonify({"success": True, "message": f"Session {session_id} cleared"})
     return jsonify({"success": False, "message": "Session not found"}), 404
 
@@ -461,6 +624,7 @@ def clear_session(session_id):
 def upload_knowledge():
     """Upload and process documents for knowledge base"""
     try:
+        rag_tool = get_rag_tool()
         if not rag_tool:
             return jsonify({"error": "RAG tool not available"}), 500
         
@@ -496,6 +660,7 @@ def upload_knowledge():
 def search_knowledge():
     """Search knowledge base"""
     try:
+        rag_tool = get_rag_tool()
         if not rag_tool:
             return jsonify({"error": "RAG tool not available"}), 500
         
@@ -520,6 +685,7 @@ def search_knowledge():
 def knowledge_stats():
     """Get knowledge base statistics"""
     try:
+        rag_tool = get_rag_tool()
         if not rag_tool:
             return jsonify({"error": "RAG tool not available"}), 500
         
@@ -529,23 +695,75 @@ def knowledge_stats():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/admin/memory', methods=['GET'])
+def admin_memory():
+    """Per-component memory estimates next to process RSS/PSS"""
+    denied = _require_admin()
+    if denied:
+        return denied
+    report = memory_inspector.get_report()
+    report["process"] = get_memory_usage()
+    return jsonify(report)
+
+@app.route('/admin/memory/snapshot', methods=['POST'])
+def admin_memory_snapshot():
+    """First call starts tracemalloc + baseline; later calls return growth since it (?reset=1 re-baselines)"""
+    denied = _require_admin()
+    if denied:
+        return denied
+    return jsonify(memory_inspector.snapshot(reset_baseline=request.args.get('reset') == '1'))
+
+@app.route('/admin/memory/snapshot', methods=['DELETE'])
+def admin_memory_stop():
+    """Stop tracemalloc (it slows every allocation while running)"""
+    denied = _require_admin()
+    if denied:
+        return denied
+    return jsonify(memory_inspector.stop_tracing())
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """Get hit rates of in-process caches"""
+    return jsonify({
+        "query_plan": SmartQueryBuilder.get_plan_cache_stats(),
+        "query_result": SmartQueryBuilder.get_result_cache_stats(),
+        "llm_classification": SimplifiedCrew.get_cache_stats(),
+        "knowledge_answer": KnowledgeWorkflow.get_cache_stats(),
+        "keluhan_rewrite": StoryAgentSummary.get_cache_stats(),
+        "snapshot": snapshot_manager.get_stats()
+    })
+
+@app.route('/snapshot/save', methods=['POST'])
+def snapshot_save():
+    """Write the warm-start snapshot now (e.g. right before a deploy)"""
+    denied = _require_admin()
+    if denied:
+        return denied
+    result = snapshot_manager.save()
+    return jsonify(result), (200 if result.get("success") else 400)
+
+@app.route('/cache/clear', methods=['POST'])
+def cache_clear():
+    """Drop cached query plans and results (semantic mapping edits are picked up automatically)"""
+    denied = _require_admin()
+    if denied:
+        return denied
+    SmartQueryBuilder.clear_plan_cache()
+    SmartQueryBuilder.clear_result_cache()
+    return jsonify({
+        "status": "cleared",
+        "query_plan": SmartQueryBuilder.get_plan_cache_stats(),
+        "query_result": SmartQueryBuilder.get_result_cache_stats()
+    })
+
 @app.route('/sessions/cleanup', methods=['POST'])
 def cleanup_old_sessions():
-    """Cleanup sessions older than configured time"""
-    current_time = time.time()
-    cutoff_time = current_time - SESSION_CLEANUP_TIME
-    
-    old_sessions = [
-        session_id for session_id, session_data in chat_sessions.items()
-        if session_data.get("last_activity", 0) < cutoff_time
-    ]
-    
-    for session_id in old_sessions:
-        del chat_sessions[session_id]
+    """Expire idle sessions now (the background sweeper does this every few seconds)"""
+    old_sessions = session_store.sweep()
     
     return jsonify({
         "cleaned_sessions": len(old_sessions),
-        "remaining_sessions": len(chat_sessions),
+        "remaining_sessions": len(session_store),
         "cleaned_session_ids": old_sessions
     })
 
@@ -554,9 +772,13 @@ if __name__ == "__main__":
     print("📊 Available endpoints:")
     print("   - POST /v1/chat/completions (OpenAI compatible)")
     print("   - POST /chat/completions (Direct DB specific)")
-    print("   - GET /health (health check)")
-    print("   - GET /db/test (database test)")
+    print("   - GET /livez, /readyz (liveness / readiness probes)")
+    print("   - GET /health (cached dependency status)")
+    print("   - GET /db/test (database diagnostics, rate limited)")
     print("   - GET /sessions (list sessions)")
+    print("   - GET /cache/stats (cache hit rates)")
+    print("   - GET /admin/memory, POST /admin/memory/snapshot (memory per component, tracemalloc diffs)")
+    print("   - GET /metrics (Prometheus stage latency histograms)")
     print("")
     print("🔧 Features:")
     print("   - Direct PostgreSQL access (bypassing MCP)")
@@ -1,66 +1,45 @@
 # memory/session_manager.py
-import json
 import time
-from typing import Dict, List, Any
-# import chromadb
-# from tools.chromadb_tool import ChromaDBTool
+from typing import Dict, List, Optional
+from memory.session_store import SessionBackend, get_session_store
 
 class SessionManager:
-    """Session management for conversation memory with ChromaDB"""
+    """Conversation state service used by both main.py and SimplifiedCrew
+
+    Thin view over the shared session store: one history per session id,
+    each interaction recorded once, expiry handled by the store.
+    """
+    
+    HISTORY_LIMIT = 10
     
-    def __init__(self):
-        # TEMPORARY DISABLE ChromaDB
-        self.chroma_tool = None
-        self.sessions = {}  # Use in-memory only
-        self.max_session_age = 3600
-        print("✅ SessionManager initialized (in-memory mode)")
+    def __init__(self, store: Optional[SessionBackend] = None):
+        self.store = store if store is not None else get_session_store()
+        print(f"✅ SessionManager initialized ({self.store.backend_name} backend)")
 
     def get_session(self, session_id: str) -> Dict:
-        """Get session data with cleanup"""
-        if self.chroma_tool:
-            # Use ChromaDB
-            try:
-                results = self.chroma_tool.search_documents(
-                    query=f"session_id:{session_id}",
-                    collection_name=self.collection_name,
-                    n_results=1
-                )
-                
-                if results and len(results.get('documents', [])) > 0:
-                    session_data = json.loads(results['documents'][0])
-                    # Check if expired
-                    if time.time() - session_data.get("last_activity", 0) > self.max_session_age:
-                        return self._create_new_session(session_id)
-                    return session_data
-                else:
-                    return self._create_new_session(session_id)
-            except Exception as e:
-                print(f"ChromaDB session error: {e}")
-                return self._create_new_session(session_id)
-        else:
-            # Fallback to in-memory
-            self._cleanup_expired_sessions()
-            
-            if session_id not in self.sessions:
-                self.sessions[session_id] = self._create_new_session(session_id)
-            
-            return self.sessions[session_id]
+        """Get session data (O(1) lookup by id, expired sessions start over)"""
+        session = self.store.get(session_id, include_history=False)
+        if session is None:
+            session = self.store.touch(session_id)
+        return self._to_session(session_id, session, self.store.get_history(session_id, limit=self.HISTORY_LIMIT))
     
-    def _create_new_session(self, session_id: str) -> Dict:
-        """Create new session data"""
+    def _to_session(self, session_id: str, stored: Dict, history: List[Dict]) -> Dict:
+        """Session data in the shape used by the crew"""
+        last_interaction = history[-1] if history else {}
         return {
             "session_id": session_id,
-            "created_at": time.time(),
-            "last_activity": time.time(),
-            "conversation_history": [],
-            "context": {},
-            "last_query_type": None,
-            "last_response": None
+            "created_at": stored.get("created_at", time.time()),
+            "last_activity": stored.get("last_activity", time.time()),
+            "conversation_history": history,
+            "context": stored.get("context", {}),
+            "last_query_type": last_interaction.get("query_type"),
+            "last_response": last_interaction.get("response")
         }
     
     def save_interaction(self, session_id: str, query: str, response: str, query_type: str, entities=None):
-        """Save query-response pair to session"""
-        session = self.get_session(session_id)
+        """Save query-response pair to session (atomic append)"""
+        if self.store.get(session_id, include_history=False) is None:
+            self.store.touch(session_id)
         
         interaction = {
             "timestamp": time.time(),
@@ -69,31 +48,7 @@ class SessionManager:
             "query_type": query_type,
             "entities": entities or {}  # Store entities for context
         }
-        
-        session["conversation_history"].append(interaction)
-        session["last_activity"] = time.time()
-        session["last_query_type"] = query_type
-        session["last_response"] = response
-        
-        # Keep only last 10 interactions
-        if len(session["conversation_history"]) > 10:
-            session["conversation_history"] = session["conversation_history"][-10:]
-        
-        # Save to storage
-        if self.chroma_tool:
-            # Save to ChromaDB
-            try:
-                self.chroma_tool.add_documents(
-                    documents=[json.dumps(session)],
-                    metadatas=[{"session_id": session_id, "last_activity": session["last_activity"]}],
-                    ids=[f"session_{session_id}"],
-                    collection_name=self.collection_name
-                )
-            except Exception as e:
-                print(f"ChromaDB save error: {e}")
-        else:
-            # Save to in-memory
-            self.sessions[session_id] = session
+        self.store.append_history(session_id, interaction)
     
     def get_context_for_followup(self, session_id: str, current_query: str) -> Dict:
         """Get relevant context for follow-up queries"""
@@ -151,23 +106,6 @@ class SessionManager:
         
         return {}
     
-    def _cleanup_expired_sessions(self):
-        """Remove expired sessions"""
-        if self.chroma_tool:
-            # ChromaDB cleanup would be more complex, skip for now
-            # Can implement periodic cleanup job if needed
-            pass
-        else:
-            # In-memory cleanup
-            current_time = time.time()
-            expired_sessions = [
-                sid for sid, data in self.sessions.items()
-                if current_time - data["last_activity"] > self.max_session_age
-            ]
-            
-            for sid in expired_sessions:
-                del self.sessions[sid]
-    
     def is_followup_query(self, query: str) -> bool:
         """Simple check if query looks like follow-up"""
         followup_indicators = [
@@ -0,0 +1,703 @@
+# memory/session_store.py
+import os
+import copy
+import json
+import time
+import heapq
+import zlib
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+from config.api_config import SESSION_STORE_CONFIG
+
+
+class TimerWheel:
+    """Hashed timer wheel: O(1) schedule/cancel, expiry processed one slot at a time"""
+
+    def __init__(self, slot_seconds: float):
+        self.slot_seconds = slot_seconds
+        self.slots = {}      # slot index -> set of keys
+        self.key_slot = {}   # key -> slot index
+
+    def _slot_for(self, timestamp: float) -> int:
+        return int(timestamp // self.slot_seconds)
+
+    def schedule(self, key: str, expires_at: float):
+        """(Re)schedule key; rounds up to the next slot so nothing expires early"""
+        self.cancel(key)
+        slot = max(self._slot_for(expires_at) + 1, self._slot_for(time.time()) + 1)
+        self.slots.setdefault(slot, set()).add(key)
+        self.key_slot[key] = slot
+
+    def cancel(self, key: str):
+        slot = self.key_slot.pop(key, None)
+        if slot is None:
+            return
+        keys = self.slots.get(slot)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.slots[slot]
+
+    def advance(self, now: float) -> List[str]:
+        """Pop keys of every slot that is due"""
+        current = self._slot_for(now)
+        due = [slot for slot in self.slots if slot <= current]
+        expired = []
+        for slot in due:
+            for key in self.slots.pop(slot):
+                self.key_slot.pop(key, None)
+                expired.append(key)
+        return expired
+
+
+class SessionBackend(ABC):
+    """Session store interface: O(1) get/put by session id, atomic history appends, expiry
+
+    Session dicts carry session_id, chat_id, created_at, last_activity,
+    message_count and context; history is read separately via get_history.
+    """
+
+    backend_name = "base"
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or SESSION_STORE_CONFIG
+        self.ttl_seconds = config.get("ttl_seconds", 3600)
+        self.max_sessions = config.get("max_sessions", 5000)
+        self.max_history = config.get("max_history", 20)
+        self.max_total_bytes = config.get("max_total_bytes", 64 * 1024 * 1024)
+        self.compress_threshold = config.get("compress_threshold_bytes", 4096)
+        self.sweep_interval = config.get("sweep_interval_seconds", 30)
+
+        self.counters = {
+            "expired": 0,
+            "evicted_lru": 0,
+            "history_trimmed": 0,
+            "compressed_responses": 0,
+            "compressed_bytes_saved": 0
+        }
+
+        self._stop_event = threading.Event()
+        self._sweeper = None
+
+    @abstractmethod
+    def touch(self, session_id: str, chat_id: Optional[str] = None) -> Dict[str, Any]:
+        """Get or create session for an incoming message (counts the message)"""
+
+    @abstractmethod
+    def get(self, session_id: str, include_history: bool = True) -> Optional[Dict[str, Any]]:
+        """Session copy with decompressed history (None if missing/expired)"""
+
+    @abstractmethod
+    def get_context(self, session_id: str) -> Dict[str, Any]:
+        pass
+
+    @abstractmethod
+    def update_context(self, session_id: str, updates: Dict[str, Any]):
+        pass
+
+    @abstractmethod
+    def append_history(self, session_id: str, entry: Dict[str, Any]):
+        """Append conversation entry atomically, trimming history to max_history"""
+
+    @abstractmethod
+    def get_history(self, session_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    def delete(self, session_id: str) -> bool:
+        pass
+
+    @abstractmethod
+    def list_sessions(self) -> Dict[str, Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    def sweep(self, now: Optional[float] = None) -> List[str]:
+        """Expire idle sessions, returns expired ids"""
+
+    @abstractmethod
+    def get_stats(self) -> Dict[str, Any]:
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    def start_sweeper(self):
+        self._sweeper = threading.Thread(target=self._sweep_loop, name="session-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def _sweep_loop(self):
+        while not self._stop_event.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"❌ Session sweep error: {e}")
+
+    def close(self):
+        self._stop_event.set()
+
+    def _encode_entry(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Compress large responses (chart HTML) before storing"""
+        stored = dict(entry)
+        response = stored.get("response")
+        if isinstance(response, str):
+            raw = response.encode("utf-8")
+            if len(raw) > self.compress_threshold:
+                compressed = zlib.compress(raw, 6)
+                stored["response"] = None
+                stored["response_z"] = compressed
+                stored["response_bytes"] = len(raw)
+                self.counters["compressed_responses"] += 1
+                self.counters["compressed_bytes_saved"] += len(raw) - len(compressed)
+        return stored
+
+    def _decode_entry(self, stored: Dict[str, Any]) -> Dict[str, Any]:
+        entry = {key: value for key, value in stored.items() if key not in ("response_z", "response_bytes")}
+        if stored.get("response_z") is not None:
+            entry["response"] = zlib.decompress(stored["response_z"]).decode("utf-8")
+        return entry
+
+
+class InMemorySessionStore(SessionBackend):
+    """Bounded in-process chat session store (single worker)
+
+    - per-session history cap (oldest entries dropped)
+    - total byte budget + max session count, least recently used sessions evicted
+    - idle expiry via timer wheel swept by a background thread (no full scans)
+    - large responses (chart HTML) kept zlib-compressed
+    """
+
+    backend_name = "memory"
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, start_sweeper: bool = True):
+        super().__init__(config)
+
+        self._sessions = OrderedDict()   # session_id -> session (LRU order)
+        self._sizes = {}                 # session_id -> estimated bytes
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+        self._wheel = TimerWheel(self.sweep_interval)
+
+        if start_sweeper:
+            self.start_sweeper()
+
+        print(f"✅ InMemorySessionStore initialized (TTL: {self.ttl_seconds}s, history: {self.max_history}, "
+              f"budget: {self.max_total_bytes // (1024 * 1024)}MB)")
+
+    def touch(self, session_id: str, chat_id: Optional[str] = None) -> Dict[str, Any]:
+        """Get or create session for an incoming message (counts the message)"""
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = {
+                    "session_id": session_id,
+                    "chat_id": chat_id,
+                    "created_at": now,
+                    "last_activity": now,
+                    "history": [],
+                    "context": {},
+                    "message_count": 0
+                }
+                self._sessions[session_id] = session
+                self._set_size(session_id, self._base_size(session))
+                print(f"[SESSION] New session created: {session_id}")
+            else:
+                self._sessions.move_to_end(session_id)
+                print(f"[SESSION] Existing session found: {session_id}")
+
+            session["message_count"] += 1
+            session["last_activity"] = now
+            self._wheel.schedule(session_id, now + self.ttl_seconds)
+            self._enforce_limits(protect=session_id)
+
+            return self._summary(session)
+
+    def get(self, session_id: str, include_history: bool = True) -> Optional[Dict[str, Any]]:
+        """Session copy with decompressed history (None if missing/expired)"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            result = self._summary(session)
+            if include_history:
+                result["history"] = [self._decode_entry(entry) for entry in session["history"]]
+            return result
+
+    def get_context(self, session_id: str) -> Dict[str, Any]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return dict(session["context"]) if session else {}
+
+    def update_context(self, session_id: str, updates: Dict[str, Any]):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return
+            session["context"].update(updates)
+            self._set_size(session_id, self._base_size(session) +
+                           sum(self._entry_size(entry) for entry in session["history"]))
+
+    def append_history(self, session_id: str, entry: Dict[str, Any]):
+        """Append conversation entry, compressing large responses and trimming history"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return
+
+            stored = self._encode_entry(entry)
+            session["history"].append(stored)
+            size = self._sizes.get(session_id, 0) + self._entry_size(stored)
+
+            while len(session["history"]) > self.max_history:
+                dropped = session["history"].pop(0)
+                size -= self._entry_size(dropped)
+                self.counters["history_trimmed"] += 1
+
+            self._set_size(session_id, size)
+            self._enforce_limits(protect=session_id)
+
+    def get_history(self, session_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return []
+            entries = session["history"][-limit:] if limit else session["history"]
+            return [self._decode_entry(entry) for entry in entries]
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._remove(session_id)
+
+    def list_sessions(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                session_id: {
+                    "chat_id": session.get("chat_id"),
+                    "created_at": session.get("created_at"),
+                    "message_count": session.get("message_count", 0),
+                    "last_activity": session.get("last_activity"),
+                    "has_context": bool(session.get("context", {})),
+                    "history_entries": len(session["history"]),
+                    "bytes": self._sizes.get(session_id, 0)
+                }
+                for session_id, session in self._sessions.items()
+            }
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def largest_sessions(self, limit: int = 5) -> List[Tuple[str, int]]:
+        """(session_id, estimated bytes) of the biggest sessions, for /admin/memory"""
+        with self._lock:
+            return heapq.nlargest(limit, self._sizes.items(), key=lambda item: item[1])
+
+    def export_sessions(self) -> List[Dict[str, Any]]:
+        """Live sessions with stored (still compressed) history, for warm-start snapshots"""
+        now = time.time()
+        with self._lock:
+            return [
+                copy.deepcopy(session) for session in self._sessions.values()
+                if now - session["last_activity"] < self.ttl_seconds
+            ]
+
+    def load_sessions(self, sessions: List[Dict[str, Any]]) -> int:
+        """Restore exported sessions that have not expired; live sessions win"""
+        now = time.time()
+        loaded = 0
+        with self._lock:
+            for session in sorted(sessions, key=lambda item: item["last_activity"]):
+                session_id = session["session_id"]
+                if session_id in self._sessions or now - session["last_activity"] >= self.ttl_seconds:
+                    continue
+                self._sessions[session_id] = session
+                self._sessions.move_to_end(session_id, last=False)
+                self._set_size(session_id, self._base_size(session) +
+                               sum(self._entry_size(entry) for entry in session["history"]))
+                self._wheel.schedule(session_id, session["last_activity"] + self.ttl_seconds)
+                loaded += 1
+            self._enforce_limits()
+        return loaded
+
+    def sweep(self, now: Optional[float] = None) -> List[str]:
+        """Expire sessions whose timer-wheel slot is due"""
+        now = now or time.time()
+        expired = []
+        with self._lock:
+            for session_id in self._wheel.advance(now):
+                session = self._sessions.get(session_id)
+                if session is None:
+                    continue
+                if now - session["last_activity"] >= self.ttl_seconds:
+                    self._remove(session_id)
+                    expired.append(session_id)
+                else:
+                    self._wheel.schedule(session_id, session["last_activity"] + self.ttl_seconds)
+            self.counters["expired"] += len(expired)
+
+        if expired:
+            print(f"🧹 SessionStore expired {len(expired)} sessions")
+        return expired
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Memory usage and eviction counters (reported in /health)"""
+        with self._lock:
+            return {
+                "backend": self.backend_name,
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "total_bytes": self._total_bytes,
+                "max_total_bytes": self.max_total_bytes,
+                "budget_utilization": round(self._total_bytes / self.max_total_bytes * 100, 2) if self.max_total_bytes else 0,
+                "history_entries": sum(len(session["history"]) for session in self._sessions.values()),
+                "scheduled_expiries": len(self._wheel.key_slot),
+                **self.counters
+            }
+
+    def _summary(self, session: Dict[str, Any]) -> Dict[str, Any]:
+        summary = {key: value for key, value in session.items() if key != "history"}
+        summary["context"] = copy.deepcopy(session["context"])
+        return summary
+
+    def _entry_size(self, stored: Dict[str, Any]) -> int:
+        size = 200  # dict overhead + scalar fields
+        size += len(stored.get("query") or "")
+        size += len(stored.get("response") or "")
+        size += len(stored.get("response_z") or b"")
+        size += len(json.dumps(stored.get("entities") or {}, default=str))
+        return size
+
+    def _base_size(self, session: Dict[str, Any]) -> int:
+        return 512 + len(json.dumps(session.get("context") or {}, default=str))
+
+    def _set_size(self, session_id: str, size: int):
+        self._total_bytes += size - self._sizes.get(session_id, 0)
+        self._sizes[session_id] = size
+
+    def _remove(self, session_id: str) -> bool:
+        if self._sessions.pop(session_id, None) is None:
+            return False
+        self._total_bytes -= self._sizes.pop(session_id, 0)
+        self._wheel.cancel(session_id)
+        return True
+
+    def _enforce_limits(self, protect: Optional[str] = None):
+        """Evict least recently used sessions over count/byte budget"""
+        while (len(self._sessions) > self.max_sessions or self._total_bytes > self.max_total_bytes) and len(self._sessions) > 1:
+            oldest_id = next(iter(self._sessions))
+            if oldest_id == protect:
+                self._sessions.move_to_end(oldest_id)
+                oldest_id = next(iter(self._sessions))
+                if oldest_id == protect:
+                    break
+            self._remove(oldest_id)
+            self.counters["evicted_lru"] += 1
+
+
+class SQLiteSessionStore(SessionBackend):
+    """Session store shared by every worker process on the host (SQLite in WAL mode)
+
+    - sessions keyed by primary key (O(1) lookup, no scans on the request path)
+    - history appends + trimming in one BEGIN IMMEDIATE transaction
+    - expiry via indexed expires_at column, swept periodically by each worker
+    """
+
+    backend_name = "sqlite"
+
+    def __init__(self, db_path: Optional[str] = None, config: Optional[Dict[str, Any]] = None,
+                 start_sweeper: bool = True):
+        super().__init__(config)
+        config = config or SESSION_STORE_CONFIG
+        self.db_path = db_path or config.get("sqlite_path", "./data/sessions.db")
+        self.busy_timeout_ms = config.get("sqlite_busy_timeout_ms", 5000)
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(self.db_path))
+        os.makedirs(directory, exist_ok=True)
+        self._create_schema()
+
+        if start_sweeper:
+            self.start_sweeper()
+
+        print(f"✅ SQLiteSessionStore initialized ({self.db_path}, TTL: {self.ttl_seconds}s, "
+              f"history: {self.max_history})")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread and process (sqlite3 connections are not thread- or fork-safe)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            # Never reuse a handle inherited across fork()
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _create_schema(self):
+        """Throwaway connection: the store may be built in the gunicorn master before fork()"""
+        conn = self._connect()
+        try:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    chat_id TEXT,
+                    created_at REAL NOT NULL,
+                    last_activity REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    message_count INTEGER NOT NULL DEFAULT 0,
+                    context TEXT NOT NULL DEFAULT '{}'
+                );
+                CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions(expires_at);
+                CREATE INDEX IF NOT EXISTS idx_sessions_last_activity ON sessions(last_activity);
+                CREATE TABLE IF NOT EXISTS history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL REFERENCES sessions(session_id) ON DELETE CASCADE,
+                    entry TEXT NOT NULL,
+                    response_z BLOB
+                );
+                CREATE INDEX IF NOT EXISTS idx_history_session ON history(session_id, id);
+            """)
+        finally:
+            conn.close()
+
+    def _write(self):
+        """BEGIN IMMEDIATE: take the write lock up front so read-modify-write is atomic across processes"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        return conn
+
+    def touch(self, session_id: str, chat_id: Optional[str] = None) -> Dict[str, Any]:
+        """Get or create session for an incoming message (counts the message)"""
+        now = time.time()
+        conn = self._write()
+        try:
+            row = conn.execute(
+                "SELECT expires_at FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None or row[0] <= now:
+                # Missing or expired but not yet swept: start over
+                conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                conn.execute(
+                    "INSERT INTO sessions (session_id, chat_id, created_at, last_activity, expires_at, message_count, context) "
+                    "VALUES (?, ?, ?, ?, ?, 1, '{}')",
+                    (session_id, chat_id, now, now, now + self.ttl_seconds)
+                )
+                print(f"[SESSION] New session created: {session_id}")
+            else:
+                conn.execute(
+                    "UPDATE sessions SET message_count = message_count + 1, last_activity = ?, expires_at = ?, "
+                    "chat_id = COALESCE(chat_id, ?) WHERE session_id = ?",
+                    (now, now + self.ttl_seconds, chat_id, session_id)
+                )
+                print(f"[SESSION] Existing session found: {session_id}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(session_id, include_history=False)
+
+    def get(self, session_id: str, include_history: bool = True) -> Optional[Dict[str, Any]]:
+        """Session copy with decompressed history (None if missing/expired)"""
+        row = self._conn().execute(
+            "SELECT session_id, chat_id, created_at, last_activity, message_count, context "
+            "FROM sessions WHERE session_id = ? AND expires_at > ?",
+            (session_id, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        session = {
+            "session_id": row[0],
+            "chat_id": row[1],
+            "created_at": row[2],
+            "last_activity": row[3],
+            "message_count": row[4],
+            "context": json.loads(row[5] or "{}")
+        }
+        if include_history:
+            session["history"] = self.get_history(session_id)
+        return session
+
+    def get_context(self, session_id: str) -> Dict[str, Any]:
+        row = self._conn().execute(
+            "SELECT context FROM sessions WHERE session_id = ? AND expires_at > ?", (session_id, time.time())
+        ).fetchone()
+        return json.loads(row[0] or "{}") if row else {}
+
+    def update_context(self, session_id: str, updates: Dict[str, Any]):
+        conn = self._write()
+        try:
+            row = conn.execute("SELECT context FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            if row is not None:
+                context = json.loads(row[0] or "{}")
+                context.update(updates)
+                conn.execute(
+                    "UPDATE sessions SET context = ? WHERE session_id = ?",
+                    (json.dumps(context, default=str, ensure_ascii=False), session_id)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def append_history(self, session_id: str, entry: Dict[str, Any]):
+        """Append conversation entry and trim to max_history in one transaction"""
+        stored = self._encode_entry(entry)
+        response_z = stored.pop("response_z", None)
+        conn = self._write()
+        try:
+            exists = conn.execute("SELECT 1 FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            if exists:
+                conn.execute(
+                    "INSERT INTO history (session_id, entry, response_z) VALUES (?, ?, ?)",
+                    (session_id, json.dumps(stored, default=str, ensure_ascii=False), response_z)
+                )
+                trimmed = conn.execute(
+                    "DELETE FROM history WHERE session_id = ? AND id <= ("
+                    "SELECT id FROM history WHERE session_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                    (session_id, session_id, self.max_history)
+                ).rowcount
+                self.counters["history_trimmed"] += max(trimmed, 0)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_history(self, session_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        rows = self._conn().execute(
+            "SELECT entry, response_z FROM history WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+            (session_id, limit or self.max_history)
+        ).fetchall()
+        history = []
+        for entry_json, response_z in reversed(rows):
+            stored = json.loads(entry_json)
+            if response_z is not None:
+                stored["response_z"] = response_z
+            history.append(self._decode_entry(stored))
+        return history
+
+    def delete(self, session_id: str) -> bool:
+        conn = self._write()
+        try:
+            deleted = conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,)).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return deleted > 0
+
+    def list_sessions(self) -> Dict[str, Dict[str, Any]]:
+        rows = self._conn().execute(
+            "SELECT s.session_id, s.chat_id, s.created_at, s.message_count, s.last_activity, s.context, "
+            "(SELECT COUNT(*) FROM history h WHERE h.session_id = s.session_id) "
+            "FROM sessions s WHERE s.expires_at > ? ORDER BY s.last_activity DESC",
+            (time.time(),)
+        ).fetchall()
+        return {
+            row[0]: {
+                "chat_id": row[1],
+                "created_at": row[2],
+                "message_count": row[3],
+                "last_activity": row[4],
+                "has_context": row[5] not in (None, "", "{}"),
+                "history_entries": row[6]
+            }
+            for row in rows
+        }
+
+    def __len__(self) -> int:
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM sessions WHERE expires_at > ?", (time.time(),)
+        ).fetchone()[0]
+
+    def sweep(self, now: Optional[float] = None) -> List[str]:
+        """Delete expired sessions (indexed range) and cap session count by last activity"""
+        now = now or time.time()
+        conn = self._write()
+        try:
+            expired = [row[0] for row in conn.execute(
+                "SELECT session_id FROM sessions WHERE expires_at <= ?", (now,)
+            ).fetchall()]
+            if expired:
+                conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+
+            evicted = conn.execute(
+                "DELETE FROM sessions WHERE session_id IN ("
+                "SELECT session_id FROM sessions ORDER BY last_activity DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,)
+            ).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        self.counters["expired"] += len(expired)
+        self.counters["evicted_lru"] += max(evicted, 0)
+        if expired:
+            print(f"🧹 SessionStore expired {len(expired)} sessions")
+        return expired
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Row counts and database size (counters are per worker process)"""
+        conn = self._conn()
+        now = time.time()
+        sessions = conn.execute("SELECT COUNT(*) FROM sessions WHERE expires_at > ?", (now,)).fetchone()[0]
+        history_entries = conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        wal_path = f"{self.db_path}-wal"
+        return {
+            "backend": self.backend_name,
+            "db_path": self.db_path,
+            "sessions": sessions,
+            "max_sessions": self.max_sessions,
+            "history_entries": history_entries,
+            "db_bytes": page_count * page_size,
+            "wal_bytes": os.path.getsize(wal_path) if os.path.exists(wal_path) else 0,
+            "pid": os.getpid(),
+            **self.counters
+        }
+
+    def close(self):
+        super().close()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def create_session_store(config: Optional[Dict[str, Any]] = None, start_sweeper: bool = True) -> SessionBackend:
+    """Build the configured backend (SESSION_BACKEND=memory|sqlite)"""
+    config = config or SESSION_STORE_CONFIG
+    backend = (config.get("backend") or "memory").lower()
+    if backend == "sqlite":
+        return SQLiteSessionStore(config.get("sqlite_path"), config=config, start_sweeper=start_sweeper)
+    if backend != "memory":
+        print(f"⚠️ Unknown SESSION_BACKEND '{backend}', using in-memory store")
+    return InMemorySessionStore(config=config, start_sweeper=start_sweeper)
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_session_store(start_sweeper: bool = True) -> SessionBackend:
+    """Process-wide store shared by main.py and SessionManager
+
+    start_sweeper=False defers the background thread (prefork master: threads do not survive fork).
+    """
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = create_session_store(start_sweeper=start_sweeper)
+        return _default_store
@@ -0,0 +1,209 @@
+# memory/snapshot.py
+"""Warm-start snapshots of in-process caches and sessions.
+
+Opt-in (SNAPSHOT_ENABLED=true). Registered sources are written to one gzip
+pickle on shutdown and every interval_seconds, and reloaded in a background
+thread on startup so readiness is not blocked. Entries keep their original
+age, so TTLs still apply after a restart. Sources marked data_dependent
+(ClickHouse results) are only restored when the data watermark (latest
+create_time) is unchanged since the snapshot was taken.
+
+Each gunicorn worker owns one section of the file (keyed by pid). A save
+rewrites only its own section under a file lock, so workers do not
+overwrite each other; a load merges every section, newest first.
+"""
+import os
+import sys
+import gzip
+import fcntl
+import time
+import atexit
+import pickle
+import signal
+import threading
+from typing import Any, Callable, Dict, List, Optional
+from config.api_config import SNAPSHOT_CONFIG
+
+SNAPSHOT_FORMAT_VERSION = 2
+
+
+class SnapshotManager:
+    """Save/restore registered cache sources to a compact on-disk snapshot"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None,
+                 watermark_fn: Optional[Callable[[], Any]] = None):
+        config = config or SNAPSHOT_CONFIG
+        self.enabled = config.get("enabled", False)
+        self.path = config.get("path", "./data/warm_snapshot.pkl.gz")
+        self.interval_seconds = config.get("interval_seconds", 300)
+        self.max_age_seconds = config.get("max_age_seconds", 6 * 3600)
+        self.watermark_fn = watermark_fn
+
+        self._sources = {}   # name -> {"export", "load", "data_dependent"}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.status = {
+            "state": "disabled" if not self.enabled else "idle",
+            "last_save": None,
+            "last_save_bytes": 0,
+            "last_save_seconds": None,
+            "last_load": None,
+            "loaded": {},
+            "skipped": {},
+            "error": None
+        }
+
+    def register(self, name: str, export_fn: Callable[[], List[Any]],
+                 load_fn: Callable[[List[Any]], int], data_dependent: bool = False):
+        """Add a snapshot source; export_fn returns picklable entries, load_fn restores them"""
+        self._sources[name] = {"export": export_fn, "load": load_fn, "data_dependent": data_dependent}
+
+    def start(self):
+        """Restore in the background, then save periodically and at exit"""
+        if not self.enabled:
+            return
+        atexit.register(self.save)
+        # docker stop sends SIGTERM, which skips atexit unless turned into a normal exit
+        if threading.current_thread() is threading.main_thread() and signal.getsignal(signal.SIGTERM) == signal.SIG_DFL:
+            signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        self._thread = threading.Thread(target=self._run, name="snapshot", daemon=True)
+        self._thread.start()
+        print(f"💾 SnapshotManager started ({self.path}, every {self.interval_seconds}s, "
+              f"sources: {', '.join(self._sources)})")
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _run(self):
+        self.load()
+        while not self._stop_event.wait(self.interval_seconds):
+            self.save()
+
+    def _current_watermark(self) -> Any:
+        if self.watermark_fn is None:
+            return None
+        try:
+            return self.watermark_fn()
+        except Exception as e:
+            print(f"⚠️ Snapshot watermark unavailable: {e}")
+            return None
+
+    def _read_payload(self) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return None
+        with gzip.open(self.path, "rb") as f:
+            payload = pickle.load(f)
+        if payload.get("version") != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"unsupported snapshot version {payload.get('version')}")
+        return payload
+
+    def save(self) -> Dict[str, Any]:
+        """Write this worker's section atomically (file lock + tmp file + rename)"""
+        if not self.enabled:
+            return {"success": False, "error": "Snapshots disabled"}
+
+        with self._lock:
+            start = time.time()
+            try:
+                sources = {}
+                for name, source in self._sources.items():
+                    try:
+                        sources[name] = source["export"]()
+                    except Exception as e:
+                        print(f"⚠️ Snapshot export failed for {name}: {e}")
+
+                section = {
+                    "created_at": time.time(),
+                    "watermark": self._current_watermark(),
+                    "sources": sources
+                }
+
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with open(f"{self.path}.lock", "w") as lock_file:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                    try:
+                        workers = self._read_payload()["workers"]
+                    except Exception:
+                        workers = {}    # missing, unreadable or old format: start over
+                    # Keep other workers' sections until they are too old to be loaded anyway
+                    workers = {pid: other for pid, other in workers.items()
+                               if section["created_at"] - other["created_at"] <= self.max_age_seconds}
+                    workers[os.getpid()] = section
+
+                    tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                    with gzip.open(tmp_path, "wb", compresslevel=6) as f:
+                        pickle.dump({"version": SNAPSHOT_FORMAT_VERSION, "workers": workers}, f,
+                                    protocol=pickle.HIGHEST_PROTOCOL)
+                    os.replace(tmp_path, self.path)
+
+                size = os.path.getsize(self.path)
+                self.status.update({
+                    "last_save": section["created_at"],
+                    "last_save_bytes": size,
+                    "last_save_seconds": round(time.time() - start, 3),
+                    "error": None
+                })
+                counts = {name: len(entries) for name, entries in sources.items()}
+                print(f"💾 Snapshot saved: {size // 1024}KB {counts} ({len(workers)} worker sections)")
+                return {"success": True, "bytes": size, "entries": counts, "workers": len(workers)}
+            except Exception as e:
+                self.status["error"] = str(e)
+                print(f"❌ Snapshot save failed: {e}")
+                return {"success": False, "error": str(e)}
+
+    def load(self) -> Dict[str, Any]:
+        """Restore sources from every worker section (missing/old/incompatible files are ignored)"""
+        if not self.enabled or not os.path.exists(self.path):
+            self.status["state"] = "ready"
+            return {"success": False, "error": "No snapshot"}
+
+        self.status["state"] = "loading"
+        try:
+            payload = self._read_payload()
+            now = time.time()
+            # Newest first: loaders keep what is already live, so the newest copy of a key wins
+            sections = sorted((section for section in payload.get("workers", {}).values()
+                               if now - section.get("created_at", 0) <= self.max_age_seconds),
+                              key=lambda section: section["created_at"], reverse=True)
+            if not sections:
+                print("⚠️ Snapshot too old, starting cold")
+                self.status["state"] = "ready"
+                return {"success": False, "error": "Snapshot too old"}
+
+            current_watermark = self._current_watermark()
+            loaded, skipped = {}, {}
+            for section in sections:
+                saved_watermark = section.get("watermark")
+                watermark_unchanged = saved_watermark is not None and saved_watermark == current_watermark
+                for name, entries in section.get("sources", {}).items():
+                    source = self._sources.get(name)
+                    if source is None:
+                        continue
+                    if source["data_dependent"] and not watermark_unchanged:
+                        skipped[name] = "data watermark changed"
+                        continue
+                    try:
+                        loaded[name] = loaded.get(name, 0) + source["load"](entries)
+                    except Exception as e:
+                        skipped[name] = str(e)
+
+            age = int(now - sections[0]["created_at"])
+            self.status.update({"state": "ready", "last_load": time.time(), "loaded": loaded,
+                                "skipped": skipped, "error": None})
+            print(f"💾 Snapshot restored (age {age}s, {len(sections)} worker sections): {loaded}"
+                  + (f", skipped {skipped}" if skipped else ""))
+            return {"success": True, "loaded": loaded, "skipped": skipped}
+        except Exception as e:
+            self.status.update({"state": "ready", "error": str(e)})
+            print(f"❌ Snapshot load failed: {e}")
+            return {"success": False, "error": str(e)}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "interval_seconds": self.interval_seconds,
+            "sources": list(self._sources),
+            **self.status
+        }
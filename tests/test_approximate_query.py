@@ -0,0 +1,110 @@
+# tests/test_approximate_query.py
+"""Approximate count/summary mode on the default config (no SAMPLE BY key).
+
+ClickHouse is replaced at the client level (CLICKHOUSE_CLIENT_FACTORY), the
+same way benchmarks/fakes.py does it: EXPLAIN ESTIMATE answers with a
+configurable row count, aggregate queries with fixed rows.
+
+    python -m pytest -q tests
+"""
+import os
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FakeResult:
+    def __init__(self, column_names, rows):
+        self.column_names = tuple(column_names)
+        self.result_rows = [tuple(row) for row in rows]
+        self.summary = {}
+
+
+class FakeClient:
+    estimated_rows = 60_000_000
+    queries = []
+
+    def query(self, sql, parameters=None, settings=None):
+        FakeClient.queries.append(sql)
+        if sql.startswith("EXPLAIN ESTIMATE"):
+            return FakeResult(["database", "table", "parts", "rows", "marks"],
+                              [["default", "inap_ticketing_customer_complain", 12, FakeClient.estimated_rows, 100]])
+        if "uniqCombined" in sql:
+            return FakeResult(["total_count", "top_kota"], [[48213, ["Jakarta Selatan", "Jakarta Barat"]]])
+        if "total_count" in sql:
+            return FakeResult(["total_count"], [[48100]])
+        return FakeResult(["1"], [[1]])
+
+    def command(self, sql, *args, **kwargs):
+        return None
+
+    def close(self):
+        pass
+
+
+def get_fake_client(**connection_kwargs):
+    return FakeClient()
+
+
+@pytest.fixture
+def builder(monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)   # semantic_mapping.yaml is loaded by relative path
+    monkeypatch.setenv("CLICKHOUSE_CLIENT_FACTORY", f"{__name__}:get_fake_client")
+    from tools.direct_database_tool import DatabaseConnectionPool, DirectDatabaseTool
+    from tools.smart_query_builder import SmartQueryBuilder
+    DatabaseConnectionPool._instance = None
+    FakeClient.estimated_rows = 60_000_000
+    FakeClient.queries = []
+    SmartQueryBuilder.clear_result_cache()
+    yield SmartQueryBuilder(db_tool=DirectDatabaseTool())
+    DatabaseConnectionPool._instance = None
+
+
+def _explains():
+    return [sql for sql in FakeClient.queries if sql.startswith("EXPLAIN ESTIMATE")]
+
+
+def test_default_config_has_no_sampling_key():
+    from config.api_config import QUERY_GUARD_CONFIG, APPROXIMATE_QUERY_CONFIG
+    assert not QUERY_GUARD_CONFIG["table_has_sampling_key"]
+    assert APPROXIMATE_QUERY_CONFIG["enabled"]
+
+
+def test_auto_mode_uses_sketch_and_one_estimate(builder):
+    result = builder.build_and_execute_with_narrative("berapa jumlah keluhan di Jakarta bulan ini")
+
+    assert result["intent"] == "count"
+    assert result["approximation"]["method"] == "sketch"
+    assert "uniqCombined" in result["sql_query"] and "SAMPLE" not in result["sql_query"]
+    assert "(perkiraan ±0.6%)" in result["narrative"]
+    assert "Jakarta Selatan" in result["narrative"]
+    # The guard's estimate decides; no separate EXPLAIN for the approximation
+    assert len(_explains()) == 1
+
+
+def test_small_scope_stays_exact(builder):
+    FakeClient.estimated_rows = 1_000
+    result = builder.build_and_execute_with_narrative("berapa jumlah keluhan di Jakarta bulan ini")
+
+    assert "approximation" not in result
+    assert "uniqCombined" not in result["sql_query"]
+    assert "perkiraan" not in result["narrative"]
+
+
+def test_keyword_forces_sketch_without_estimate(builder):
+    FakeClient.estimated_rows = 1_000
+    result = builder.build_and_execute_with_narrative("kira-kira berapa jumlah keluhan di Jakarta bulan ini")
+
+    assert result["approximation"]["method"] == "sketch"
+    assert "uniqCombined" in result["sql_query"]
+    assert not _explains()
+
+
+def test_sketch_summary_sql(builder):
+    entities = {"geographic": [{"field": "kabupaten_kota_create_ticket", "value": "Jakarta",
+                                "search_type": "contains"}]}
+    sql = builder.build_sql("summary", entities, approximate=True)
+
+    assert "uniqCombined(17)(order_id) AS total_keluhan" in sql
+    assert "topK(3)(provinsi_create_ticket)" in sql
+    assert "SAMPLE" not in sql
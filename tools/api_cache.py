@@ -1,6 +1,6 @@
 import time
 import hashlib
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
 import threading
 
@@ -155,6 +155,28 @@ class APICache:
                 "cache_utilization": len(self.cache) / self.max_entries * 100
             }
     
+    def export_entries(self) -> List[Tuple[str, Dict[str, Any], float]]:
+        """Live entries as (key, response, access_time) for snapshots"""
+        with self.lock:
+            return [
+                (key, self.cache[key], timestamp)
+                for key, timestamp in self.access_times.items()
+                if key in self.cache and not self._is_expired(timestamp)
+            ]
+    
+    def load_entries(self, entries: List[Tuple[str, Dict[str, Any], float]]) -> int:
+        """Restore exported entries (expired ones skipped, live entries win)"""
+        loaded = 0
+        with self.lock:
+            for key, response, timestamp in entries:
+                if key in self.cache or self._is_expired(timestamp):
+                    continue
+                self.cache[key] = response
+                self.access_times[key] = timestamp
+                loaded += 1
+            self._enforce_max_entries()
+        return loaded
+    
     def get_cached_entries(self) -> List[Dict[str, Any]]:
         """Get list of cached entries for debugging"""
         with self.lock:
@@ -179,16 +201,17 @@ class APICache:
 class CachedAPIClient:
     """Wrapper for API client with caching"""
     
-    def __init__(self, api_client, cache_ttl_minutes: int = 10):
+    def __init__(self, api_client, cache_ttl_minutes: int = 10, max_entries: int = 100):
         """
         Initialize cached API client
         
         Args:
             api_client: The actual API client instance
             cache_ttl_minutes: Cache time to live in minutes
+            max_entries: Maximum number of cached responses
         """
         self.api_client = api_client
-        self.cache = APICache(ttl_minutes=cache_ttl_minutes)
+        self.cache = APICache(ttl_minutes=cache_ttl_minutes, max_entries=max_entries)
         
         print(f"💾 CachedAPIClient initialized with {cache_ttl_minutes}min TTL")
     
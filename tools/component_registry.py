@@ -0,0 +1,206 @@
+# tools/component_registry.py
+"""One instance of each heavy dependency per process, built lazily on first use.
+
+    from tools.component_registry import get_component
+    rag_tool = get_component("rag_tool")
+
+main.py warms the registry up in parallel at startup and reports how long
+each component took (GET /startup).
+"""
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+class ComponentRegistry:
+    """Lazy, thread-safe factory registry with construction timings"""
+
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._locks = {}
+        self._timings = {}
+        self._errors = {}
+        self._registry_lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        with self._registry_lock:
+            self._factories[name] = factory
+            self._locks.setdefault(name, threading.RLock())
+
+    def set(self, name: str, instance: Any):
+        """Provide an already built instance (e.g. injected by tests or scripts)"""
+        with self._registry_lock:
+            self._locks.setdefault(name, threading.RLock())
+            self._instances[name] = instance
+
+    def get(self, name: str) -> Any:
+        """Build on first use; concurrent callers wait for the same instance. Failures are retried next call."""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        if name not in self._factories:
+            raise KeyError(f"Unknown component: {name}")
+
+        with self._locks[name]:
+            instance = self._instances.get(name)
+            if instance is not None:
+                return instance
+
+            start = time.perf_counter()
+            try:
+                instance = self._factories[name]()
+            except Exception as e:
+                self._errors[name] = str(e)
+                print(f"❌ Component {name} failed: {e}")
+                raise
+            elapsed = time.perf_counter() - start
+
+            self._instances[name] = instance
+            self._timings[name] = elapsed
+            self._errors.pop(name, None)
+            print(f"🧩 Component {name} ready in {elapsed:.2f}s")
+            return instance
+
+    def get_optional(self, name: str) -> Optional[Any]:
+        """Like get(), but None when construction fails (optional features)"""
+        try:
+            return self.get(name)
+        except Exception:
+            return None
+
+    def reset(self, names: Optional[Iterable[str]] = None):
+        """Forget built instances so the next get() rebuilds them (e.g. after fork)"""
+        with self._registry_lock:
+            for name in list(names or self._instances):
+                self._instances.pop(name, None)
+                self._timings.pop(name, None)
+
+    def is_ready(self, name: str) -> bool:
+        return self._instances.get(name) is not None
+
+    def warm_up(self, names: Optional[Iterable[str]] = None, max_workers: int = 4) -> Dict[str, Any]:
+        """Build components in parallel (dependencies resolve through get())"""
+        names = list(names or self._factories)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="warmup") as executor:
+            list(executor.map(self.get_optional, names))
+        report = self.get_report()
+        report["warm_up_seconds"] = round(time.perf_counter() - start, 3)
+        return report
+
+    def get_report(self) -> Dict[str, Any]:
+        return {
+            "components": {
+                name: {
+                    "ready": self.is_ready(name),
+                    "seconds": round(self._timings[name], 3) if name in self._timings else None,
+                    "error": self._errors.get(name)
+                }
+                for name in self._factories
+            },
+            "build_seconds_total": round(sum(self._timings.values()), 3)
+        }
+
+    def print_report(self, report: Optional[Dict[str, Any]] = None):
+        report = report or self.get_report()
+        print("🧩 Startup components:")
+        for name, info in sorted(report["components"].items(), key=lambda item: -(item[1]["seconds"] or 0)):
+            status = "✅" if info["ready"] else ("❌" if info["error"] else "⏸️")
+            seconds = f"{info['seconds']:.2f}s" if info["seconds"] is not None else "lazy"
+            print(f"   {status} {name:<18} {seconds}" + (f"  ({info['error']})" if info["error"] else ""))
+        if "warm_up_seconds" in report:
+            print(f"   ⏱️ wall clock {report['warm_up_seconds']:.2f}s "
+                  f"(sum of builds {report['build_seconds_total']:.2f}s)")
+
+
+# ---------------------------------------------------------------- default components
+
+def _build_db_tool():
+    from tools.direct_database_tool import DirectDatabaseTool
+    db_tool = DirectDatabaseTool()
+    if db_tool.pool._client is None:
+        raise ConnectionError("ClickHouse connection not available")
+    return db_tool
+
+
+def _build_query_builder():
+    from tools.smart_query_builder import SmartQueryBuilder
+    return SmartQueryBuilder(use_direct_db=True, db_tool=registry.get_optional("db_tool"))
+
+
+def _build_embedding_model():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2"))
+
+
+def _build_chroma_client():
+    import chromadb
+    return chromadb.PersistentClient(path=os.getenv("CHROMADB_PATH", "./chromadb_knowledge"))
+
+
+def _build_rag_tool():
+    from knowledge.rag_tool import RAGTool
+    return RAGTool(chroma_client=registry.get("chroma_client"), embedding_model=registry.get("embedding_model"))
+
+
+def _build_llm_gateway():
+    from tools.llm_gateway import LLMGateway
+    return LLMGateway()
+
+
+def _build_smartcare_api():
+    from config.api_config import CACHE_CONFIG
+    from tools.telkomsel_api_client import TelkomselAPIClient
+    api_client = TelkomselAPIClient()
+    if not CACHE_CONFIG.get("enabled", True):
+        return api_client
+    from tools.api_cache import CachedAPIClient
+    return CachedAPIClient(
+        api_client,
+        cache_ttl_minutes=CACHE_CONFIG.get("ttl_minutes", 10),
+        max_entries=CACHE_CONFIG.get("max_entries", 100)
+    )
+
+
+def _build_simplified_crew():
+    from crews.simplified_crew import SimplifiedCrew
+    crew = SimplifiedCrew(shared_db_tool=registry.get_optional("db_tool"))
+    llm_gateway = registry.get_optional("llm_gateway")
+    if llm_gateway is not None:
+        # Per worker (fork-unsafe component): load the model and cache the static prompt prefixes
+        llm_gateway.start_warm_up(_llm_warm_up_prompts(llm_gateway))
+    return crew
+
+
+def _llm_warm_up_prompts(llm_gateway):
+    """(system prompt, model) pairs evaluated once at startup, chat hot path first"""
+    from crews.simplified_crew import SimplifiedCrew
+    from tools.time_parser import TimeParser
+    from agents.story_agent import StoryAgentSummary
+    from knowledge.rag_tool import RAGTool
+    return [
+        (SimplifiedCrew.CLASSIFIER_SYSTEM_PROMPT, llm_gateway.model_for("classification")),
+        (SimplifiedCrew.FOLLOWUP_SYSTEM_PROMPT, llm_gateway.model_for("followup")),
+        (TimeParser.DATE_SYSTEM_PROMPT, llm_gateway.model_for("date_extraction")),
+        (StoryAgentSummary.KELUHAN_SYSTEM_PROMPT, llm_gateway.model_for("keluhan_rewrite")),
+        (StoryAgentSummary.KELUHAN_BATCH_SYSTEM_PROMPT, llm_gateway.model_for("keluhan_rewrite")),
+        (RAGTool.ANSWER_SYSTEM_PROMPT, llm_gateway.model_for("rag_answer"))
+    ]
+
+
+registry = ComponentRegistry()
+registry.register("db_tool", _build_db_tool)
+registry.register("query_builder", _build_query_builder)
+registry.register("embedding_model", _build_embedding_model)
+registry.register("chroma_client", _build_chroma_client)
+registry.register("rag_tool", _build_rag_tool)
+registry.register("llm_gateway", _build_llm_gateway)
+registry.register("smartcare_api", _build_smartcare_api)
+registry.register("simplified_crew", _build_simplified_crew)
+
+
+def get_component(name: str) -> Any:
+    return registry.get(name)
@@ -308,13 +308,20 @@
 
 
 import os
+import re
 import json
 import time
+import logging
+import importlib
 import threading
-from typing import Dict, List, Any, Optional
-import clickhouse_connect
-from clickhouse_connect import get_client
+from typing import Callable, Dict, List, Any, Optional, Tuple
 from contextlib import contextmanager
+from config.api_config import QUERY_GUARD_CONFIG, APPROXIMATE_QUERY_CONFIG, CLICKHOUSE_REPLAY_CONFIG
+from tools.tracing import traced
+from tools.logger import get_logger
+from tools.query_recorder import wrap_client_factory, summary_stats
+
+log = get_logger("database")
 
 class DatabaseConnectionPool:
     """Singleton connection pool for ClickHouse"""
@@ -369,7 +376,7 @@ class DatabaseConnectionPool:
             try:
                 print(f"🔄 Connection attempt {attempt + 1}/{max_retries}")
                 
-                self._client = clickhouse_connect.get_client(
+                self._client = self._client_factory()(
                     host=self.host,
                     port=self.port,
                     username=self.user,
@@ -411,6 +418,28 @@ class DatabaseConnectionPool:
                 self._client = None
             raise
     
+    @staticmethod
+    def _client_factory():
+        """clickhouse_connect.get_client, or CLICKHOUSE_CLIENT_FACTORY="module:function" (load tests),
+        wrapped for CLICKHOUSE_MODE=record|replay (tools/query_recorder.py)"""
+        factory_path = os.getenv('CLICKHOUSE_CLIENT_FACTORY')
+        if factory_path:
+            module_name, _, function_name = factory_path.partition(":")
+            get_client = getattr(importlib.import_module(module_name), function_name)
+        elif CLICKHOUSE_REPLAY_CONFIG["mode"] == "replay":
+            get_client = None   # Replay never connects
+        else:
+            # Imported on first connect so STARTUP_MODE=lazy does not pay for it at import
+            import clickhouse_connect
+            get_client = clickhouse_connect.get_client
+        return wrap_client_factory(get_client)
+    
+    def reset_connection(self):
+        """Drop the client without closing it (after fork the socket belongs to the parent)"""
+        with self._connection_lock:
+            self._client = None
+            self._last_health_check = 0
+    
     def is_healthy(self):
         """Check if connection is healthy"""
         try:
@@ -434,6 +463,8 @@ class DirectDatabaseTool:
         self.password = self.pool.password
         self.secure = True
         self.table_name = os.getenv('CLICKHOUSE_TABLE', 'inap_ticketing_customer_complain')
+        self.guard_config = QUERY_GUARD_CONFIG
+        self.approximate_config = APPROXIMATE_QUERY_CONFIG
         
         print(f"🔧 ClickHouse config: {self.user}@{self.host}:{self.port}/{self.database}, secure={self.secure}")
         print(f"🔗 Using table: {self.table_name}")
@@ -473,21 +504,51 @@ class DirectDatabaseTool:
                 "connection_pool": False
             }
     
-    def execute_query(self, query: str, params: Optional[Dict] = None) -> Dict[str, Any]:
-        """Execute ClickHouse query with pooling + existing logic"""
+    def ping(self) -> Dict[str, Any]:
+        """Cheap liveness check (SELECT 1, no table access) for the health monitor"""
+        try:
+            with self.pool.get_client() as client:
+                client.query("SELECT 1")
+            return {"ok": True, "host": self.host, "database": self.database}
+        except Exception as e:
+            return {"ok": False, "host": self.host, "error": str(e)[:200]}
+    
+    @traced("clickhouse_query")
+    def execute_query(self, query: str, params: Optional[Dict] = None, intent: Optional[str] = None,
+                      entities: Optional[Dict[str, Any]] = None,
+                      rebuild_sql: Optional[Callable[[Dict[str, Any]], str]] = None,
+                      approximate_sql: Optional[Callable[[Dict[str, Any]], str]] = None) -> Dict[str, Any]:
+        """Execute ClickHouse query with pooling + existing logic
+        
+        When ``intent`` is given the per-intent execution limits are applied.
+        Queries built by SmartQueryBuilder also pass their ``entities`` and a
+        ``rebuild_sql(entities)`` callback so the cost guard can detect a
+        missing time filter and narrow the query by rebuilding it;
+        ``approximate_sql(entities)`` lets the guard switch to the approximate
+        SQL when its estimate is above the auto-approximation threshold.
+        """
         max_retries = 2
+        settings = None
+        guard_info = None
+        
+        if intent:
+            settings = self.get_intent_settings(intent)
+            query, guard_info = self.guard_query(query, intent, entities, rebuild_sql, settings, approximate_sql)
         
         for attempt in range(max_retries):
             try:
-                print(f"🔍 [{attempt+1}/{max_retries}] Executing query: {query[:100]}...")
+                log.debug("🔍 [%s/%s] Executing query: %.100s...", attempt + 1, max_retries, query)
                 
                 with self.pool.get_client() as client:
+                    query_start = time.perf_counter()
                     if params:
-                        result = client.query(query, parameters=params)
+                        result = client.query(query, parameters=params, settings=settings)
                     else:
-                        result = client.query(query)
+                        result = client.query(query, settings=settings)
                     
                     rows = result.result_rows
+                    query_stats = summary_stats(getattr(result, "summary", None),
+                                                (time.perf_counter() - query_start) * 1000)
                     
                     # Convert ClickHouse tuples to dict (existing logic)
                     if hasattr(result, 'column_names') and result.column_names:
@@ -496,16 +557,15 @@ class DirectDatabaseTool:
                     else:
                         dict_rows = rows
                     
-                    # Debug logging (existing)
-                    print(f"🐛 Debug - rows type: {type(rows)}")
-                    print(f"🐛 Debug - dict_rows type: {type(dict_rows)}")
-                    if dict_rows and len(dict_rows) > 0:
-                        print(f"🐛 Debug - first row type: {type(dict_rows[0])}")
-                        print(f"🐛 Debug - first row sample: {dict_rows[0] if len(str(dict_rows[0])) < 200 else str(dict_rows[0])[:200]}")
+                    # Row shape details only when DEBUG is on (str() of a row is not free)
+                    if log.isEnabledFor(logging.DEBUG):
+                        log.debug("🐛 Debug - rows type: %s, dict_rows type: %s", type(rows), type(dict_rows))
+                        if dict_rows:
+                            log.debug("🐛 Debug - first row type: %s, sample: %.200s", type(dict_rows[0]), dict_rows[0])
                     
                     # Ensure all rows are in dict format (existing logic)
                     if dict_rows and isinstance(dict_rows[0], tuple):
-                        print("🔧 Converting remaining tuple rows to dict...")
+                        log.debug("🔧 Converting remaining tuple rows to dict...")
                         if hasattr(result, 'column_names') and result.column_names:
                             columns = result.column_names
                             dict_rows = [dict(zip(columns, row)) for row in dict_rows]
@@ -514,17 +574,24 @@ class DirectDatabaseTool:
                                 columns = [f"col_{i}" for i in range(len(dict_rows[0]))]
                                 dict_rows = [dict(zip(columns, row)) for row in dict_rows]
                     
-                    print(f"✅ Query executed successfully. Rows: {len(dict_rows)}")
+                    if guard_info and guard_info.get("sample_ratio"):
+                        dict_rows = self._scale_sampled_rows(dict_rows, guard_info["sample_ratio"])
                     
-                    return {
+                    log.info("✅ Query executed successfully. Rows: %s", len(dict_rows))
+                    
+                    response = {
                         "success": True,
                         "data": dict_rows,
                         "row_count": len(dict_rows),
-                        "query": query
+                        "query": query,
+                        "query_stats": query_stats   # read_rows / read_bytes / elapsed_ms
                     }
+                    if guard_info and guard_info.get("action") != "none":
+                        response["guard"] = guard_info
+                    return response
                     
             except ConnectionError as e:
-                print(f"❌ Connection error (attempt {attempt+1}): {e}")
+                log.warning("❌ Connection error (attempt %s): %s", attempt + 1, e)
                 if attempt < max_retries - 1:
                     time.sleep(2)
                     continue
@@ -538,7 +605,7 @@ class DirectDatabaseTool:
                     
             except Exception as e:
                 error_msg = str(e)
-                print(f"❌ Query error (attempt {attempt+1}): {error_msg}")
+                log.warning("❌ Query error (attempt %s): %s", attempt + 1, error_msg)
                 
                 # Check for rate limiting or connection issues (existing logic)
                 is_rate_limited = any(indicator in error_msg.lower() for indicator in [
@@ -547,7 +614,7 @@ class DirectDatabaseTool:
                 
                 if is_rate_limited and attempt < max_retries - 1:
                     delay = 2 * (2 ** attempt)  # Exponential backoff
-                    print(f"⏳ Rate limited/connection issue - retrying in {delay}s...")
+                    log.warning("⏳ Rate limited/connection issue - retrying in %ss...", delay)
                     time.sleep(delay)
                     continue
                 else:
@@ -559,6 +626,134 @@ class DirectDatabaseTool:
                         "retry_attempts": attempt + 1
                     }
     
+    def get_intent_settings(self, intent: str) -> Dict[str, Any]:
+        """Get ClickHouse execution limits for an intent"""
+        limits = self.guard_config.get("intent_limits", {})
+        return dict(limits.get(intent, limits.get("default", {})))
+
+    def estimate_rows(self, query: str, settings: Optional[Dict[str, Any]] = None) -> Optional[int]:
+        """Estimate rows to read using EXPLAIN ESTIMATE (None if unavailable)"""
+        try:
+            with self.pool.get_client() as client:
+                result = client.query(f"EXPLAIN ESTIMATE {query}", settings=settings)
+                columns = list(result.column_names or [])
+                if "rows" not in columns:
+                    return None
+                rows_index = columns.index("rows")
+                return sum(int(row[rows_index]) for row in result.result_rows)
+        except Exception as e:
+            log.warning("⚠️ EXPLAIN ESTIMATE failed: %.100s", e)
+            return None
+
+    def guard_query(self, query: str, intent: str, entities: Optional[Dict[str, Any]] = None,
+                    rebuild_sql: Optional[Callable[[Dict[str, Any]], str]] = None,
+                    settings: Optional[Dict[str, Any]] = None,
+                    approximate_sql: Optional[Callable[[Dict[str, Any]], str]] = None) -> Tuple[str, Dict[str, Any]]:
+        """Apply cost guard to unbounded queries
+
+        Only builder queries (entities + rebuild_sql) are guarded, and top-N
+        queries (LIMIT) never are. Queries without a time entity, or with an
+        approximate_sql callback, are estimated once. Over budget an unbounded
+        query is rebuilt with the default window as an extra time entity, and
+        if the table has a sampling key and the narrowed query is still too
+        big, it is sampled. Above the auto-approximation threshold the
+        (narrowed) query is replaced by approximate_sql.
+        """
+        guard_info = {"action": "none", "intent": intent}
+        config = self.guard_config
+
+        if not config.get("enabled", True) or intent not in config.get("guarded_intents", []):
+            return query, guard_info
+
+        if entities is None or rebuild_sql is None or re.search(r'\bLIMIT\b', query, re.IGNORECASE):
+            return query, guard_info
+
+        unbounded = self._is_unbounded(entities)
+        if not unbounded and approximate_sql is None:
+            return query, guard_info
+
+        estimated_rows = self.estimate_rows(query, settings)
+        guard_info["estimated_rows"] = estimated_rows
+        if estimated_rows is None:
+            return query, guard_info
+        budget = config.get("max_estimated_rows", 0)
+
+        if unbounded and estimated_rows > budget:
+            window_days = config.get("default_window_days", 30)
+            entities = self._narrow_entities(entities, window_days)
+            narrowed_query = rebuild_sql(entities)
+            narrowed_estimate = self.estimate_rows(narrowed_query, settings)
+
+            guard_info.update({
+                "action": "narrowed",
+                "window_days": window_days,
+                "narrowed_estimated_rows": narrowed_estimate,
+                "note": f"ℹ️ *Query tanpa filter waktu terlalu besar (±{estimated_rows:,} baris), hasil dibatasi ke {window_days} hari terakhir.*"
+            })
+            log.info("🛡️ Query guard: %s rows > budget %s, narrowed to %s days", estimated_rows, budget, window_days)
+
+            if (narrowed_estimate is not None and narrowed_estimate > budget
+                    and config.get("table_has_sampling_key") and intent in ("count", "summary")
+                    and not re.search(r'\bSAMPLE\b', narrowed_query, re.IGNORECASE)):
+                ratio = config.get("sample_ratio", 0.1)
+                guard_info.update({
+                    "action": "sampled",
+                    "sample_ratio": ratio,
+                    "note": f"ℹ️ *Data terlalu besar, hasil merupakan estimasi dari sampel {ratio:.0%} data {window_days} hari terakhir.*"
+                })
+                log.info("🛡️ Query guard: narrowed query still %s rows, sampling %.0f%%", narrowed_estimate, ratio * 100)
+                return self._sample_query(narrowed_query, ratio), guard_info
+
+            query, estimated_rows = narrowed_query, narrowed_estimate
+
+        threshold = self.approximate_config.get("auto_threshold_rows", 0)
+        if approximate_sql is not None and estimated_rows is not None and estimated_rows > threshold:
+            query = approximate_sql(entities)
+            guard_info["approximated"] = True
+            if guard_info["action"] == "none":
+                guard_info["action"] = "approximated"
+            log.info("🎯 Approximate mode: estimated %s rows > %s", estimated_rows, threshold)
+
+        return query, guard_info
+
+    def _is_unbounded(self, entities: Dict[str, Any]) -> bool:
+        """Check whether no entity filters on the time column"""
+        time_column = self.guard_config.get("time_column", "create_time")
+        for category, entity_list in entities.items():
+            if category == 'context':
+                continue
+            for entity in entity_list if isinstance(entity_list, list) else [entity_list]:
+                if isinstance(entity, dict) and entity.get('field') == time_column and entity.get('value'):
+                    return False
+        return True
+
+    def _narrow_entities(self, entities: Dict[str, Any], window_days: int) -> Dict[str, Any]:
+        """Entities plus the default time window as a temporal entity"""
+        time_column = self.guard_config.get("time_column", "create_time")
+        narrowed = dict(entities)
+        narrowed['temporal'] = list(entities.get('temporal') or []) + [{
+            'field': time_column,
+            'value': f"{time_column} >= now() - INTERVAL {int(window_days)} DAY",
+            'search_type': 'raw_sql'
+        }]
+        return narrowed
+
+    def _sample_query(self, query: str, ratio: float) -> str:
+        """Add SAMPLE clause after table name"""
+        return re.sub(rf'\bFROM\s+{re.escape(self.table_name)}\b',
+                      f"FROM {self.table_name} SAMPLE {ratio}", query, count=1)
+
+    def _scale_sampled_rows(self, rows: List[Dict], ratio: float) -> List[Dict]:
+        """Scale count columns of sampled result back to full-data estimate"""
+        count_columns = ("total_count", "total_keluhan", "total_complaints", "complaint_count")
+        for row in rows:
+            if not isinstance(row, dict):
+                continue
+            for column in count_columns:
+                if isinstance(row.get(column), (int, float)):
+                    row[column] = int(round(row[column] / ratio))
+        return rows
+
     def get_table_info(self) -> Dict[str, Any]:
         """Get ClickHouse table structure information - Keep existing utility"""
         try:
@@ -693,4 +888,12 @@ class DirectDatabaseTool:
     
     def health_check(self) -> Dict[str, Any]:
         """Health check alias"""
-        return self.test_connection()
\ No newline at end of file
+        return self.test_connection()
+
+
+def append_guard_note(narrative: str, execution_result: Optional[Dict[str, Any]]) -> str:
+    """Narrative plus the cost-guard note (narrowing/sampling) of an execute_query result, if any"""
+    guard_note = ((execution_result or {}).get("guard") or {}).get("note")
+    if guard_note and narrative:
+        return f"{narrative}\n\n{guard_note}"
+    return narrative
\ No newline at end of file
@@ -0,0 +1,152 @@
+# tools/fulltext_index.py
+import argparse
+import yaml
+from typing import Dict, Any, List, Optional
+
+
+class FulltextIndexManager:
+    """Manage tokenbf_v1/ngrambf_v1 skip indexes used by full-text complaint search
+
+    Index expressions are lower(<field>) so they match the hasToken/multiSearchAny
+    predicates generated by SmartQueryBuilder._build_fulltext_condition.
+    """
+
+    def __init__(self, db_tool=None, mapping_path: str = 'config/semantic_mapping.yaml'):
+        if db_tool is None:
+            from tools.direct_database_tool import DirectDatabaseTool
+            db_tool = DirectDatabaseTool()
+        self.db_tool = db_tool
+        self.table_name = db_tool.table_name
+        self.config = self._load_config(mapping_path)
+
+    def _load_config(self, mapping_path: str) -> Dict[str, Any]:
+        """Load fulltext_search section from semantic mapping"""
+        try:
+            with open(mapping_path, 'r', encoding='utf-8') as f:
+                return (yaml.safe_load(f) or {}).get('fulltext_search', {})
+        except Exception as e:
+            print(f"❌ Error loading full-text config: {e}")
+            return {}
+
+    def index_name(self, field: str, kind: str) -> str:
+        return f"idx_{field}_{kind}"
+
+    def planned_indexes(self) -> List[Dict[str, Any]]:
+        """Indexes declared in semantic_mapping.yaml (one token + one ngram per field)"""
+        planned = []
+        for field in self.config.get('fields', []):
+            for kind, spec in self.config.get('indexes', {}).items():
+                planned.append({
+                    "name": self.index_name(field, kind),
+                    "expr": f"lower({field})",
+                    "type": spec.get("type"),
+                    "granularity": spec.get("granularity", 4)
+                })
+        return planned
+
+    def build_ddl(self) -> List[str]:
+        """ALTER TABLE ... ADD INDEX statements for all planned indexes"""
+        return [
+            f"ALTER TABLE {self.table_name} ADD INDEX IF NOT EXISTS {index['name']} "
+            f"{index['expr']} TYPE {index['type']} GRANULARITY {index['granularity']}"
+            for index in self.planned_indexes()
+        ]
+
+    def materialize_ddl(self) -> List[str]:
+        """Build index for existing parts (runs as a background mutation)"""
+        return [
+            f"ALTER TABLE {self.table_name} MATERIALIZE INDEX {index['name']}"
+            for index in self.planned_indexes()
+        ]
+
+    def drop_ddl(self) -> List[str]:
+        return [
+            f"ALTER TABLE {self.table_name} DROP INDEX IF EXISTS {index['name']}"
+            for index in self.planned_indexes()
+        ]
+
+    def existing_indexes(self) -> List[Dict[str, Any]]:
+        """Skip indexes currently defined on the table"""
+        with self.db_tool.pool.get_client() as client:
+            result = client.query(
+                "SELECT name, type_full, expr, granularity "
+                "FROM system.data_skipping_indices "
+                "WHERE database = currentDatabase() AND table = %(table)s",
+                parameters={"table": self.table_name}
+            )
+            return [dict(zip(result.column_names, row)) for row in result.result_rows]
+
+    def status(self) -> Dict[str, Any]:
+        """Compare planned indexes with indexes that exist on the table"""
+        try:
+            existing = {index["name"]: index for index in self.existing_indexes()}
+            planned = self.planned_indexes()
+            return {
+                "success": True,
+                "table": self.table_name,
+                "indexes": [
+                    {**index, "exists": index["name"] in existing}
+                    for index in planned
+                ],
+                "missing": [index["name"] for index in planned if index["name"] not in existing]
+            }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def ensure_indexes(self, materialize: bool = True, dry_run: bool = False) -> Dict[str, Any]:
+        """Create missing indexes and optionally materialize them for existing data"""
+        statements = self.build_ddl() + (self.materialize_ddl() if materialize else [])
+        return self._run(statements, dry_run)
+
+    def drop_indexes(self, dry_run: bool = False) -> Dict[str, Any]:
+        return self._run(self.drop_ddl(), dry_run)
+
+    def _run(self, statements: List[str], dry_run: bool) -> Dict[str, Any]:
+        if dry_run:
+            for statement in statements:
+                print(f"📝 {statement}")
+            return {"success": True, "dry_run": True, "statements": statements}
+
+        executed = []
+        try:
+            with self.db_tool.pool.get_client() as client:
+                for statement in statements:
+                    print(f"🔧 {statement}")
+                    client.command(statement)
+                    executed.append(statement)
+            return {"success": True, "statements": executed}
+        except Exception as e:
+            print(f"❌ Index DDL failed: {str(e)[:200]}")
+            return {"success": False, "error": str(e), "statements": executed}
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Manage full-text skip indexes on the complaint table")
+    parser.add_argument("action", choices=["status", "create", "materialize", "drop", "ddl"])
+    parser.add_argument("--dry-run", action="store_true", help="Print statements without executing")
+    parser.add_argument("--no-materialize", action="store_true", help="Only add index definitions on create")
+    args = parser.parse_args(argv)
+
+    manager = FulltextIndexManager()
+
+    if args.action == "status":
+        status = manager.status()
+        if not status["success"]:
+            print(f"❌ {status['error']}")
+            return
+        for index in status["indexes"]:
+            marker = "✅" if index["exists"] else "❌"
+            print(f"{marker} {index['name']}: {index['expr']} TYPE {index['type']} GRANULARITY {index['granularity']}")
+    elif args.action == "create":
+        manager.ensure_indexes(materialize=not args.no_materialize, dry_run=args.dry_run)
+    elif args.action == "materialize":
+        manager._run(manager.materialize_ddl(), args.dry_run)
+    elif args.action == "drop":
+        manager.drop_indexes(dry_run=args.dry_run)
+    else:
+        for statement in manager.build_ddl() + manager.materialize_ddl():
+            print(statement)
+
+
+if __name__ == "__main__":
+    main()
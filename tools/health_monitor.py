@@ -0,0 +1,117 @@
+# tools/health_monitor.py
+"""Dependency status refreshed in the background; probes only read memory.
+
+/livez  -> process is up (no dependency checks)
+/readyz -> last refreshed status of critical dependencies
+/health -> cached status of every dependency
+Expensive diagnostics (table row counts, schema) go through RateLimitedDiagnostics.
+"""
+import time
+import threading
+from typing import Any, Callable, Dict, Optional
+from config.api_config import HEALTH_CONFIG
+
+
+class HealthMonitor:
+    """Runs registered dependency checks every refresh_interval_seconds"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or HEALTH_CONFIG
+        self.refresh_interval = config.get("refresh_interval_seconds", 15)
+        self.stale_after = config.get("stale_after_seconds", 60)
+        self.critical = set(config.get("critical", ["clickhouse"]))
+
+        self._checks = {}     # name -> check function returning a dict with "ok"
+        self._status = {}     # name -> last result
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.started_at = time.time()
+        self.last_refresh = None
+
+    def register(self, name: str, check_fn: Callable[[], Dict[str, Any]], critical: Optional[bool] = None):
+        self._checks[name] = check_fn
+        if critical is True:
+            self.critical.add(name)
+        elif critical is False:
+            self.critical.discard(name)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="health-monitor", daemon=True)
+        self._thread.start()
+        print(f"🩺 HealthMonitor started (every {self.refresh_interval}s, critical: {', '.join(sorted(self.critical))})")
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _run(self):
+        while True:
+            self.refresh()
+            if self._stop_event.wait(self.refresh_interval):
+                return
+
+    def refresh(self):
+        """Run every check once (called by the background thread)"""
+        for name, check_fn in self._checks.items():
+            start = time.perf_counter()
+            try:
+                result = dict(check_fn() or {})
+                result.setdefault("ok", False)
+            except Exception as e:
+                result = {"ok": False, "error": str(e)[:200]}
+            result["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            result["checked_at"] = time.time()
+            with self._lock:
+                self._status[name] = result
+        self.last_refresh = time.time()
+
+    def get_status(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: dict(result) for name, result in self._status.items()}
+
+    def readiness(self) -> Dict[str, Any]:
+        """Ready when every critical check passed in a refresh that is not stale"""
+        status = self.get_status()
+        now = time.time()
+        reasons = []
+        if self.last_refresh is None:
+            reasons.append("dependency checks not run yet")
+        elif now - self.last_refresh > self.stale_after:
+            reasons.append(f"dependency status stale ({int(now - self.last_refresh)}s)")
+        for name in sorted(self.critical):
+            if not status.get(name, {}).get("ok"):
+                reasons.append(f"{name} unavailable")
+        return {
+            "ready": not reasons,
+            "reasons": reasons,
+            "checks": {name: result.get("ok", False) for name, result in status.items()},
+            "last_refresh": self.last_refresh
+        }
+
+
+class RateLimitedDiagnostics:
+    """Run an expensive diagnostic at most once per min_interval_seconds, serve the cached result otherwise"""
+
+    def __init__(self, fn: Callable[[], Dict[str, Any]], min_interval_seconds: float):
+        self.fn = fn
+        self.min_interval = min_interval_seconds
+        self._result = None
+        self._ran_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.time()
+            cached = self._result is not None and now - self._ran_at < self.min_interval
+            if not cached:
+                self._result = self.fn()
+                self._ran_at = now
+            return {
+                **self._result,
+                "cached": cached,
+                "age_seconds": round(now - self._ran_at, 1),
+                "next_refresh_in_seconds": round(max(0.0, self.min_interval - (now - self._ran_at)), 1)
+            }
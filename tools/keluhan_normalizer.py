@@ -0,0 +1,200 @@
+# tools/keluhan_normalizer.py
+"""Rule-based rewrite of raw complaint text (keluhan), the fast path before the LLM rewrite.
+
+"ga bisa nelpon sinyal ilang2an" -> "Tidak bisa menelepon sinyal hilang-hilangan"
+
+One compiled regex walks the text once. Lexicon phrases (longest first)
+and single tokens are replaced by their formal form; stretched letters
+("lemottt") are squeezed and reduplication digits ("putus2") are expanded.
+Abbreviations with more than one reading ("ket" = ketika or keterangan)
+are not in the lexicon and are left for the LLM.
+
+quality_score() then counts what the rules could not fix: ambiguous
+abbreviations and particles (AMBIGUOUS_TOKENS), unknown short tokens,
+vowel-less abbreviations and mixed letter/digit tokens. StoryAgentSummary
+only asks the LLM when the score is below
+KELUHAN_NORMALIZER_CONFIG["min_quality"].
+
+Unlike tools/query_normalizer (lowercased fingerprints for cache keys),
+this keeps case and punctuation because the output is shown to agents.
+
+Fast-path rate and per-text time over recorded complaint texts:
+    python -m tools.keluhan_normalizer keluhan.txt
+    python -m tools.keluhan_normalizer keluhan.txt --min-quality 0.8 --show 20
+"""
+import re
+import sys
+import time
+import argparse
+from typing import Dict, List, Optional, Tuple
+from config.api_config import KELUHAN_NORMALIZER_CONFIG
+
+# Complaint slang / abbreviations -> formal Indonesian (keys lowercase)
+KELUHAN_LEXICON = {
+    # negation
+    'ga': 'tidak', 'gak': 'tidak', 'gk': 'tidak', 'nggak': 'tidak', 'ngga': 'tidak',
+    'enggak': 'tidak', 'engga': 'tidak', 'tdk': 'tidak', 'tak': 'tidak', 'kagak': 'tidak',
+    'gabisa': 'tidak bisa', 'gbs': 'tidak bisa', 'gakbisa': 'tidak bisa', 'tdkbisa': 'tidak bisa',
+    'blm': 'belum', 'blum': 'belum', 'belom': 'belum',
+    # function words
+    'yg': 'yang', 'dgn': 'dengan', 'dg': 'dengan', 'utk': 'untuk', 'untk': 'untuk',
+    'krn': 'karena', 'karna': 'karena', 'tp': 'tetapi', 'tpi': 'tetapi', 'jg': 'juga', 'dr': 'dari',
+    'dlm': 'dalam', 'sm': 'sama', 'sdh': 'sudah', 'udh': 'sudah', 'udah': 'sudah', 'dah': 'sudah',
+    'msh': 'masih', 'masi': 'masih', 'lg': 'lagi', 'aja': 'saja', 'trs': 'terus', 'trus': 'terus',
+    'bs': 'bisa', 'bsa': 'bisa', 'pdhl': 'padahal', 'sdgkan': 'sedangkan', 'klo': 'kalau',
+    'kalo': 'kalau', 'kl': 'kalau', 'gmn': 'bagaimana', 'knp': 'kenapa', 'bbrp': 'beberapa',
+    'sktr': 'sekitar', 'bnyk': 'banyak', 'sy': 'saya', 'sll': 'selalu', 'dll': 'dan lain-lain',
+    'dsb': 'dan sebagainya', 'spt': 'seperti', 'kyk': 'seperti', 'kayak': 'seperti',
+    'bgt': 'sekali', 'banget': 'sekali', 'bngt': 'sekali', 'skali': 'sekali', 'jd': 'jadi', 'jdi': 'jadi',
+    'dpt': 'dapat', 'stlh': 'setelah', 'sblm': 'sebelum', 'gimana': 'bagaimana', 'tetep': 'tetap',
+    'abis': 'habis', 'cuma': 'hanya', 'mo': 'mau', 'kenceng': 'kencang',
+    'ngeluh': 'mengeluh', 'komplain': 'mengeluhkan', 'benerin': 'perbaiki', 'dibenerin': 'diperbaiki',
+    # time
+    'kmrn': 'kemarin', 'kemaren': 'kemarin', 'skrg': 'sekarang', 'tgl': 'tanggal', 'jm': 'jam',
+    'hr': 'hari', 'bln': 'bulan', 'mgg': 'minggu', 'sjk': 'sejak',
+    # places / people
+    'rmh': 'rumah', 'dkt': 'dekat', 'kntr': 'kantor', 'jln': 'jalan', 'jl': 'jalan', 'tmpt': 'tempat', 'org': 'orang',
+    'plgn': 'pelanggan', 'pelgn': 'pelanggan', 'cust': 'pelanggan', 'customer': 'pelanggan',
+    # telco
+    'ilang': 'hilang', 'lemot': 'lambat', 'lelet': 'lambat', 'lola': 'lambat',
+    'signal': 'sinyal', 'sinyl': 'sinyal', 'jaringanya': 'jaringannya', 'internetan': 'menggunakan internet',
+    'tlp': 'telepon', 'telp': 'telepon', 'tlpn': 'telepon', 'telpon': 'telepon', 'nelp': 'menelepon',
+    'nelpon': 'menelepon', 'ditelp': 'ditelepon', 'ditelpon': 'ditelepon',
+    'pake': 'pakai', 'dipake': 'dipakai', 'nmr': 'nomor', 'hp': 'HP', 'sms': 'SMS',
+    'apn': 'APN', 'bts': 'BTS', 'wifi': 'WiFi', 'yt': 'YouTube', 'wa': 'WhatsApp', 'ig': 'Instagram',
+    '3g': '3G', '4g': '4G', '5g': '5G', 'lte': 'LTE', 'volte': 'VoLTE', 'sim': 'SIM', 'pln': 'PLN',
+    'msisdn': 'MSISDN',
+    # multi-word phrases
+    'gak bisa': 'tidak bisa', 'ga bisa': 'tidak bisa', 'ga ada': 'tidak ada', 'gak ada': 'tidak ada',
+    'no hp': 'nomor HP', 'drop call': 'panggilan terputus', 'putus nyambung': 'putus-sambung', 'ilang timbul': 'hilang timbul',
+    'ga konek': 'tidak dapat terhubung', 'gak konek': 'tidak dapat terhubung', 'konek': 'terhubung'
+}
+
+# Unmapped on purpose: more than one reading, or informal particles the LLM should drop
+AMBIGUOUS_TOKENS = {
+    'ket',                # ketika / keterangan
+    'call',               # panggilan / menelepon ("tidak bisa call")
+    'pas',                # saat / tepat
+    'suka',               # sering / senang
+    'bilang', 'nih', 'sih', 'dong', 'deh', 'kok', 'tuh', 'loh', 'kan', 'ya'
+}
+
+# Formal words of at most 3 letters; other short lowercase tokens count as abbreviations
+SHORT_WORDS = {
+    'di', 'ke', 'se', 'si', 'ini', 'itu', 'dan', 'ada', 'apa', 'per', 'pun', 'dia', 'mau',
+    'hal', 'jam', 'dua', 'ibu', 'pak', 'bar', 'air', 'cek', 'isi', 'atm', 'otp', 'on', 'off'
+}
+
+_VOWELS = set('aeiouAEIOU')
+_STRETCHED = re.compile(r'([a-zA-Z])\1{2,}')
+_REDUPLICATED = re.compile(r'^([a-z]{2,})2(an|nya)?$')
+
+
+class KeluhanNormalizer:
+    """Single-pass lexicon/rule rewrite plus a quality score of the result"""
+
+    def __init__(self, lexicon: Optional[Dict[str, str]] = None):
+        self.lexicon = {key.lower(): value for key, value in (lexicon or KELUHAN_LEXICON).items()}
+        self._formal_words = {word.lower() for value in self.lexicon.values() for word in re.findall(r'\w+', value)}
+        phrases = sorted((key for key in self.lexicon if ' ' in key), key=len, reverse=True)
+        # Phrases first (longest wins), then any word token
+        phrase_alternatives = ''.join(
+            r'\b' + r'\s+'.join(re.escape(part) for part in phrase.split()) + r'\b|' for phrase in phrases)
+        self._token_pattern = re.compile('(' + phrase_alternatives + r'\w+)', re.IGNORECASE)
+
+    def _replace(self, match: re.Match) -> str:
+        token = match.group(0)
+        key = ' '.join(token.lower().split())
+        replacement = self.lexicon.get(key)
+        if replacement is None and ' ' not in key:
+            reduplicated = _REDUPLICATED.match(key)
+            if reduplicated:
+                base = self.lexicon.get(reduplicated.group(1), reduplicated.group(1))
+                replacement = f"{base}-{base}{reduplicated.group(2) or ''}"
+            elif key.isalpha():
+                squeezed = _STRETCHED.sub(r'\1', key)
+                if squeezed != key:
+                    replacement = self.lexicon.get(squeezed, squeezed)
+        if replacement is None:
+            return token
+        # Keep a leading capital ("Ga bisa" -> "Tidak bisa"), never lowercase acronyms
+        if token[0].isupper() and replacement[0].islower():
+            return replacement[0].upper() + replacement[1:]
+        return replacement
+
+    def rewrite(self, text: str) -> str:
+        """Lexicon/rule rewrite, whitespace collapsed, first letter capitalized"""
+        text = ' '.join((text or '').split()).strip(' "\'')
+        text = self._token_pattern.sub(self._replace, text)
+        return text[:1].upper() + text[1:]
+
+    def quality_score(self, text: str) -> float:
+        """Share of word tokens that look like formal words (1.0 = nothing left for the LLM to fix)"""
+        tokens = re.findall(r'\w+', text or '')
+        if not tokens:
+            return 0.0
+        suspicious = 0
+        for token in tokens:
+            if token.isupper() or token[0].isdigit():
+                continue       # acronyms (BTS, 4G), numbers, masked MSISDN (0812xxxx), units (10mbps)
+            lowered = token.lower()
+            if lowered in AMBIGUOUS_TOKENS:
+                suspicious += 1
+            elif any(char.isdigit() for char in token) or (len(token) >= 2 and not _VOWELS.intersection(token)):
+                suspicious += 1
+            elif len(token) <= 3 and lowered not in SHORT_WORDS and lowered not in self._formal_words:
+                suspicious += 1
+        return round(1 - suspicious / len(tokens), 3)
+
+    def normalize(self, text: str) -> Tuple[str, float]:
+        """(rewritten text, quality score of the rewrite)"""
+        rewritten = self.rewrite(text)
+        return rewritten, self.quality_score(rewritten)
+
+
+keluhan_normalizer = KeluhanNormalizer()
+
+
+def fast_path_report(texts: List[str], min_quality: Optional[float] = None) -> Dict:
+    """How many texts skip the LLM at min_quality, and normalizer time per text"""
+    min_quality = KELUHAN_NORMALIZER_CONFIG["min_quality"] if min_quality is None else min_quality
+    rows = []
+    start = time.perf_counter()
+    for text in texts:
+        rows.append((text, *keluhan_normalizer.normalize(text)))
+    elapsed = time.perf_counter() - start
+    fast = [row for row in rows if row[2] >= min_quality]
+    return {
+        "texts": len(rows),
+        "min_quality": min_quality,
+        "fast_path": len(fast),
+        "fast_path_rate": round(len(fast) / len(rows), 4) if rows else 0.0,
+        "us_per_text": round(elapsed / len(rows) * 1e6, 1) if rows else 0.0,
+        "rows": rows
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keluhan normalizer fast-path rate over raw complaint texts")
+    parser.add_argument("path", help="Text file, one raw keluhan per line")
+    parser.add_argument("--min-quality", type=float, help="Score threshold (default: KELUHAN_MIN_QUALITY)")
+    parser.add_argument("--show", type=int, default=10, help="Print N texts that would still go to the LLM")
+    args = parser.parse_args()
+
+    with open(args.path, 'r', encoding='utf-8') as f:
+        texts = [line.strip() for line in f if line.strip()]
+    report = fast_path_report(texts, args.min_quality)
+
+    print(f"📊 {report['texts']} texts, min quality {report['min_quality']}")
+    print(f"   Fast path (no LLM): {report['fast_path']} ({report['fast_path_rate']:.1%})")
+    print(f"   Normalizer time:    {report['us_per_text']} µs/text")
+    slow = [row for row in report['rows'] if row[2] < report['min_quality']]
+    if slow and args.show:
+        print(f"\n🤖 Still sent to the LLM (first {args.show}):")
+        for raw, rewritten, score in slow[:args.show]:
+            print(f"   {score:.2f}  {raw}\n         -> {rewritten}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
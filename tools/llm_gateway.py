@@ -0,0 +1,182 @@
+# tools/llm_gateway.py
+import os
+import json
+import time
+import threading
+import requests
+from typing import Dict, Any, List, Optional, Tuple
+from tools import tracing
+from config.api_config import OLLAMA_CONFIG, LLM_MODEL_MAP, LLM_TASK_OPTIONS
+
+
+class LLMGatewayError(Exception):
+    """Ollama unreachable or returned a non-200 response"""
+
+
+class LLMGateway:
+    """Single entry point for Ollama /api/generate calls
+
+    One pooled HTTP session per process and one base URL (OLLAMA_BASE_URL)
+    instead of a new connection and a hard-coded host at every call site.
+
+    Call sites pass their static instructions as `system` and only the
+    per-request text as `prompt`: the rendered prompt then starts with the
+    same tokens every time and Ollama reuses that prefix's KV cache instead
+    of re-evaluating it (per parallel slot, see OLLAMA_NUM_PARALLEL).
+    """
+
+    def __init__(self, base_url: Optional[str] = None, default_model: Optional[str] = None,
+                 timeout: float = 120):
+        self.base_url = (base_url or os.getenv("OLLAMA_BASE_URL", "http://host.docker.internal:11434")).rstrip("/")
+        self.default_model = default_model or os.getenv("OLLAMA_MODEL", "llama3")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.keep_alive = OLLAMA_CONFIG["keep_alive"]
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "total_seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0}
+        self.warm_up_report = {}
+        print(f"🤖 LLMGateway initialized ({self.base_url}, model: {self.default_model})")
+
+    def model_for(self, task: Optional[str] = None) -> str:
+        """Model configured for a call site in LLM_MODEL_MAP, else the default model"""
+        return LLM_MODEL_MAP.get(task) or self.default_model
+
+    def generate(self, prompt: str, model: Optional[str] = None, temperature: float = 0.0,
+                 options: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None,
+                 system: Optional[str] = None, task: Optional[str] = None,
+                 format: Optional[Any] = None) -> str:
+        """Non-streaming completion, returns the response text
+
+        `task` picks the model from LLM_MODEL_MAP (an explicit `model` wins)
+        and output caps from LLM_TASK_OPTIONS (explicit `options` win).
+        `format` is "json" or a JSON schema dict.
+
+        Raises:
+            LLMGatewayError: connection failure or non-200 status
+        """
+        payload = {
+            "model": model or self.model_for(task),
+            "prompt": prompt,
+            "stream": False,
+            "keep_alive": self.keep_alive,
+            "options": {"temperature": temperature, **LLM_TASK_OPTIONS.get(task, {}), **(options or {})}
+        }
+        if system is not None:
+            payload["system"] = system
+        if format is not None:
+            payload["format"] = format
+        result = self._post("/api/generate", payload, timeout)
+        self._record_usage(result)
+        return result.get("response", "")
+
+    def generate_json(self, prompt: str, schema: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        """Completion constrained to `schema`, parsed with a single json.loads
+
+        Raises:
+            LLMGatewayError: request failed or the output is not a JSON object (e.g. cut by num_predict)
+        """
+        format = schema if OLLAMA_CONFIG["json_schema"] else "json"
+        text = self.generate(prompt, format=format, **kwargs)
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise LLMGatewayError(f"Invalid JSON from model: {text[:200]!r}") from e
+        if not isinstance(data, dict):
+            raise LLMGatewayError(f"Expected a JSON object, got: {text[:200]!r}")
+        return data
+
+    def warm_up(self, system_prompts: Optional[List[Tuple[str, Optional[str]]]] = None) -> Dict[str, Any]:
+        """Load the models and evaluate each (system prompt, model) once so its prefix is cached"""
+        timeout = OLLAMA_CONFIG["warm_up_timeout_seconds"]
+        report = {}
+        for system, model in system_prompts or [("", None)]:
+            model = model or self.default_model
+            start = time.perf_counter()
+            try:
+                # One output token is enough to have the whole system prompt evaluated
+                self._post("/api/generate", {
+                    "model": model, "system": system, "prompt": ".", "stream": False,
+                    "keep_alive": self.keep_alive, "options": {"num_predict": 1, "temperature": 0.0}
+                }, timeout)
+                report.setdefault(model, []).append(round(time.perf_counter() - start, 2))
+            except LLMGatewayError as e:
+                print(f"⚠️ LLM warm-up failed ({model}): {e}")
+                report.setdefault(model, []).append(None)
+        print(f"🔥 LLM warm-up done: {report}")
+        self.warm_up_report = report
+        return report
+
+    def start_warm_up(self, system_prompts: Optional[List[Tuple[str, Optional[str]]]] = None):
+        """warm_up() on a daemon thread (OLLAMA_WARM_UP=false disables it)"""
+        if not OLLAMA_CONFIG["warm_up"]:
+            return None
+        thread = threading.Thread(target=self.warm_up, args=(system_prompts,), name="llm-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def ping(self, timeout: float = 3) -> Dict[str, Any]:
+        """Ollama reachable and every configured model pulled (GET /api/tags)"""
+        try:
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=timeout)
+            if response.status_code != 200:
+                return {"ok": False, "error": f"HTTP {response.status_code}"}
+            available = {model.get("name", "") for model in response.json().get("models", [])}
+            available |= {name.split(":")[0] for name in available if name.endswith(":latest")}
+            missing = sorted(model for model in self.configured_models() if model not in available)
+            return {"ok": not missing, "model": self.default_model, "models_available": len(available),
+                    **({"error": f"models not pulled: {', '.join(missing)}"} if missing else {})}
+        except requests.RequestException as e:
+            return {"ok": False, "error": str(e)[:200]}
+
+    def configured_models(self) -> List[str]:
+        return sorted({self.default_model} | {model for model in LLM_MODEL_MAP.values() if model})
+
+    def _post(self, path: str, payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        try:
+            response = self.session.post(f"{self.base_url}{path}", json=payload, timeout=timeout or self.timeout)
+        except requests.RequestException as e:
+            self._record(0.0, error=True)
+            raise LLMGatewayError(f"Ollama request failed: {e}") from e
+
+        self._record(response.elapsed.total_seconds() if response.elapsed else 0.0,
+                     error=response.status_code != 200)
+        if response.status_code != 200:
+            raise LLMGatewayError(f"Ollama API error: {response.status_code}")
+        return response.json()
+
+    def _record(self, seconds: float, error: bool = False):
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["total_seconds"] += seconds
+            if error:
+                self.stats["errors"] += 1
+
+    def _record_usage(self, result: Dict[str, Any]):
+        """Real token counts from Ollama, per process and per request (tools/tracing.py)"""
+        tracing.record_llm_call(result)
+        with self._lock:
+            self.stats["prompt_tokens"] += result.get("prompt_eval_count") or 0
+            self.stats["completion_tokens"] += result.get("eval_count") or 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests_made = self.stats["requests"]
+            return {
+                "base_url": self.base_url,
+                "default_model": self.default_model,
+                "models": {task: self.model_for(task) for task in LLM_MODEL_MAP},
+                "keep_alive": self.keep_alive,
+                "warm_up": self.warm_up_report,
+                **self.stats,
+                "avg_seconds": round(self.stats["total_seconds"] / requests_made, 3) if requests_made else 0.0
+            }
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Process-wide gateway from the component registry"""
+    from tools.component_registry import get_component
+    return get_component("llm_gateway")
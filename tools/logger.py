@@ -0,0 +1,175 @@
+# tools/logger.py
+"""Level-gated, sampled logging with a background writer thread.
+
+    log = get_logger("query_builder")
+    log.debug("Entities: %s", entities)            # no formatting unless DEBUG is on
+    log.info("Query executed", extra=fields(rows=12, ms=41.2))
+
+Records go onto a bounded queue and a QueueListener thread formats and
+writes them, so the request thread never formats or touches stdout. Pass
+arguments (%s style) instead of f-strings: a disabled level then costs one
+integer comparison. When the queue is full records are dropped and counted
+instead of blocking the request.
+"""
+import os
+import sys
+import json
+import queue
+import atexit
+import random
+import logging
+import threading
+import logging.handlers
+from typing import Any, Dict, Optional
+from config.api_config import LOGGING_CONFIG
+
+ROOT_LOGGER = "nsqm"
+
+_setup_lock = threading.Lock()
+_listener = None
+_queue_handler = None
+
+
+def fields(**values) -> Dict[str, Any]:
+    """Structured key/values for extra= (rendered as key=value or JSON fields)"""
+    return {"fields": values}
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of DEBUG records; INFO and above always pass"""
+
+    def __init__(self, debug_sample_rate: float):
+        super().__init__()
+        self.debug_sample_rate = debug_sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.debug_sample_rate >= 1.0:
+            return True
+        return random.random() < self.debug_sample_rate
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread
+
+    The stock prepare() formats the message in the calling thread; here the
+    record is queued as-is. Arguments are formatted later, so they should
+    not be mutated after the call (entity dicts on the hot path are not).
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class StructuredFormatter(logging.Formatter):
+    """Text: `time LEVEL logger message key=value ...`; json: one object per line"""
+
+    def __init__(self, output_format: str = "text"):
+        super().__init__("%(asctime)s %(levelname)s %(name)s %(message)s")
+        self.output_format = output_format
+
+    def format(self, record: logging.LogRecord) -> str:
+        extra_fields = getattr(record, "fields", None) or {}
+        if self.output_format == "json":
+            entry = {
+                "ts": self.formatTime(record),
+                "level": record.levelname,
+                "logger": record.name,
+                "message": record.getMessage(),
+                "thread": record.threadName,
+                **extra_fields
+            }
+            if record.exc_info:
+                entry["exc"] = self.formatException(record.exc_info)
+            return json.dumps(entry, ensure_ascii=False, default=str)
+
+        text = super().format(record)
+        if extra_fields:
+            text += " " + " ".join(f"{key}={value}" for key, value in extra_fields.items())
+        return text
+
+
+def setup_logging(level: Optional[str] = None, async_writer: Optional[bool] = None,
+                  debug_sample_rate: Optional[float] = None, output_format: Optional[str] = None,
+                  stream=None) -> logging.Logger:
+    """(Re)configure the nsqm logger tree; arguments override LOGGING_CONFIG"""
+    global _listener, _queue_handler
+    level = (level or LOGGING_CONFIG["level"]).upper()
+    async_writer = LOGGING_CONFIG["async_writer"] if async_writer is None else async_writer
+    debug_sample_rate = LOGGING_CONFIG["debug_sample_rate"] if debug_sample_rate is None else debug_sample_rate
+    output_format = output_format or LOGGING_CONFIG["format"]
+
+    with _setup_lock:
+        _stop_listener()
+        root = logging.getLogger(ROOT_LOGGER)
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.setLevel(getattr(logging, level, logging.INFO))
+        root.propagate = False
+
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(StructuredFormatter(output_format))
+
+        if async_writer:
+            _queue_handler = DeferredQueueHandler(queue.Queue(maxsize=LOGGING_CONFIG["queue_size"]))
+            _queue_handler.addFilter(SamplingFilter(debug_sample_rate))
+            _listener = logging.handlers.QueueListener(_queue_handler.queue, output, respect_handler_level=False)
+            _listener.start()
+            root.addHandler(_queue_handler)
+        else:
+            output.addFilter(SamplingFilter(debug_sample_rate))
+            root.addHandler(output)
+        return root
+
+
+def _stop_listener():
+    """Flush queued records and stop the writer thread"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        try:
+            _listener.stop()
+        except Exception:
+            pass
+    _listener = None
+    _queue_handler = None
+
+
+def _restart_after_fork():
+    # The writer thread does not survive fork(); a worker gets its own queue + thread
+    global _listener, _queue_handler, _setup_lock
+    _setup_lock = threading.Lock()
+    if _listener is not None:
+        _listener = None
+        _queue_handler = None
+        setup_logging()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Child of the nsqm logger; configures logging on first use"""
+    if not logging.getLogger(ROOT_LOGGER).handlers:
+        setup_logging()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def get_logging_stats() -> Dict[str, Any]:
+    root = logging.getLogger(ROOT_LOGGER)
+    return {
+        "level": logging.getLevelName(root.level),
+        "async_writer": _queue_handler is not None,
+        "queued": _queue_handler.queue.qsize() if _queue_handler else 0,
+        "dropped": _queue_handler.dropped if _queue_handler else 0
+    }
+
+
+atexit.register(_stop_listener)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
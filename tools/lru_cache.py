@@ -0,0 +1,115 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+
+class LRUCache:
+    """Thread-safe bounded LRU cache with optional TTL and hit/miss counters"""
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: Optional[float] = None, name: str = "cache"):
+        """
+        Initialize cache
+
+        Args:
+            max_entries: Maximum number of entries before least recently used are evicted
+            ttl_seconds: Entry lifetime in seconds (None = no expiry)
+            name: Label used in logs and stats
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.name = name
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return cached value and mark it most recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, stored_at = entry
+            if self.ttl_seconds is not None and time.time() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        """Store value, evicting least recently used entries over capacity"""
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return entry[0] if entry else default
+
+    def clear(self):
+        """Drop all entries (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+        print(f"💾 {self.name} CLEARED")
+
+    def export_entries(self) -> List[Tuple[Hashable, Any, float]]:
+        """Live entries as (key, value, stored_at), least recently used first (for snapshots)"""
+        now = time.time()
+        with self._lock:
+            return [
+                (key, value, stored_at)
+                for key, (value, stored_at) in self._entries.items()
+                if self.ttl_seconds is None or now - stored_at <= self.ttl_seconds
+            ]
+
+    def load_entries(self, entries: List[Tuple[Hashable, Any, float]]) -> int:
+        """Restore exported entries keeping their original age; live entries win"""
+        now = time.time()
+        loaded = 0
+        with self._lock:
+            for key, value, stored_at in entries:
+                if key in self._entries:
+                    continue
+                if self.ttl_seconds is not None and now - stored_at > self.ttl_seconds:
+                    continue
+                self._entries[key] = (value, stored_at)
+                loaded += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return loaded
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
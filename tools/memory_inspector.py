@@ -0,0 +1,178 @@
+# tools/memory_inspector.py
+"""Per-component memory estimates and tracemalloc snapshot diffs (GET/POST /admin/memory).
+
+    memory_inspector.register("query_result", lambda: estimate_entries(cache.export_entries()))
+
+Estimates walk the Python objects a component holds (sys.getsizeof over
+containers, shared objects counted once), so they show which cache or
+store grows, not exact RSS. Model weights are counted from their tensors.
+Native memory (Chroma's HNSW index, sqlite pages) is invisible here; it
+shows up as the gap between process RSS and the component total.
+
+tracemalloc is off by default (it slows allocation ~2x). POST
+/admin/memory/snapshot starts it and keeps a baseline; each later call
+returns the allocation growth since the baseline by source line.
+"""
+import sys
+import time
+import types
+import threading
+import tracemalloc
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from config.api_config import MEMORY_INSPECTOR_CONFIG
+
+_ATOMIC_TYPES = (str, bytes, bytearray, int, float, bool, type(None))
+# Shared by the whole program - following them would measure the interpreter, not the component
+_SHARED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+
+def deep_sizeof(obj: Any, seen: Optional[set] = None, budget: Optional[List[int]] = None) -> int:
+    """Approximate bytes reachable from obj (containers, __dict__/__slots__, numpy/torch buffers)"""
+    seen = set() if seen is None else seen
+    budget = [MEMORY_INSPECTOR_CONFIG["max_objects_per_item"]] if budget is None else budget
+    stack = [obj]
+    total = 0
+    while stack and budget[0] > 0:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        budget[0] -= 1
+        nbytes = None if isinstance(current, _ATOMIC_TYPES) else getattr(current, "nbytes", None)
+        if isinstance(nbytes, int):
+            total += nbytes      # numpy / torch buffer (getsizeof misses data held by a view)
+            continue
+        try:
+            total += sys.getsizeof(current)
+        except TypeError:
+            continue
+        if isinstance(current, _ATOMIC_TYPES + _SHARED_TYPES):
+            continue
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        else:
+            if hasattr(current, "__dict__"):
+                stack.append(vars(current))
+            for slot in getattr(type(current), "__slots__", ()):
+                if hasattr(current, slot):
+                    stack.append(getattr(current, slot))
+    return total
+
+
+def estimate_entries(entries: Iterable[Tuple], top: Optional[int] = None) -> Dict[str, Any]:
+    """Entry count, total bytes and largest items of exported cache entries ((key, value, ...) tuples)"""
+    top = top or MEMORY_INSPECTOR_CONFIG["top_items"]
+    sizes = []
+    seen = set()
+    for entry in entries:
+        key, value = entry[0], entry[1]
+        sizes.append((deep_sizeof(key, seen) + deep_sizeof(value, seen), key))
+    sizes.sort(key=lambda item: item[0], reverse=True)
+    return {
+        "entries": len(sizes),
+        "bytes": sum(size for size, _ in sizes),
+        "largest": [{"key": str(key)[:120], "bytes": size} for size, key in sizes[:top]]
+    }
+
+
+def estimate_model(model: Any) -> Dict[str, Any]:
+    """Parameter + buffer bytes of a torch module (e.g. SentenceTransformer)"""
+    tensors = list(model.parameters()) + list(model.buffers())
+    return {
+        "entries": len(tensors),
+        "bytes": sum(tensor.numel() * tensor.element_size() for tensor in tensors),
+        "largest": []
+    }
+
+
+class MemoryInspector:
+    """Named component estimators plus on-demand tracemalloc diffs"""
+
+    def __init__(self):
+        self._estimators = {}
+        self._baseline = None
+        self._baseline_at = None
+        self._lock = threading.Lock()
+
+    def register(self, name: str, estimate_fn: Callable[[], Optional[Dict[str, Any]]]):
+        """estimate_fn returns {"entries", "bytes", "largest", ...} or None when the component is not built"""
+        self._estimators[name] = estimate_fn
+
+    def get_report(self) -> Dict[str, Any]:
+        start = time.perf_counter()
+        components = {}
+        for name, estimate_fn in self._estimators.items():
+            try:
+                estimate = estimate_fn()
+            except Exception as e:
+                estimate = {"error": str(e)}
+            components[name] = estimate if estimate is not None else {"status": "not_initialized"}
+        return {
+            "components": components,
+            "total_estimated_mb": round(sum(c.get("bytes") or 0 for c in components.values()) / (1024 * 1024), 1),
+            "tracemalloc": self.tracemalloc_status(),
+            "seconds": round(time.perf_counter() - start, 3)
+        }
+
+    def tracemalloc_status(self) -> Dict[str, Any]:
+        if not tracemalloc.is_tracing():
+            return {"tracing": False}
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "tracing": True,
+            "traced_mb": round(current / (1024 * 1024), 1),
+            "peak_traced_mb": round(peak / (1024 * 1024), 1),
+            "baseline_age_seconds": round(time.time() - self._baseline_at, 1) if self._baseline_at else None
+        }
+
+    def _take_snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            tracemalloc.Filter(False, "<unknown>")
+        ))
+
+    def snapshot(self, reset_baseline: bool = False, top: Optional[int] = None) -> Dict[str, Any]:
+        """Start tracing + baseline on first call; afterwards the growth since the baseline"""
+        top = top or MEMORY_INSPECTOR_CONFIG["top_items"]
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(MEMORY_INSPECTOR_CONFIG["tracemalloc_frames"])
+                self._baseline = None
+            if self._baseline is None or reset_baseline:
+                self._baseline = self._take_snapshot()
+                self._baseline_at = time.time()
+                print("🔍 tracemalloc baseline taken")
+                return {"baseline": True, **self.tracemalloc_status()}
+
+            current = self._take_snapshot()
+            stats = current.compare_to(self._baseline, "lineno")
+            growth = [stat for stat in stats if stat.size_diff > 0][:top]
+            return {
+                "baseline": False,
+                **self.tracemalloc_status(),
+                "growth_mb": round(sum(stat.size_diff for stat in stats) / (1024 * 1024), 2),
+                "top_growth": [
+                    {
+                        "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                        "size_diff_kb": round(stat.size_diff / 1024, 1),
+                        "count_diff": stat.count_diff,
+                        "size_kb": round(stat.size / 1024, 1)
+                    }
+                    for stat in growth
+                ]
+            }
+
+    def stop_tracing(self) -> Dict[str, Any]:
+        with self._lock:
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+            self._baseline = None
+            self._baseline_at = None
+        return {"tracing": False}
+
+
+memory_inspector = MemoryInspector()
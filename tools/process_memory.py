@@ -0,0 +1,74 @@
+# tools/process_memory.py
+"""RSS/PSS of this process and its sibling workers (Linux /proc, ru_maxrss elsewhere).
+
+PSS splits shared pages between the processes mapping them, so the sum of
+worker PSS is the real footprint of a prefork deployment; RSS counts the
+copy-on-write embedding weights once per worker.
+"""
+import os
+import resource
+from typing import Dict, List, Optional, Any
+
+_SMAPS_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty", "Swap")
+
+
+def _read_kb_fields(path: str, fields) -> Dict[str, int]:
+    values = {}
+    try:
+        with open(path, "r") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in fields:
+                    values[key] = int(rest.split()[0])
+    except (OSError, ValueError, IndexError):
+        pass
+    return values
+
+
+def get_memory_usage(pid: Optional[int] = None) -> Dict[str, Any]:
+    """Memory of one process in MB (rss, pss, shared, private, peak)"""
+    pid = pid or os.getpid()
+    status = _read_kb_fields(f"/proc/{pid}/status", ("VmRSS", "VmHWM"))
+    smaps = _read_kb_fields(f"/proc/{pid}/smaps_rollup", _SMAPS_FIELDS)
+
+    if not status and pid == os.getpid():
+        # No /proc (macOS dev machines): only peak RSS is available (bytes on macOS, KB on Linux)
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_mb = max_rss / (1024 * 1024) if os.uname().sysname == "Darwin" else max_rss / 1024
+        return {"pid": pid, "rss_mb": None, "pss_mb": None, "peak_rss_mb": round(peak_mb, 1)}
+
+    def mb(kb: Optional[int]) -> Optional[float]:
+        return round(kb / 1024, 1) if kb is not None else None
+
+    return {
+        "pid": pid,
+        "rss_mb": mb(status.get("VmRSS")),
+        "peak_rss_mb": mb(status.get("VmHWM")),
+        "pss_mb": mb(smaps.get("Pss")),
+        "shared_mb": mb(smaps.get("Shared_Clean", 0) + smaps.get("Shared_Dirty", 0)) if smaps else None,
+        "private_mb": mb(smaps.get("Private_Clean", 0) + smaps.get("Private_Dirty", 0)) if smaps else None,
+        "swap_mb": mb(smaps.get("Swap"))
+    }
+
+
+def get_child_pids(pid: int) -> List[int]:
+    children = []
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children", "r") as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        pass
+    return children
+
+
+def get_worker_memory(master_pid: Optional[int] = None) -> Dict[str, Any]:
+    """Memory of every worker forked by the master (gunicorn) plus totals"""
+    master_pid = master_pid or os.getppid()
+    workers = [get_memory_usage(pid) for pid in get_child_pids(master_pid)]
+    return {
+        "master": get_memory_usage(master_pid),
+        "workers": workers,
+        "total_rss_mb": round(sum(w["rss_mb"] or 0 for w in workers), 1),
+        "total_pss_mb": round(sum(w["pss_mb"] or 0 for w in workers), 1)
+    }
@@ -0,0 +1,188 @@
+# tools/query_normalizer.py
+"""Canonical query normalization + fingerprint shared by all cache layers.
+
+"Berapa keluhan di Jaksel bulan ini?" and "berapa komplain jakarta selatan bulan ini"
+normalize to the same text and therefore the same fingerprint.
+
+Offline duplicate-rate report over recorded traffic:
+    python -m tools.query_normalizer traffic.jsonl
+    python -m tools.query_normalizer queries.txt --top 20
+"""
+import re
+import json
+import hashlib
+import argparse
+from collections import Counter
+from typing import Dict, List, Optional
+
+# Location aliases -> canonical name (also the default gazetteer of SmartQueryBuilder)
+LOCATION_ALIASES = {
+    'jakbar': 'Jakarta Barat', 'jakarta barat': 'Jakarta Barat',
+    'jaksel': 'Jakarta Selatan', 'jakarta selatan': 'Jakarta Selatan',
+    'jaktim': 'Jakarta Timur', 'jakarta timur': 'Jakarta Timur',
+    'jakut': 'Jakarta Utara', 'jakarta utara': 'Jakarta Utara',
+    'jakpus': 'Jakarta Pusat', 'jakarta pusat': 'Jakarta Pusat',
+    'jakarta': 'Jakarta', 'bandung': 'Bandung', 'surabaya': 'Surabaya'
+}
+
+# Indonesian chat slang / abbreviations (single tokens)
+SLANG = {
+    'yg': 'yang', 'blm': 'belum', 'blum': 'belum', 'sdh': 'sudah', 'udh': 'sudah', 'udah': 'sudah',
+    'gk': 'tidak', 'ga': 'tidak', 'gak': 'tidak', 'nggak': 'tidak', 'ngga': 'tidak',
+    'enggak': 'tidak', 'tdk': 'tidak', 'tak': 'tidak',
+    'brp': 'berapa', 'jml': 'jumlah', 'bln': 'bulan', 'mgg': 'minggu', 'pekan': 'minggu',
+    'hr': 'hari', 'kmrn': 'kemarin', 'kemaren': 'kemarin', 'skrg': 'sekarang',
+    'dgn': 'dengan', 'utk': 'untuk', 'dr': 'dari', 'krn': 'karena', 'tgl': 'tanggal',
+    'komplain': 'keluhan', 'komplen': 'keluhan', 'complain': 'keluhan', 'complaint': 'keluhan',
+    'jkt': 'jakarta', 'bdg': 'bandung', 'sby': 'surabaya',
+    'tiket': 'ticket', 'gmn': 'gimana'
+}
+
+# Time phrase variants -> phrases used in semantic_mapping.yaml time_expressions
+TIME_PHRASES = {
+    'minggu kemarin': 'minggu lalu', 'bulan kemarin': 'bulan lalu',
+    'hari kemarin': 'kemarin', 'bulan sekarang': 'bulan ini', 'minggu sekarang': 'minggu ini',
+    'hari sekarang': 'hari ini'
+}
+
+# Politeness / filler words that never change meaning
+FILLER_WORDS = {'tolong', 'mohon', 'dong', 'ya', 'yah', 'nih', 'sih', 'deh', 'kak', 'gan', 'please', 'pls'}
+
+
+class QueryNormalizer:
+    """Lowercase, strip punctuation, expand slang, canonicalize locations/time phrases"""
+
+    def __init__(self, location_aliases: Optional[Dict[str, str]] = None):
+        self.slang = SLANG
+        self.filler_words = FILLER_WORDS
+
+        phrases = dict(TIME_PHRASES)
+        locations = set()
+        for alias, canonical in (location_aliases or LOCATION_ALIASES).items():
+            phrases[alias.lower()] = canonical.lower()
+            locations.add(canonical.lower())
+        self.phrases = phrases
+
+        # Longest phrase first so "jakarta selatan" wins over "jakarta"
+        alternatives = sorted(phrases, key=len, reverse=True)
+        self._phrase_pattern = re.compile(r'\b(' + '|'.join(re.escape(p) for p in alternatives) + r')\b')
+
+        # "di jakarta selatan" == "jakarta selatan"
+        location_alternatives = '|'.join(re.escape(l) for l in sorted(locations, key=len, reverse=True))
+        self._locative_pattern = re.compile(r'\bdi (?=(?:' + location_alternatives + r')\b)')
+
+    def normalize(self, query: str) -> str:
+        """Canonical text form of a query"""
+        text = re.sub(r'[^\w\s-]', ' ', (query or '').lower())
+        text = re.sub(r'(?<!\w)-|-(?!\w)', ' ', text)
+
+        words = []
+        for word in text.split():
+            word = self.slang.get(word, word)
+            if word not in self.filler_words:
+                words.append(word)
+
+        text = ' '.join(words)
+        text = self._phrase_pattern.sub(lambda match: self.phrases[match.group(1)], text)
+        return self._locative_pattern.sub('', text)
+
+    def fingerprint(self, query: str) -> str:
+        """Stable short hash of the normalized query"""
+        return hashlib.sha1(self.normalize(query).encode('utf-8')).hexdigest()[:16]
+
+
+_default_normalizer = None
+
+
+def get_normalizer() -> QueryNormalizer:
+    """Shared normalizer with the default gazetteer"""
+    global _default_normalizer
+    if _default_normalizer is None:
+        _default_normalizer = QueryNormalizer()
+    return _default_normalizer
+
+
+def fingerprint(query: str) -> str:
+    return get_normalizer().fingerprint(query)
+
+
+def load_recorded_queries(path: str) -> List[str]:
+    """Read queries from plain text (one per line) or JSONL traffic logs
+
+    JSONL lines may carry "user_query", "query", or OpenAI-style "messages"
+    (last user message is used).
+    """
+    queries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if not line.startswith('{'):
+                queries.append(line)
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            query = record.get('user_query') or record.get('query')
+            if not query and record.get('messages'):
+                user_messages = [m.get('content', '') for m in record['messages'] if m.get('role') == 'user']
+                query = user_messages[-1] if user_messages else None
+            if query:
+                queries.append(query)
+    return queries
+
+
+def duplicate_report(queries: List[str], normalizer: Optional[QueryNormalizer] = None, top: int = 10) -> Dict:
+    """Duplicate rate by raw text vs by fingerprint (= upper bound on cache hit rate)"""
+    normalizer = normalizer or get_normalizer()
+    total = len(queries)
+    raw_counts = Counter(q.strip() for q in queries)
+    fingerprint_counts = Counter()
+    examples = {}
+    for query in queries:
+        normalized = normalizer.normalize(query)
+        fingerprint_counts[normalized] += 1
+        examples.setdefault(normalized, set()).add(query.strip())
+
+    def rate(counts):
+        return round((total - len(counts)) / total, 4) if total else 0.0
+
+    return {
+        "total_queries": total,
+        "unique_raw": len(raw_counts),
+        "unique_fingerprints": len(fingerprint_counts),
+        "duplicate_rate_raw": rate(raw_counts),
+        "duplicate_rate_fingerprint": rate(fingerprint_counts),
+        "top_fingerprints": [
+            {"normalized": text, "count": count, "variants": sorted(examples[text])[:5]}
+            for text, count in fingerprint_counts.most_common(top)
+        ]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure duplicate rate of recorded queries")
+    parser.add_argument("path", help="Text file (one query per line) or JSONL traffic log")
+    parser.add_argument("--top", type=int, default=10, help="Show N most repeated fingerprints")
+    parser.add_argument("--json", action="store_true", help="Print raw JSON report")
+    args = parser.parse_args()
+
+    report = duplicate_report(load_recorded_queries(args.path), top=args.top)
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+
+    print(f"📊 Total queries: {report['total_queries']}")
+    print(f"   Unique raw text:     {report['unique_raw']} (duplicate rate {report['duplicate_rate_raw']:.1%})")
+    print(f"   Unique fingerprints: {report['unique_fingerprints']} (duplicate rate {report['duplicate_rate_fingerprint']:.1%})")
+    print(f"\n🔁 Top {args.top} fingerprints:")
+    for item in report['top_fingerprints']:
+        print(f"   {item['count']:>5}x  {item['normalized']}")
+        for variant in item['variants']:
+            print(f"          - {variant}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+# tools/query_recorder.py
+"""Record ClickHouse results against the real server and replay them offline.
+
+CLICKHOUSE_MODE=record  wraps the real client: every (SQL, params) -> result set,
+                        server-side read_rows/elapsed and client wall time is
+                        kept and written to CLICKHOUSE_RECORDING_PATH (gzip pickle)
+CLICKHOUSE_MODE=replay  never connects: answers from the recording after the
+                        recorded latency x CLICKHOUSE_REPLAY_LATENCY_SCALE
+                        (0 = no delay); unrecorded SQL raises RecordingMissError
+
+Keys are SQL with whitespace collapsed plus the JSON parameters, so a change
+in generated SQL is a miss by design. See benchmarks/replay_diff.py.
+"""
+import os
+import gzip
+import json
+import time
+import atexit
+import pickle
+import hashlib
+import threading
+from typing import Any, Dict, Optional
+from config.api_config import CLICKHOUSE_REPLAY_CONFIG
+
+RECORDING_FORMAT_VERSION = 1
+
+
+class RecordingMissError(Exception):
+    """Replay mode got SQL that is not in the recording"""
+
+
+def recording_key(sql: str, parameters: Optional[Dict] = None) -> str:
+    normalized = " ".join(sql.split())
+    params = json.dumps(parameters or {}, sort_keys=True, default=str)
+    return hashlib.sha1(f"{normalized}\x00{params}".encode("utf-8")).hexdigest()
+
+
+def summary_stats(summary: Optional[Dict[str, Any]], client_ms: float) -> Dict[str, Any]:
+    """read_rows / read_bytes / elapsed_ms from a ClickHouse query summary"""
+    summary = summary or {}
+
+    def number(key: str) -> Optional[int]:
+        try:
+            return int(summary[key])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    elapsed_ns = number("elapsed_ns")
+    return {
+        "read_rows": number("read_rows"),
+        "read_bytes": number("read_bytes"),
+        "elapsed_ms": round(elapsed_ns / 1e6, 2) if elapsed_ns is not None else round(client_ms, 2),
+        "client_ms": round(client_ms, 2)
+    }
+
+
+class RecordedResult:
+    """Replayed result with the QueryResult attributes the app reads"""
+
+    def __init__(self, entry: Dict[str, Any]):
+        self.column_names = tuple(entry["column_names"])
+        self.result_rows = [tuple(row) for row in entry["rows"]]
+        self.summary = dict(entry.get("summary") or {})
+        if "elapsed_ns" not in self.summary and entry.get("stats"):
+            # Report the recorded timing, not the replay's own wall time
+            self.summary["elapsed_ns"] = str(int(entry["stats"]["elapsed_ms"] * 1e6))
+
+    @property
+    def first_row(self):
+        return self.result_rows[0] if self.result_rows else None
+
+
+class QueryRecording:
+    """In-memory recording, flushed atomically to a gzip pickle"""
+
+    def __init__(self, path: Optional[str] = None, flush_every: Optional[int] = None):
+        self.path = path or CLICKHOUSE_REPLAY_CONFIG["path"]
+        self.flush_every = flush_every or CLICKHOUSE_REPLAY_CONFIG["flush_every"]
+        self.entries = {}   # key -> entry
+        self._lock = threading.Lock()
+        self._unflushed = 0
+        self.stats = {"recorded": 0, "hits": 0, "misses": 0}
+
+    def load(self) -> int:
+        if not os.path.exists(self.path):
+            return 0
+        with gzip.open(self.path, "rb") as f:
+            payload = pickle.load(f)
+        if payload.get("version") != RECORDING_FORMAT_VERSION:
+            print(f"⚠️ Recording {self.path} has format {payload.get('version')}, expected {RECORDING_FORMAT_VERSION}")
+            return 0
+        with self._lock:
+            self.entries.update(payload["entries"])
+        return len(payload["entries"])
+
+    def add(self, sql: str, parameters: Optional[Dict], result: Any, client_ms: float):
+        entry = {
+            "sql": " ".join(sql.split()),
+            "parameters": parameters,
+            "column_names": list(getattr(result, "column_names", None) or []),
+            "rows": [tuple(row) for row in (getattr(result, "result_rows", None) or [])],
+            "summary": dict(getattr(result, "summary", None) or {}),
+            "client_ms": client_ms,
+            "recorded_at": time.time()
+        }
+        entry["stats"] = summary_stats(entry["summary"], client_ms)
+        with self._lock:
+            self.entries[recording_key(sql, parameters)] = entry
+            self.stats["recorded"] += 1
+            self._unflushed += 1
+            should_flush = self._unflushed >= self.flush_every
+        if should_flush:
+            self.flush()
+
+    def get(self, sql: str, parameters: Optional[Dict] = None) -> Optional[Dict[str, Any]]:
+        entry = self.entries.get(recording_key(sql, parameters))
+        with self._lock:
+            self.stats["hits" if entry is not None else "misses"] += 1
+        return entry
+
+    def flush(self):
+        with self._lock:
+            if not self._unflushed and os.path.exists(self.path):
+                return
+            payload = {"version": RECORDING_FORMAT_VERSION, "created_at": time.time(), "entries": dict(self.entries)}
+            self._unflushed = 0
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with gzip.open(tmp_path, "wb", compresslevel=6) as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"path": self.path, "entries": len(self.entries), **self.stats}
+
+
+class RecordingClient:
+    """Pass-through client that records every query result"""
+
+    def __init__(self, client: Any, recording: QueryRecording):
+        self._client = client
+        self.recording = recording
+
+    def query(self, sql: str, parameters: Optional[Dict] = None, settings: Optional[Dict] = None, **kwargs):
+        start = time.perf_counter()
+        result = self._client.query(sql, parameters=parameters, settings=settings, **kwargs)
+        self.recording.add(sql, parameters, result, (time.perf_counter() - start) * 1000)
+        return result
+
+    def __getattr__(self, name: str):
+        return getattr(self._client, name)
+
+
+class ReplayClient:
+    """Serves recorded results without a server"""
+
+    def __init__(self, recording: QueryRecording, latency_scale: Optional[float] = None):
+        self.recording = recording
+        self.latency_scale = CLICKHOUSE_REPLAY_CONFIG["latency_scale"] if latency_scale is None else latency_scale
+
+    def query(self, sql: str, parameters: Optional[Dict] = None, settings: Optional[Dict] = None, **kwargs):
+        if " ".join(sql.split()).upper() in ("SELECT 1", "SELECT 1 AS TEST"):
+            return RecordedResult({"column_names": ["1"], "rows": [(1,)]})
+        entry = self.recording.get(sql, parameters)
+        if entry is None:
+            raise RecordingMissError(f"No recorded result for query: {' '.join(sql.split())[:200]}")
+        if self.latency_scale:
+            time.sleep(entry["stats"]["elapsed_ms"] * self.latency_scale / 1000)
+        return RecordedResult(entry)
+
+    def command(self, *args, **kwargs):
+        return None
+
+    def close(self):
+        pass
+
+
+_recording = None
+_recording_lock = threading.Lock()
+
+
+def get_recording() -> QueryRecording:
+    """Process-wide recording (loaded once, flushed at exit)"""
+    global _recording
+    with _recording_lock:
+        if _recording is None:
+            _recording = QueryRecording()
+            loaded = _recording.load()
+            print(f"📼 ClickHouse recording {_recording.path}: {loaded} entries loaded")
+            atexit.register(_recording.flush)
+        return _recording
+
+
+def wrap_client_factory(get_client, mode: Optional[str] = None):
+    """Apply CLICKHOUSE_MODE to a clickhouse_connect-style get_client"""
+    mode = mode or CLICKHOUSE_REPLAY_CONFIG["mode"]
+    if mode == "record":
+        return lambda **kwargs: RecordingClient(get_client(**kwargs), get_recording())
+    if mode == "replay":
+        return lambda **kwargs: ReplayClient(get_recording())
+    return get_client
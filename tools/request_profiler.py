@@ -0,0 +1,184 @@
+# tools/request_profiler.py
+"""Opt-in sampling profiler for a single chat request.
+
+    curl -H "X-Profile: 1" -H "X-Admin-Token: $ADMIN_TOKEN" .../v1/chat/completions ...
+    -> response header X-Profile-Id: 20250812T101500_summary_3f2a
+    curl -H "X-Admin-Token: $ADMIN_TOKEN" .../admin/profiles/<id> > request.folded
+
+A sampler thread reads the request thread's Python stack every interval_ms
+(sys._current_frames) until the request ends. Samples are written in the
+folded-stack format (flamegraph.pl, speedscope, inferno), each stack rooted
+at the tracing spans open at that moment, e.g.
+    request;[sql_build];[clickhouse_query];execute_query (tools/direct_database_tool.py:412);...
+so classification, SQL building, DB decode, narrative and chart time sit
+under their own stage. Requests without the header and token never get
+here: the only cost is the header check in before_request.
+"""
+import os
+import re
+import sys
+import hmac
+import time
+import uuid
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from config.api_config import PROFILER_CONFIG
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILE_ID_PATTERN = re.compile(r"^[0-9A-Za-z_]+$")
+
+# One profile at a time: the sampler holds the GIL often enough to skew a second one
+_active = threading.Semaphore(1)
+
+
+def is_authorized(token: Optional[str]) -> bool:
+    expected = PROFILER_CONFIG["admin_token"]
+    return bool(expected) and bool(token) and hmac.compare_digest(token, expected)
+
+
+def should_profile(headers) -> bool:
+    """X-Profile requested with a valid X-Admin-Token"""
+    if not PROFILER_CONFIG["admin_token"]:
+        return False
+    flag = headers.get("X-Profile", "")
+    return flag.lower() in ("1", "true", "yes") and is_authorized(headers.get("X-Admin-Token"))
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    path = code.co_filename
+    if path.startswith(REPO_ROOT):
+        path = os.path.relpath(path, REPO_ROOT)
+    else:
+        path = os.path.basename(path)
+    # First line of the function, so samples from one function fold together
+    return f"{code.co_name} ({path}:{code.co_firstlineno})".replace(";", ":")
+
+
+class SamplingProfiler:
+    """Samples one thread's stack on a background thread"""
+
+    def __init__(self, thread_id: int, interval_ms: Optional[float] = None, max_depth: Optional[int] = None,
+                 max_seconds: Optional[float] = None):
+        self.thread_id = thread_id
+        self.interval = (interval_ms or PROFILER_CONFIG["interval_ms"]) / 1000
+        self.max_depth = max_depth or PROFILER_CONFIG["max_depth"]
+        self.max_seconds = max_seconds or PROFILER_CONFIG["max_seconds"]
+        self.samples = []     # (perf_counter, stack outermost-first)
+        self.started = None
+        self.stopped = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> "SamplingProfiler":
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        deadline = self.started + self.max_seconds
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            if now > deadline:
+                break
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                stack.reverse()
+                self.samples.append((now, tuple(stack)))
+
+    def stop(self) -> "SamplingProfiler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        self.stopped = time.perf_counter()
+        return self
+
+    def folded(self, intervals: Optional[List[Tuple[str, float, float]]] = None, root: str = "request") -> str:
+        """Folded stacks ("frame;frame;frame count" per line), prefixed with the open spans"""
+        intervals = sorted(intervals or [], key=lambda item: (item[1], -item[2]))
+        counts = {}
+        for timestamp, stack in self.samples:
+            stages = [f"[{stage}]" for stage, start, end in intervals if start <= timestamp <= end]
+            key = ";".join([root] + stages + list(stack))
+            counts[key] = counts.get(key, 0) + 1
+        return "\n".join(f"{key} {count}" for key, count in sorted(counts.items())) + "\n"
+
+
+class ProfileStore:
+    """Folded profiles on disk, newest `keep` retained"""
+
+    def __init__(self, directory: Optional[str] = None, keep: Optional[int] = None):
+        self.directory = directory or PROFILER_CONFIG["directory"]
+        self.keep = keep or PROFILER_CONFIG["keep"]
+
+    def _path(self, profile_id: str) -> Optional[str]:
+        if not PROFILE_ID_PATTERN.match(profile_id or ""):
+            return None
+        return os.path.join(self.directory, f"{profile_id}.folded")
+
+    def save(self, folded: str, workflow: str) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        workflow = re.sub(r"[^0-9A-Za-z]", "", workflow or "unknown") or "unknown"
+        profile_id = f"{datetime.now():%Y%m%dT%H%M%S}_{workflow}_{uuid.uuid4().hex[:4]}"
+        with open(self._path(profile_id), "w", encoding="utf-8") as f:
+            f.write(folded)
+        self._prune()
+        return profile_id
+
+    def load(self, profile_id: str) -> Optional[str]:
+        path = self._path(profile_id)
+        if path is None or not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def list(self) -> List[Dict[str, Any]]:
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if name.endswith(".folded"):
+                path = os.path.join(self.directory, name)
+                profiles.append({"id": name[:-len(".folded")], "bytes": os.path.getsize(path)})
+        return profiles
+
+    def _prune(self):
+        for profile in self.list()[self.keep:]:
+            try:
+                os.remove(self._path(profile["id"]))
+            except OSError:
+                pass
+
+
+profile_store = ProfileStore()
+
+
+def start_request_profile() -> Optional[SamplingProfiler]:
+    """Start sampling the calling thread; None if another profile is running"""
+    if not _active.acquire(blocking=False):
+        return None
+    try:
+        return SamplingProfiler(threading.get_ident()).start()
+    except Exception:
+        _active.release()
+        raise
+
+
+def finish_request_profile(profiler: SamplingProfiler, trace: Any = None) -> Dict[str, Any]:
+    """Stop sampling, store the folded profile and return its id"""
+    try:
+        profiler.stop()
+    finally:
+        _active.release()
+    workflow = getattr(trace, "workflow", "unknown")
+    folded = profiler.folded(getattr(trace, "intervals", None))
+    profile_id = profile_store.save(folded, workflow)
+    print(f"🔬 Profile {profile_id}: {len(profiler.samples)} samples in "
+          f"{(profiler.stopped - profiler.started) * 1000:.0f}ms")
+    return {"id": profile_id, "samples": len(profiler.samples)}
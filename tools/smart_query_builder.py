@@ -1,20 +1,53 @@
 # tools/smart_query_builder.py (MODIFIED)
+import os
 import yaml
 import re
 import json
-from typing import Dict, Any, List
+import math
+import copy
+from typing import Dict, Any, List, Optional
+from config.api_config import (APPROXIMATE_QUERY_CONFIG, QUERY_GUARD_CONFIG, QUERY_PLAN_CACHE_CONFIG,
+                               FINGERPRINT_CACHE_CONFIG, KELUHAN_NORMALIZER_CONFIG)
+from tools.lru_cache import LRUCache
+from tools.tracing import span
+from tools.logger import get_logger
+from tools.direct_database_tool import append_guard_note
+from tools.query_normalizer import QueryNormalizer, LOCATION_ALIASES
+
+log = get_logger("query_builder")
 
 class SmartQueryBuilder:
-    def __init__(self, use_direct_db=True):
-        """Initialize with option to use direct database or MCP"""
-        self.semantic_mapping = self.load_semantic_mapping()
-        self.table_name = self.semantic_mapping.get('table_name', 'inap_ticketing_customer_complain')
+    MAPPING_PATH = 'config/semantic_mapping.yaml'
+    
+    # Default gazetteer (alias -> canonical location); extended by "gazetteer" in semantic_mapping.yaml
+    DEFAULT_LOCATION_MAPPINGS = LOCATION_ALIASES
+    
+    # Plan/result caches shared by all builder instances (workflows each own a builder)
+    _plan_cache = LRUCache(
+        max_entries=QUERY_PLAN_CACHE_CONFIG.get("max_entries", 512),
+        ttl_seconds=QUERY_PLAN_CACHE_CONFIG.get("ttl_seconds"),
+        name="QueryPlanCache"
+    )
+    _result_cache = LRUCache(
+        max_entries=FINGERPRINT_CACHE_CONFIG["result"].get("max_entries", 256),
+        ttl_seconds=FINGERPRINT_CACHE_CONFIG["result"].get("ttl_seconds"),
+        name="QueryResultCache"
+    )
+    
+    def __init__(self, use_direct_db=True, db_tool=None):
+        """Initialize with option to use direct database or MCP (db_tool: shared DirectDatabaseTool)"""
         self.use_direct_db = use_direct_db
+        self.approx_config = APPROXIMATE_QUERY_CONFIG
+        self.use_sampling = QUERY_GUARD_CONFIG.get("table_has_sampling_key", False)
+        self.plan_cache_config = QUERY_PLAN_CACHE_CONFIG
+        self._apply_semantic_mapping(self.load_semantic_mapping())
         
         # Initialize appropriate database tool
         if self.use_direct_db:
-            from tools.direct_database_tool import DirectDatabaseTool
-            self.db_tool = DirectDatabaseTool()
+            if db_tool is None:
+                from tools.direct_database_tool import DirectDatabaseTool
+                db_tool = DirectDatabaseTool()
+            self.db_tool = db_tool
             print("✅ SmartQueryBuilder using DirectDatabaseTool")
         # else:
         #     from tools.mcp_database_tool import MCPDatabaseTool
@@ -24,23 +57,141 @@ class SmartQueryBuilder:
     def load_semantic_mapping(self):
         """Load semantic mapping from YAML or JSON file"""
         try:
-            with open('config/semantic_mapping.yaml', 'r', encoding='utf-8') as f:
+            self._mapping_mtime = os.path.getmtime(self.MAPPING_PATH)
+            with open(self.MAPPING_PATH, 'r', encoding='utf-8') as f:
                 data = yaml.safe_load(f)
                 print("[LOG] semantic_mapping.yaml loaded successfully.")
                 return data
         except Exception as e:
             print(f"Error loading semantic mapping: {e}")
+            self._mapping_mtime = None
             return {}
 
+    def _apply_semantic_mapping(self, semantic_mapping: Dict[str, Any]):
+        """Set mapping-derived attributes (table, full-text config, gazetteer)"""
+        self.semantic_mapping = semantic_mapping or {}
+        self.table_name = self.semantic_mapping.get('table_name', 'inap_ticketing_customer_complain')
+        self.fulltext_config = self.semantic_mapping.get('fulltext_search', {})
+        self.location_mappings = {**self.DEFAULT_LOCATION_MAPPINGS, **self.semantic_mapping.get('gazetteer', {})}
+        self.normalizer = QueryNormalizer(self.location_mappings)
+        self._location_words = {
+            word for name in list(self.location_mappings) + list(self.location_mappings.values())
+            for word in name.lower().split()
+        }
+        # Synonyms of the structured fields (status, customer type, ...) are consumed as entities
+        fulltext_fields = set(self.fulltext_config.get('fields', []))
+        self._entity_words = {
+            word for field_name, field_info in self.semantic_mapping.get('field_mappings', {}).items()
+            if field_name not in fulltext_fields
+            for synonym in field_info.get('nlq_synonyms', []) for word in synonym.lower().split()
+        }
+
+    def reload_semantic_mapping(self):
+        """Reload semantic mapping + gazetteer and invalidate cached plans"""
+        self._apply_semantic_mapping(self.load_semantic_mapping())
+        self.clear_plan_cache()
+        self.clear_result_cache()
+
+    def _check_mapping_reload(self):
+        """Reload when semantic_mapping.yaml changed on disk"""
+        try:
+            mtime = os.path.getmtime(self.MAPPING_PATH)
+        except OSError:
+            return
+        if mtime != self._mapping_mtime:
+            print("[LOG] semantic_mapping.yaml changed, reloading")
+            self.reload_semantic_mapping()
+
+    def _plan_cache_key(self, user_query: str, context: Dict = None, enhanced_context: Dict = None) -> str:
+        """Query fingerprint + the context fields that change the plan"""
+        relevant_context = {}
+        if enhanced_context:
+            for field in self.plan_cache_config.get("context_fields", []):
+                if enhanced_context.get(field):
+                    relevant_context[field] = enhanced_context[field]
+        if context:
+            for key, value in context.items():
+                if key.startswith('last_') and value:
+                    relevant_context[key] = value
+        
+        return json.dumps([self.normalizer.fingerprint(user_query), relevant_context], sort_keys=True, default=str)
+
+    def build_plan(self, user_query: str, context: Dict = None, enhanced_context: Dict = None) -> Dict[str, Any]:
+        """Detect intent, extract entities and build SQL, memoized per query fingerprint
+
+        The plan is built from the normalized query so every phrasing that shares
+        a fingerprint (slang, abbreviations, location aliases) gets the same plan.
+        """
+        use_cache = self.plan_cache_config.get("enabled", True)
+        self._check_mapping_reload()
+        cache_key = self._plan_cache_key(user_query, context, enhanced_context)
+        
+        if use_cache:
+            cached_plan = self._plan_cache.get(cache_key)
+            if cached_plan is not None:
+                log.debug("💾 Query plan cache HIT: %s", cached_plan['intent'])
+                return copy.deepcopy(cached_plan)
+        
+        normalized_query = self.normalizer.normalize(user_query)
+        intent = self.detect_intent(normalized_query)
+        log.debug("🔍 Detected Intent: %s", intent)
+        
+        entities = self.extract_all_entities(normalized_query, context, enhanced_context)
+        log.debug("🧠 Entities: %s", entities)
+        
+        # ✅ FIX: Ensure entities is always a dict
+        if not isinstance(entities, dict):
+            log.warning("🔧 Converting entities from %s to dict", type(entities))
+            entities = {}
+        
+        # ✅ FIX: Validate entities structure
+        validated_entities = {}
+        for key, value in entities.items():
+            if isinstance(value, (list, dict, str)):
+                validated_entities[key] = value
+            elif isinstance(value, tuple):
+                log.debug("🔧 Converting tuple to list for key: %s", key)
+                validated_entities[key] = list(value)
+            else:
+                log.debug("🔧 Converting %s to string for key: %s", type(value), key)
+                validated_entities[key] = str(value)
+        
+        plan = {
+            "intent": intent,
+            "entities": validated_entities,
+            "sql": self.build_sql(intent, validated_entities),
+            "cache_key": cache_key
+        }
+        
+        if use_cache and plan["sql"]:
+            self._plan_cache.set(cache_key, copy.deepcopy(plan))
+        
+        return plan
+
+    @classmethod
+    def clear_plan_cache(cls):
+        cls._plan_cache.clear()
+
+    @classmethod
+    def get_plan_cache_stats(cls) -> Dict[str, Any]:
+        """Plan cache hit rate and size"""
+        return cls._plan_cache.get_stats()
+
+    @classmethod
+    def clear_result_cache(cls):
+        cls._result_cache.clear()
+
+    @classmethod
+    def get_result_cache_stats(cls) -> Dict[str, Any]:
+        return cls._result_cache.get_stats()
+
     def analyze_and_build_query(self, user_query: str, context: Dict = None) -> Dict[str, Any]:
-        intent = self.detect_intent(user_query)
-        entities = self.extract_all_entities(user_query, context)
-        sql = self.build_sql(intent, entities)
+        plan = self.build_plan(user_query, context)
         return {
-            "intent": intent,
-            "entities": entities,
-            "sql": sql,
-            "context_for_next": self.build_context(user_query, entities)
+            "intent": plan["intent"],
+            "entities": plan["entities"],
+            "sql": plan["sql"],
+            "context_for_next": self.build_context(user_query, plan["entities"])
         }
 
     def detect_intent(self, query: str) -> str:
@@ -96,12 +247,12 @@ class SmartQueryBuilder:
         
         # Apply enhanced context from follow-up FIRST
         if enhanced_context:
-            print(f"[DEBUG] Applying enhanced context: {enhanced_context}")
+            log.debug("Applying enhanced context: %s", enhanced_context)
             
             # Use complete geographic entities if available
             if enhanced_context.get('complete_geo_entities'):
                 entities['geographic'] = enhanced_context['complete_geo_entities']
-                print(f"[DEBUG] Using complete geo entities: {len(entities['geographic'])} fields")
+                log.debug("Using complete geo entities: %s fields", len(entities['geographic']))
             
             # Fallback: Create from location value if no complete entities
             elif enhanced_context.get('inherit_location') and enhanced_context.get('location'):
@@ -137,6 +288,12 @@ class SmartQueryBuilder:
         if detail_entities:
             entities['detail'] = detail_entities
         
+        # Full-text terms on description ("keluhan tentang sinyal hilang")
+        if 'fulltext' not in entities:
+            fulltext_entities = self.extract_fulltext_entities(query_lower)
+            if fulltext_entities:
+                entities['fulltext'] = fulltext_entities
+        
         # Existing entity extraction logic (only if not already set by enhanced context)
         field_mappings = self.semantic_mapping.get('field_mappings', {})
         for field_name, field_info in field_mappings.items():
@@ -233,18 +390,81 @@ class SmartQueryBuilder:
         
         return entities
 
+    def extract_fulltext_entities(self, query_lower: str) -> List[Dict]:
+        """Extract free-text search terms following a trigger word (tentang, terkait, ...)"""
+        config = self.fulltext_config
+        fields = config.get('fields', [])
+        if not fields:
+            return []
+        
+        words = re.findall(r'[a-z0-9]+', query_lower)
+        trigger_words = set(config.get('trigger_words', []))
+        stop_words = set(config.get('stop_words', []))
+        # Interrogatives, aggregation words and entity words never become required tokens
+        ignore_words = set(config.get('ignore_words', [])) | set(config.get('non_content_words', [])) | self._entity_words
+        separator = config.get('alternative_separator', 'atau')
+        min_length = config.get('min_term_length', 3)
+        
+        start = next((i + 1 for i, word in enumerate(words) if word in trigger_words), None)
+        if start is None:
+            return []
+        
+        terms = []
+        for word in words[start:]:
+            # Location names end the topic ("sinyal hilang bandung")
+            if word in stop_words or word in self._location_words:
+                break
+            if word == separator:
+                terms.append(word)
+            elif word not in ignore_words and len(word) >= min_length:
+                terms.append(word)
+            if len(terms) >= config.get('max_terms', 4):
+                break
+        
+        # Drop dangling separators ("sinyal atau" -> "sinyal")
+        while terms and terms[-1] == separator:
+            terms.pop()
+        while terms and terms[0] == separator:
+            terms.pop(0)
+        if not terms:
+            return []
+        
+        value = ' '.join(terms)
+        log.debug("Full-text terms: %s", value)
+        return [{'field': field, 'value': value, 'search_type': 'fulltext'} for field in fields]
+
+    def _build_fulltext_condition(self, field: str, value: str) -> str:
+        """Build hasToken/multiSearchAny predicate backed by tokenbf/ngrambf skip indexes
+
+        Words are ANDed and matched as whole tokens (tokenbf_v1). Alternatives joined
+        by "atau" become one multiSearchAny (ngrambf_v1), which also matches suffixed
+        forms like "sinyalnya".
+        """
+        separator = self.fulltext_config.get('alternative_separator', 'atau')
+        groups = []
+        for word in re.findall(r'[a-z0-9]+', value.lower()):
+            if word == separator and groups:
+                groups[-1].append(None)
+            elif groups and groups[-1] and groups[-1][-1] is None:
+                groups[-1][-1] = word
+            else:
+                groups.append([word])
+        
+        conditions = []
+        for group in groups:
+            alternatives = [word for word in group if word]
+            if len(alternatives) == 1:
+                conditions.append(f"hasToken(lower({field}), '{alternatives[0]}')")
+            elif alternatives:
+                needles = ', '.join(f"'{word}'" for word in alternatives)
+                conditions.append(f"multiSearchAny(lower({field}), [{needles}])")
+        
+        return f"({' AND '.join(conditions)})" if conditions else '1=1'
+
     def extract_geographic_entities(self, query_lower: str) -> List[Dict]:
         geographic_fields = self.semantic_mapping.get("semantic_categories", {}).get("geographic", {}).get("fields", [])
-        location_mappings = {
-            'jakbar': 'Jakarta Barat', 'jakarta barat': 'Jakarta Barat',
-            'jaksel': 'Jakarta Selatan', 'jakarta selatan': 'Jakarta Selatan',
-            'jaktim': 'Jakarta Timur', 'jakarta timur': 'Jakarta Timur',
-            'jakut': 'Jakarta Utara', 'jakarta utara': 'Jakarta Utara',
-            'jakpus': 'Jakarta Pusat', 'jakarta pusat': 'Jakarta Pusat',
-            'jakarta': 'Jakarta', 'bandung': 'Bandung', 'surabaya': 'Surabaya'
-        }
         entities = []
-        for location_key, location_value in location_mappings.items():
+        for location_key, location_value in self.location_mappings.items():
             if location_key in query_lower:
                 for field in geographic_fields:
                     entities.append({
@@ -299,14 +519,14 @@ class SmartQueryBuilder:
             if 'low' in query_lower: return 'Low'
         return None
 
-    def build_sql(self, intent: str, entities: Dict[str, Any]) -> str:
-        print(f"[DEBUG] Building SQL for intent: {intent}")
-        print(f"[DEBUG] Entities: {entities}")
+    def build_sql(self, intent: str, entities: Dict[str, Any], approximate: bool = False) -> str:
+        log.debug("Building SQL for intent: %s (approximate=%s)", intent, approximate)
+        log.debug("Entities: %s", entities)
         
         where_conditions = []
         
         for category, entity_list in entities.items():
-            print(f"[DEBUG] Processing category: {category}")
+            log.debug("Processing category: %s", category)
             
             if category == 'context':
                 continue
@@ -321,36 +541,60 @@ class SmartQueryBuilder:
                 value = entity.get('value') 
                 search_type = entity.get('search_type', 'contains')
                 
-                print(f"[DEBUG] Entity - field: {field}, value: {value}, search_type: {search_type}")
+                log.debug("Entity - field: %s, value: %s, search_type: %s", field, value, search_type)
                 
                 if not field or not value:
-                    print(f"[DEBUG] Skipping entity - missing field or value")
+                    log.debug("Skipping entity - missing field or value")
                     continue
                     
                 if search_type == 'contains':
                     category_conditions.append(f"{field} ILIKE '%{value}%'")
                 elif search_type in ['exact_match', 'categorical']:
                     category_conditions.append(f"{field} = '{value}'")
+                elif search_type == 'fulltext':
+                    category_conditions.append(self._build_fulltext_condition(field, value))
                 elif search_type == 'raw_sql':
                     # FIX: Convert PostgreSQL functions to ClickHouse
                     clickhouse_value = self._convert_to_clickhouse_sql(value)
                     category_conditions.append(clickhouse_value)
                     
-            print(f"[DEBUG] Category conditions for {category}: {category_conditions}")
+            log.debug("Category conditions for %s: %s", category, category_conditions)
             
             if category_conditions:
                 if category == 'geographic':
                     where_conditions.append(f"({' OR '.join(category_conditions)})")
-                elif category == 'detail':
+                elif category in ('detail', 'fulltext'):
                     where_conditions.append(f"({' OR '.join(category_conditions)})")
                 else:
                     where_conditions.extend(category_conditions)
         
         where_clause = ' AND '.join(where_conditions) if where_conditions else '1=1'
-        print(f"[DEBUG] Final WHERE clause: {where_clause}")
+        log.debug("Final WHERE clause: %s", where_clause)
+        
+        # Approximate mode: SAMPLE + scaled count() when the table has a sampling key,
+        # otherwise sketch aggregates (uniqCombined / topK) that need no SAMPLE BY
+        approximate = approximate and intent in ('count', 'summary')
+        sampled = approximate and self.use_sampling
+        from_clause = self.table_name
+        count_expr = "count()"
+        sample_column = ""
+        if sampled:
+            ratio = self.approx_config.get("sample_ratio", 0.1)
+            from_clause = f"{self.table_name} SAMPLE {ratio}"
+            count_expr = f"round(count() * {1 / ratio:g})"
+            sample_column = "count() AS sample_rows,"
+        elif approximate:
+            count_expr = f"uniqCombined({self.approx_config.get('sketch_precision', 17)})(order_id)"
         
         # Build SQL based on intent
-        if intent == 'count':
+        if intent == 'count' and approximate:
+            sql = f"""
+            SELECT {count_expr} AS total_count, {sample_column}
+                topK(3)(kabupaten_kota_create_ticket) AS top_kota
+            FROM {from_clause}
+            WHERE {where_clause}
+            """
+        elif intent == 'count':
             sql = f"SELECT count() AS total_count FROM {self.table_name} WHERE {where_clause}"
         elif intent == 'list':
             sql = f"""
@@ -369,6 +613,19 @@ class SmartQueryBuilder:
             ORDER BY create_time DESC
             LIMIT 1
             """
+        elif intent == 'summary' and approximate and not sampled:
+            # Sketch summary: only the breakdowns the narrative reads, provinces as topK
+            sql = f"""
+            SELECT 
+                business_status,
+                customer_type_create_ticket,
+                {count_expr} AS total_keluhan,
+                topK(3)(provinsi_create_ticket) AS top_provinsi
+            FROM {from_clause}
+            WHERE {where_clause}
+            GROUP BY business_status, customer_type_create_ticket
+            ORDER BY total_keluhan DESC
+            """
         elif intent == 'summary':
             # Handle summary intent - FIX: Use ClickHouse functions
             group_by_time = "DAY"  # Default
@@ -393,20 +650,21 @@ class SmartQueryBuilder:
             sql = f"""
             SELECT 
                 provinsi_create_ticket,
-                count() AS total_keluhan,
+                {count_expr} AS total_keluhan,
+                {sample_column}
                 business_status,
                 customer_type_create_ticket,
                 {date_trunc_func} AS waktu
-            FROM {self.table_name}
+            FROM {from_clause}
             WHERE {where_clause}
             GROUP BY provinsi_create_ticket, business_status, customer_type_create_ticket, waktu
             ORDER BY waktu DESC
             """
         else:
-            print(f"[DEBUG] Unknown intent: {intent}")
+            log.warning("Unknown intent: %s", intent)
             return None
         
-        print(f"[DEBUG] Generated SQL: {sql}")
+        log.debug("Generated SQL: %s", sql)
         return sql.strip() if sql else None
 
     def _convert_to_clickhouse_sql(self, value: str) -> str:
@@ -437,7 +695,7 @@ class SmartQueryBuilder:
         for old_syntax, new_syntax in replacements.items():
             converted_value = converted_value.replace(old_syntax, new_syntax)
         
-        print(f"[DEBUG] Converted SQL: '{value}' -> '{converted_value}'")
+        log.debug("Converted SQL: '%s' -> '%s'", value, converted_value)
         return converted_value
 
     def build_context(self, user_query: str, entities: Dict[str, Any]) -> Dict[str, Any]:
@@ -475,15 +733,26 @@ class SmartQueryBuilder:
         except Exception as e:
             return f"Error formatting response: {str(e)}"
         
-    def execute_query(self, sql_query):
-        """Execute SQL query via appropriate database tool"""
+    def execute_query(self, sql_query, intent=None, entities=None, approximate=False, auto_approximate=False):
+        """Execute SQL query via appropriate database tool (entities let the cost guard rebuild the SQL)
+
+        auto_approximate: let the cost guard switch to the approximate SQL when
+        its EXPLAIN ESTIMATE is above APPROXIMATE_QUERY_CONFIG["auto_threshold_rows"].
+        """
         try:
-            print(f"🔄 Executing query via {'DirectDatabaseTool' if self.use_direct_db else 'MCPDatabaseTool'}...")
+            log.debug("🔄 Executing query via %s...", 'DirectDatabaseTool' if self.use_direct_db else 'MCPDatabaseTool')
             
             if self.use_direct_db:
-                # Use DirectDatabaseTool
-                result = self.db_tool.execute_query(sql_query)
-                print(f"✅ Query executed successfully. Rows returned: {len(result.get('data', []))}")
+                # Use DirectDatabaseTool (intent enables cost guard + limits)
+                rebuild_sql = None
+                approximate_sql = None
+                if intent and entities is not None:
+                    rebuild_sql = lambda narrowed: self.build_sql(intent, narrowed, approximate=approximate)
+                    if auto_approximate:
+                        approximate_sql = lambda narrowed: self.build_sql(intent, narrowed, approximate=True)
+                result = self.db_tool.execute_query(sql_query, intent=intent, entities=entities,
+                                                    rebuild_sql=rebuild_sql, approximate_sql=approximate_sql)
+                log.info("✅ Query executed successfully. Rows returned: %s", len(result.get('data', [])))
                 return result
             else:
                 # Use existing MCP Database Tool
@@ -492,14 +761,14 @@ class SmartQueryBuilder:
                 
                 if result.get("success"):
                     data = result.get("data", [])
-                    print(f"✅ Query executed successfully. Rows returned: {len(data)}")
+                    log.info("✅ Query executed successfully. Rows returned: %s", len(data))
                     return {
                         "success": True,
                         "data": data,
                         "metadata": result.get("metadata", {})
                     }
                 else:
-                    print(f"❌ Query failed: {result}")
+                    log.error("❌ Query failed: %s", result)
                     return {
                         "success": False,
                         "error": result_str
@@ -507,55 +776,47 @@ class SmartQueryBuilder:
                 
         except json.JSONDecodeError as e:
             # Handle non-JSON error responses
-            print(f"❌ Query execution error: {result_str}")
+            log.error("❌ Query execution error: %s", result_str)
             return {
                 "success": False,
                 "error": result_str
             }
         except Exception as e:
-            print(f"❌ Exception during query execution: {str(e)}")
+            log.error("❌ Exception during query execution: %s", str(e))
             return {
                 "success": False,
                 "error": str(e)
             }
 
-    def build_and_execute(self, user_query, enhanced_context=None):
-        """Build SQL and execute it with optional enhanced context"""
-        print(f"🚀 Processing query: {user_query}")
+    def build_and_execute(self, user_query, enhanced_context=None, approximate=None):
+        """Build SQL and execute it with optional enhanced context
+
+        approximate: True/False forces approximate mode, None decides from the
+        query wording and the estimated scan size.
+        """
+        log.info("🚀 Processing query: %s", user_query)
         
         try:
-            # Step 1: Detect intent
-            self.intent = self.detect_intent(user_query)
-            print(f"🔍 Detected Intent: {self.intent}")
-            
-            # Step 2: Extract entities with enhanced context
-            self.entities = self.extract_all_entities(user_query, enhanced_context=enhanced_context)
-            print(f"🧠 Entities: {self.entities}")
-            print(f"🐛 Entities type: {type(self.entities)}")
-            print(f"🐛 Entities content: {self.entities}")
-            
-            # ✅ FIX: Ensure entities is always a dict
-            if not isinstance(self.entities, dict):
-                print(f"🔧 Converting entities from {type(self.entities)} to dict")
-                self.entities = {}
-            
-            # ✅ FIX: Validate entities structure
-            validated_entities = {}
-            for key, value in self.entities.items():
-                if isinstance(value, (list, dict, str)):
-                    validated_entities[key] = value
-                elif isinstance(value, tuple):
-                    print(f"🔧 Converting tuple to list for key: {key}")
-                    validated_entities[key] = list(value)
-                else:
-                    print(f"🔧 Converting {type(value)} to string for key: {key}")
-                    validated_entities[key] = str(value)
-            
-            self.entities = validated_entities
-            print(f"🔧 Validated entities: {self.entities}")
+            # Step 1-3: Intent, entities (with enhanced context) and SQL, memoized
+            with span("sql_build"):
+                plan = self.build_plan(user_query, enhanced_context=enhanced_context)
+            self.intent = plan["intent"]
+            self.entities = plan["entities"]
+            sql_query = plan["sql"]
             
-            # Step 3: Build SQL
-            sql_query = self.build_sql(self.intent, self.entities)
+            # Result cache: same plan + same approximate flag within TTL
+            if approximate is None and enhanced_context:
+                approximate = enhanced_context.get("approximate")
+            result_cache_enabled = FINGERPRINT_CACHE_CONFIG["result"].get("enabled", True) and sql_query
+            result_key = json.dumps([plan["cache_key"], approximate])
+            if result_cache_enabled:
+                cached_result = self._result_cache.get(result_key)
+                if cached_result is not None:
+                    log.info("💾 Query result cache HIT: %s", self.intent)
+                    cached_result = copy.deepcopy(cached_result)
+                    cached_result["user_query"] = user_query
+                    cached_result["execution_result"]["from_cache"] = True
+                    return cached_result
             
             if not sql_query:
                 return {
@@ -566,14 +827,22 @@ class SmartQueryBuilder:
                     "entities": self.entities
                 }
                 
-            print(f"📄 SQL Generated: {sql_query}")
+            # Step 3b: Approximate aggregates for large scopes (None = the cost guard decides
+            # from the EXPLAIN ESTIMATE it runs anyway)
+            use_approximate = self._should_approximate(user_query, enhanced_context, approximate)
+            if use_approximate:
+                with span("sql_build"):
+                    sql_query = self.build_sql(self.intent, self.entities, approximate=True)
+            
+            log.debug("📄 SQL Generated: %s", sql_query)
             
             # Step 4: Execute SQL
-            result = self.execute_query(sql_query)
+            result = self.execute_query(sql_query, intent=self.intent, entities=self.entities,
+                                        approximate=bool(use_approximate), auto_approximate=use_approximate is None)
             
             # ✅ FIX: Validate execution result
             if not isinstance(result, dict):
-                print(f"🔧 Converting execution result from {type(result)} to dict")
+                log.warning("🔧 Converting execution result from %s to dict", type(result))
                 result = {
                     "success": False,
                     "error": f"Unexpected result type: {type(result)}",
@@ -586,7 +855,11 @@ class SmartQueryBuilder:
             if "data" not in result:
                 result["data"] = []
             
-            print(f"🔧 Execution result validated: success={result.get('success')}, data_count={len(result.get('data', []))}")
+            log.debug("🔧 Execution result validated: success=%s, data_count=%s", result.get('success'), len(result.get('data', [])))
+            
+            if (result.get("guard") or {}).get("approximated"):
+                use_approximate = True
+                sql_query = result.get("query", sql_query)
             
             # Step 5: Return complete result
             final_result = {
@@ -598,16 +871,22 @@ class SmartQueryBuilder:
                 "execution_result": result
             }
             
-            print(f"🔧 Final result type check: {type(final_result)}")
-            print(f"🔧 Final result keys: {list(final_result.keys())}")
+            if use_approximate and result.get("success"):
+                final_result["approximation"] = self._approximation_info(result.get("data", []))
+            
+            if result_cache_enabled and result.get("success"):
+                self._result_cache.set(result_key, copy.deepcopy(final_result))
+            
+            log.debug("🔧 Final result type check: %s", type(final_result))
+            log.debug("🔧 Final result keys: %s", list(final_result.keys()))
             
             return final_result
             
         except Exception as e:
             import traceback
             error_trace = traceback.format_exc()
-            print(f"❌ Error in build_and_execute: {str(e)}")
-            print(f"❌ Full traceback: {error_trace}")
+            log.error("❌ Error in build_and_execute: %s", str(e))
+            log.error("❌ Full traceback: %s", error_trace)
             
             return {
                 "success": False,
@@ -618,6 +897,55 @@ class SmartQueryBuilder:
                 "traceback": error_trace
             }
 
+    def _should_approximate(self, user_query: str, enhanced_context: Dict = None,
+                            approximate: Optional[bool] = None) -> Optional[bool]:
+        """Decide whether a count/summary query should run in approximate mode
+
+        True/False when the request flag or the user's wording decides; None
+        leaves it to the cost guard, which switches above auto_threshold_rows
+        using the EXPLAIN ESTIMATE it already runs (no extra round trip here).
+        """
+        config = self.approx_config
+        if not config.get("enabled", True) or self.intent not in config.get("intents", []):
+            return False
+        
+        # Explicit flag from the request wins
+        if approximate is None and enhanced_context:
+            approximate = enhanced_context.get("approximate")
+        if approximate is not None:
+            return bool(approximate)
+        
+        query_lower = user_query.lower()
+        if any(keyword in query_lower for keyword in config.get("keywords", [])):
+            log.info("🎯 Approximate mode requested by user wording")
+            return True
+        
+        # Auto mode needs the cost guard's estimate (DirectDatabaseTool only)
+        return None if self.use_direct_db else False
+
+    def _approximation_info(self, data: List[Dict]) -> Dict[str, Any]:
+        """Approximation method and its relative error bound"""
+        z = self.approx_config.get("confidence_z", 1.96)
+        if self.use_sampling:
+            ratio = self.approx_config.get("sample_ratio", 0.1)
+            sample_rows = sum(row.get("sample_rows", 0) or 0 for row in data)
+            # Relative error of a scaled Bernoulli-sample count at the given confidence
+            error_bound = z * math.sqrt((1 - ratio) / sample_rows) if sample_rows else None
+            return {
+                "method": "sample",
+                "sample_ratio": ratio,
+                "sample_rows": sample_rows,
+                "error_bound": error_bound
+            }
+        
+        precision = self.approx_config.get("sketch_precision", 17)
+        return {
+            "method": "sketch",
+            "function": f"uniqCombined({precision})",
+            # HyperLogLog standard error 1.04/sqrt(2^precision); exact below the HLL switch-over
+            "error_bound": z * 1.04 / math.sqrt(2 ** precision)
+        }
+
     def build_and_execute_with_narrative(self, user_query, enhanced_context=None):
         """Build SQL, execute, and generate narrative using Story Agent"""
         
@@ -638,7 +966,8 @@ class SmartQueryBuilder:
                 location = story_agent.extract_location_from_entities(entities)
                 time_period = story_agent.extract_time_period_from_entities(entities)
                 
-                narrative = story_agent.generate_summary_narrative(data, location, time_period)
+                narrative = story_agent.generate_summary_narrative(data, location, time_period,
+                                                                   result.get("approximation"))
                 result["narrative"] = narrative
                 
             elif intent == 'detail':
@@ -673,7 +1002,16 @@ class SmartQueryBuilder:
                 count = data[0].get('total_count', 0) if data else 0
                 location = self._extract_location_simple(entities)
                 time_period = self._extract_time_simple(entities)
-                result["narrative"] = f"🔢 Ditemukan **{count} keluhan** di {location} {time_period}."
+                approximation = result.get("approximation")
+                if approximation:
+                    from agents.story_agent import StoryAgentSummary
+                    bound = StoryAgentSummary().format_error_bound(approximation)
+                    result["narrative"] = f"🔢 Ditemukan **sekitar {count} keluhan** {bound} di {location} {time_period}."
+                    top_kota = data[0].get('top_kota') if data else None
+                    if top_kota:
+                        result["narrative"] += f"\n\n📍 Kota terbanyak: {', '.join(top_kota)}"
+                else:
+                    result["narrative"] = f"🔢 Ditemukan **{count} keluhan** di {location} {time_period}."
                 
             elif intent == 'list':
                 # Generate detailed complaint examples
@@ -684,10 +1022,16 @@ class SmartQueryBuilder:
                 status_entities = entities.get('status', [])
                 
                 if len(data) > 0:
-                    # Format detailed examples
+                    # Format detailed examples, keluhan rewritten only when it costs no LLM call
+                    # (KELUHAN_LIST_VIEW_REWRITE=true: one batched LLM call for all shown tickets)
+                    from agents.story_agent import StoryAgentSummary
+                    shown = data[:5]  # Show max 5 examples
+                    keluhan_list = StoryAgentSummary().extract_and_improve_keluhan_batch(
+                        [complaint.get('description', '') for complaint in shown],
+                        use_llm=KELUHAN_NORMALIZER_CONFIG["list_view_rewrite"])
                     examples = []
-                    for i, complaint in enumerate(data[:5], 1):  # Show max 5 examples
-                        examples.append(self._format_complaint_example(complaint, i))
+                    for i, (complaint, keluhan) in enumerate(zip(shown, keluhan_list), 1):
+                        examples.append(self._format_complaint_example(complaint, i, keluhan))
                     
                     if status_entities:
                         status_filter = status_entities[0].get('value', '')
@@ -709,6 +1053,10 @@ class SmartQueryBuilder:
             
             else:
                 result["narrative"] = f"📊 Ditemukan {len(data)} record untuk query Anda."
+            
+            # Mention cost-guard narrowing/sampling in the narrative
+            if result.get("narrative"):
+                result["narrative"] = append_guard_note(result["narrative"], result["execution_result"])
         
         return result
 
@@ -719,8 +1067,8 @@ class SmartQueryBuilder:
             return geo_entities[0].get('value', 'lokasi yang diminta')
         return "lokasi yang diminta"
     
-    def _format_complaint_example(self, complaint, index):
-        """Format single complaint as detailed example"""
+    def _format_complaint_example(self, complaint, index, keluhan=None):
+        """Format single complaint as detailed example (keluhan: rewritten Detail Keluhan, if any)"""
         order_id = complaint.get('order_id', 'N/A')
         create_time = complaint.get('create_time', 'N/A')
         description = complaint.get('description', 'N/A')
@@ -765,8 +1113,10 @@ class SmartQueryBuilder:
         # Format customer type
         customer_emoji = "👤" if customer_type == "Konsumen" else "🏢" if customer_type == "Korporat" else "👥"
         
-        # Truncate description and clean it
-        if description and description != 'N/A':
+        # Rewritten keluhan, else truncated description
+        if keluhan and keluhan != 'N/A':
+            short_desc = keluhan
+        elif description and description != 'N/A':
             clean_desc = description.replace('\n', ' ').replace('\r', ' ').strip()
             short_desc = clean_desc[:120] + "..." if len(clean_desc) > 120 else clean_desc
         else:
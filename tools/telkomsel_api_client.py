@@ -3,15 +3,16 @@ import time
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
 import threading
+from config.api_config import TELKOMSEL_API
 
 class TelkomselAPIClient:
     """Client for Telkomsel API with automatic token management"""
     
     def __init__(self):
-        self.app_key = "d23cd17c-b89e-4e88-ac46-3fe0b35e6314"
-        self.app_secret = "c6ce9adb3a026ee61aa05681359cb2c5"
-        self.token_url = "https://10.77.128.111:38443/apigovernance/tokens/aksk"
-        self.query_url = "https://10.77.128.112:28701/apiaccess/cccommon/v1/query/queryHistoryInfo"
+        self.app_key = TELKOMSEL_API["app_key"]
+        self.app_secret = TELKOMSEL_API["app_secret"]
+        self.token_url = TELKOMSEL_API["token_url"]
+        self.query_url = TELKOMSEL_API["query_url"]
         
         self.access_token = None
         self.token_expires_at = None
@@ -238,12 +238,28 @@
 
 
 import re
-import requests
 from datetime import datetime, timedelta
 from typing import Dict, Optional, Tuple
+from tools.llm_gateway import get_llm_gateway
 
 class TimeParser:
     """Parse natural language time expressions to API format"""
+
+    # Static part of the date extraction prompt (Ollama system prompt, prefix reused across calls)
+    DATE_SYSTEM_PROMPT = """Extract date from text.
+
+If date found, return ONLY in this exact format:
+YYYY-MM-DD 00:00,YYYY-MM-DD 23:55
+
+Examples:
+- "1 juli 2025" → "2025-07-01 00:00,2025-07-01 23:55"
+- "01 jul 25" → "2025-07-01 00:00,2025-07-01 23:55"
+- "1jul25" → "2025-07-01 00:00,2025-07-01 23:55"
+- "tanggal 15 agustus 2025" → "2025-08-15 00:00,2025-08-15 23:55"
+- "15/8/25" → "2025-08-15 00:00,2025-08-15 23:55"
+
+If no date found, return: NONE
+"""
     
     def __init__(self):
         # Time expression patterns
@@ -411,53 +427,30 @@ class TimeParser:
     def _extract_date_with_llm(self, text: str) -> Optional[Tuple[str, str]]:
         """Use LLM to extract date and return API format"""
         
-        prompt = f"""Extract date from text: "{text}"
-
-If date found, return ONLY in this exact format:
-YYYY-MM-DD 00:00,YYYY-MM-DD 23:55
-
-Examples:
-- "1 juli 2025" → "2025-07-01 00:00,2025-07-01 23:55"  
-- "01 jul 25" → "2025-07-01 00:00,2025-07-01 23:55"
-- "1jul25" → "2025-07-01 00:00,2025-07-01 23:55"
-- "tanggal 15 agustus 2025" → "2025-08-15 00:00,2025-08-15 23:55"
-- "15/8/25" → "2025-08-15 00:00,2025-08-15 23:55"
-
-If no date found, return: NONE
-
-Text: {text}
+        prompt = f"""Text: {text}
 Answer:"""
 
         try:
-            response = requests.post("http://host.docker.internal:11434/api/generate", 
-                json={
-                    "model": "llama3", 
-                    "prompt": prompt, 
-                    "stream": False,
-                    "options": {"temperature": 0.0}
-                }, timeout=10)
-            
-            if response.status_code == 200:
-                result = response.json()["response"].strip()
+            result = get_llm_gateway().generate(prompt, temperature=0.0, timeout=10, task="date_extraction",
+                                                 system=self.DATE_SYSTEM_PROMPT).strip()
 
-                # Extract the date line (look for YYYY-MM-DD pattern)
-                import re
-                date_match = re.search(r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2},\d{4}-\d{2}-\d{2} \d{2}:\d{2})', result)
+            # Extract the date line (look for YYYY-MM-DD pattern)
+            date_match = re.search(r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2},\d{4}-\d{2}-\d{2} \d{2}:\d{2})', result)
 
-                if date_match:
-                    date_line = date_match.group(1)
-                    parts = date_line.split(",")
-                    if len(parts) == 2:
-                        start_time = parts[0].strip()
-                        end_time = parts[1].strip()
-                        
-                        # Validate format
-                        try:
-                            datetime.strptime(start_time, "%Y-%m-%d %H:%M")
-                            datetime.strptime(end_time, "%Y-%m-%d %H:%M")
-                            return (start_time, end_time)
-                        except ValueError:
-                            pass
+            if date_match:
+                date_line = date_match.group(1)
+                parts = date_line.split(",")
+                if len(parts) == 2:
+                    start_time = parts[0].strip()
+                    end_time = parts[1].strip()
+                    
+                    # Validate format
+                    try:
+                        datetime.strptime(start_time, "%Y-%m-%d %H:%M")
+                        datetime.strptime(end_time, "%Y-%m-%d %H:%M")
+                        return (start_time, end_time)
+                    except ValueError:
+                        pass
             
         except Exception as e:
             print(f"LLM date extraction failed: {str(e)}")
@@ -0,0 +1,343 @@
+# tools/tracing.py
+"""Per-request stage spans, aggregated into per-workflow latency histograms.
+
+    with span("sql_build"):
+        ...
+
+    @traced("rag_retrieval")
+    def search_knowledge(...):
+
+A request opens a trace (start_trace), every span closed inside it is kept
+on the trace and, when the request ends (finish_trace), folded into the
+histograms under the workflow that handled it. /metrics renders them in the
+Prometheus text format; the same spans go out as a Server-Timing header.
+
+Every Ollama call made while handling the request also adds its token
+counts and durations to the request's LLMUsage (record_llm_call), which
+becomes the OpenAI `usage` block and per-workflow token counters.
+"""
+import time
+import threading
+import functools
+import contextvars
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from config.api_config import TRACING_CONFIG
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+_current_usage = contextvars.ContextVar("current_usage", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram (seconds)"""
+
+    def __init__(self, buckets: List[float]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.sum += seconds
+        for index, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[index] += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bucket bound holding the q-th observation (None if beyond the last bucket)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, cumulative in zip(self.buckets, self.counts):
+            if cumulative >= rank:
+                return bound
+        return None
+
+
+class Trace:
+    """Spans recorded while handling one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.workflow = "unknown"
+        self.spans = []       # (stage, duration_seconds) in completion order
+        self.intervals = []   # (stage, start, end) perf_counter times, for the request profiler
+        self.duration = None
+
+    def add(self, stage: str, seconds: float, start: Optional[float] = None):
+        self.spans.append((stage, seconds))
+        if start is not None:
+            self.intervals.append((stage, start, start + seconds))
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, repeated stages summed"""
+        totals = {}
+        for stage, seconds in self.spans:
+            totals[stage] = totals.get(stage, 0.0) + seconds
+        parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in totals.items()]
+        if self.duration is not None:
+            parts.append(f"total;dur={self.duration * 1000:.1f}")
+        return ", ".join(parts)
+
+
+class Span:
+    """Times one pipeline stage; rename() when the path taken is only known inside"""
+
+    __slots__ = ("stage", "start", "_token")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def rename(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        seconds = time.perf_counter() - self.start
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(self.stage, seconds, self.start)
+        else:
+            metrics.observe_stage("untraced", self.stage, seconds)
+        return False
+
+
+class _NoopSpan:
+    def rename(self, stage: str):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class LLMUsage:
+    """Token counts and Ollama durations summed over the LLM calls of one request"""
+
+    COUNTERS = ("calls", "prompt_tokens", "completion_tokens",
+                "prompt_eval_seconds", "eval_seconds", "load_seconds", "total_seconds")
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.prompt_eval_seconds = 0.0
+        self.eval_seconds = 0.0
+        self.load_seconds = 0.0
+        self.total_seconds = 0.0
+
+    def add(self, result: Dict[str, Any]):
+        """Fold in one /api/generate response (durations are in nanoseconds)"""
+        self.calls += 1
+        self.prompt_tokens += result.get("prompt_eval_count") or 0
+        self.completion_tokens += result.get("eval_count") or 0
+        self.prompt_eval_seconds += (result.get("prompt_eval_duration") or 0) / 1e9
+        self.eval_seconds += (result.get("eval_duration") or 0) / 1e9
+        self.load_seconds += (result.get("load_duration") or 0) / 1e9
+        self.total_seconds += (result.get("total_duration") or 0) / 1e9
+
+    def as_openai_usage(self) -> Dict[str, int]:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: round(getattr(self, name), 4) for name in self.COUNTERS}
+
+
+class MetricsRegistry:
+    """Stage and request histograms keyed by workflow"""
+
+    def __init__(self, buckets: List[float]):
+        self.buckets = buckets
+        self._stages = {}     # (workflow, stage) -> Histogram
+        self._requests = {}   # workflow -> Histogram
+        self._llm = {}        # workflow -> {counter: total} (LLMUsage.COUNTERS + requests)
+        self._lock = threading.Lock()
+
+    def _histogram(self, table: Dict, key) -> Histogram:
+        histogram = table.get(key)
+        if histogram is None:
+            histogram = table[key] = Histogram(self.buckets)
+        return histogram
+
+    def observe_stage(self, workflow: str, stage: str, seconds: float):
+        with self._lock:
+            self._histogram(self._stages, (workflow, stage)).observe(seconds)
+
+    def observe_trace(self, trace: Trace):
+        with self._lock:
+            for stage, seconds in trace.spans:
+                self._histogram(self._stages, (trace.workflow, stage)).observe(seconds)
+            self._histogram(self._requests, trace.workflow).observe(trace.duration)
+
+    def observe_llm_usage(self, workflow: str, usage: LLMUsage):
+        with self._lock:
+            totals = self._llm.setdefault(workflow, dict.fromkeys(("requests",) + LLMUsage.COUNTERS, 0))
+            totals["requests"] += 1
+            for name in LLMUsage.COUNTERS:
+                totals[name] += getattr(usage, name)
+
+    def get_summary(self) -> Dict[str, Any]:
+        """Count / mean / p50 / p99 (bucket bounds) per workflow and stage"""
+        def describe(histogram: Histogram) -> Dict[str, Any]:
+            return {
+                "count": histogram.count,
+                "mean_ms": round(histogram.sum / histogram.count * 1000, 1) if histogram.count else 0.0,
+                "p50_le_seconds": histogram.quantile(0.5),
+                "p99_le_seconds": histogram.quantile(0.99)
+            }
+
+        with self._lock:
+            summary = {}
+            for workflow, histogram in self._requests.items():
+                summary.setdefault(workflow, {"stages": {}})["request"] = describe(histogram)
+            for (workflow, stage), histogram in self._stages.items():
+                summary.setdefault(workflow, {"stages": {}})["stages"][stage] = describe(histogram)
+            for workflow, totals in self._llm.items():
+                per_request = {name: round(totals[name] / totals["requests"], 3) for name in LLMUsage.COUNTERS}
+                prefill_share = (totals["prompt_eval_seconds"] / totals["total_seconds"]
+                                 if totals["total_seconds"] else None)
+                summary.setdefault(workflow, {"stages": {}})["llm"] = {
+                    "requests": totals["requests"],
+                    "per_request": per_request,
+                    "prompt_eval_share": round(prefill_share, 3) if prefill_share is not None else None
+                }
+            return summary
+
+    def render_prometheus(self, prefix: str = "nsqm") -> str:
+        lines = []
+        with self._lock:
+            self._render(lines, f"{prefix}_request_duration_seconds",
+                         "End-to-end chat request latency by workflow",
+                         [((("workflow", workflow),), histogram) for workflow, histogram in self._requests.items()])
+            self._render(lines, f"{prefix}_stage_duration_seconds",
+                         "Pipeline stage latency by workflow",
+                         [((("workflow", workflow), ("stage", stage)), histogram)
+                          for (workflow, stage), histogram in self._stages.items()])
+            self._render_counter(lines, f"{prefix}_llm_tokens_total", "Ollama tokens by workflow and kind",
+                                 [((("workflow", workflow), ("kind", kind)), totals[f"{kind}_tokens"])
+                                  for workflow, totals in self._llm.items() for kind in ("prompt", "completion")])
+            self._render_counter(lines, f"{prefix}_llm_seconds_total", "Ollama time by workflow and phase",
+                                 [((("workflow", workflow), ("phase", phase)), totals[f"{phase}_seconds"])
+                                  for workflow, totals in self._llm.items()
+                                  for phase in ("prompt_eval", "eval", "load")])
+            self._render_counter(lines, f"{prefix}_llm_calls_total", "Ollama calls by workflow",
+                                 [((("workflow", workflow),), totals["calls"]) for workflow, totals in self._llm.items()])
+        return "\n".join(lines) + "\n"
+
+    def _render_counter(self, lines: List[str], name: str, help_text: str,
+                        series: List[Tuple[Tuple[Tuple[str, str], ...], float]]):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for labels, value in sorted(series, key=lambda item: item[0]):
+            label_text = ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+            lines.append(f"{name}{{{label_text}}} {value:g}")
+
+    def _render(self, lines: List[str], name: str, help_text: str,
+                series: List[Tuple[Tuple[Tuple[str, str], ...], Histogram]]):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for labels, histogram in sorted(series, key=lambda item: item[0]):
+            label_text = ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+            for bound, cumulative in zip(histogram.buckets, histogram.counts):
+                lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{label_text},le="+Inf"}} {histogram.count}')
+            lines.append(f"{name}_sum{{{label_text}}} {histogram.sum:.6f}")
+            lines.append(f"{name}_count{{{label_text}}} {histogram.count}")
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._requests.clear()
+            self._llm.clear()
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = MetricsRegistry(TRACING_CONFIG["buckets_seconds"])
+
+
+def span(stage: str):
+    """Context manager timing one stage (no-op when tracing is disabled)"""
+    if not TRACING_CONFIG["enabled"]:
+        return _NOOP_SPAN
+    return Span(stage)
+
+
+def traced(stage: str) -> Callable:
+    """Decorator form of span()"""
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def rename_current_span(stage: str):
+    """Relabel the innermost open span (e.g. classification_rule -> classification_llm)"""
+    current = _current_span.get()
+    if current is not None:
+        current.rename(stage)
+
+
+def start_trace() -> Optional[Trace]:
+    """Open the request trace; LLM usage is collected even when tracing is disabled"""
+    _current_usage.set(LLMUsage())
+    if not TRACING_CONFIG["enabled"]:
+        return None
+    trace = Trace()
+    _current_trace.set(trace)
+    return trace
+
+
+def record_llm_call(result: Dict[str, Any]):
+    """Add one Ollama response's counts/durations to the current request (no-op outside one)"""
+    usage = _current_usage.get()
+    if usage is not None:
+        usage.add(result)
+
+
+def current_llm_usage() -> Optional[LLMUsage]:
+    return _current_usage.get()
+
+
+def set_workflow(workflow: str):
+    trace = _current_trace.get()
+    if trace is not None and workflow:
+        trace.workflow = workflow
+
+
+def finish_trace() -> Optional[Trace]:
+    """Close the request trace and fold its spans into the histograms"""
+    trace = _current_trace.get()
+    usage = _current_usage.get()
+    _current_usage.set(None)
+    if trace is None:
+        return None
+    _current_trace.set(None)
+    trace.duration = time.perf_counter() - trace.started
+    if usage is not None and usage.calls:
+        # Prefill vs decode time of the request's LLM calls, next to the stage spans
+        trace.add("llm_prompt_eval", usage.prompt_eval_seconds)
+        trace.add("llm_eval", usage.eval_seconds)
+        metrics.observe_llm_usage(trace.workflow, usage)
+    metrics.observe_trace(trace)
+    return trace
@@ -1,8 +1,8 @@
 # workflows/base_workflow.py
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional
-from tools.direct_database_tool import DirectDatabaseTool
-from tools.smart_query_builder import SmartQueryBuilder
+from tools.direct_database_tool import DirectDatabaseTool, append_guard_note
+from tools.component_registry import registry
 from agents.story_agent import StoryAgentSummary
 
 class BaseWorkflow(ABC):
@@ -15,10 +15,11 @@ class BaseWorkflow(ABC):
             self.db_tool = db_tool
             print("✅ Using SHARED database connection")
         else:
-            self.db_tool = DirectDatabaseTool()
-            print("🆕 Created NEW database connection")
+            self.db_tool = registry.get_optional("db_tool") or DirectDatabaseTool()
+            print("🆕 Using registry database connection")
         
-        self.query_builder = SmartQueryBuilder(use_direct_db=True)
+        # One SmartQueryBuilder (semantic mapping + caches) shared by all workflows
+        self.query_builder = registry.get("query_builder")
         self.story_agent = StoryAgentSummary()
         
     @abstractmethod
@@ -53,6 +54,10 @@ class BaseWorkflow(ABC):
             "metadata": {}
         }
     
+    def _append_guard_note(self, narrative: str, execution_result: Dict) -> str:
+        """Append query cost-guard note (narrowing/sampling) to narrative"""
+        return append_guard_note(narrative, execution_result)
+    
     def _extract_location_simple(self, entities: Dict) -> str:
         """Extract location from entities for narrative"""
         geo_entities = entities.get('geographic', [])
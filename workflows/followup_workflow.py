@@ -1,5 +1,6 @@
 # 1. workflows/followup_workflow.py
 from typing import Dict, Any, Optional
+from config.api_config import KELUHAN_NORMALIZER_CONFIG
 from workflows.base_workflow import BaseWorkflow
 
 class FollowupWorkflow(BaseWorkflow):
@@ -131,9 +132,13 @@ class FollowupWorkflow(BaseWorkflow):
         
         if len(data) > 0:
             # Format examples
+            shown = data[:5]  # Show max 5 examples
+            keluhan_list = self.story_agent.extract_and_improve_keluhan_batch(
+                [complaint.get('description', '') for complaint in shown],
+                use_llm=KELUHAN_NORMALIZER_CONFIG["list_view_rewrite"])
             examples = []
-            for i, complaint in enumerate(data[:5], 1):  # Show max 5 examples
-                examples.append(self._format_complaint_example(complaint, i))
+            for i, (complaint, keluhan) in enumerate(zip(shown, keluhan_list), 1):
+                examples.append(self._format_complaint_example(complaint, i, keluhan))
             
             # Determine header based on filters
             if status_entities or 'belum solve' in filters.lower():
@@ -149,8 +154,8 @@ class FollowupWorkflow(BaseWorkflow):
             else:
                 return f"📋 **Tidak ada keluhan ditemukan di {location} {time_period}.**"
     
-    def _format_complaint_example(self, complaint: Dict, index: int) -> str:
-        """Format single complaint as detailed example"""
+    def _format_complaint_example(self, complaint: Dict, index: int, keluhan: str = "N/A") -> str:
+        """Format single complaint as detailed example (keluhan: rewritten Detail Keluhan, if any)"""
         order_id = complaint.get('order_id', 'N/A')
         create_time = complaint.get('create_time', 'N/A')
         description = complaint.get('description', 'N/A')
@@ -167,8 +172,8 @@ class FollowupWorkflow(BaseWorkflow):
         # Format customer type emoji
         customer_emoji = "👤" if "Consumer" in customer_type else "🏢"
         
-        # Clean and truncate description
-        short_desc = self._clean_description(description)
+        # Rewritten keluhan, else cleaned and truncated description
+        short_desc = keluhan if keluhan and keluhan != 'N/A' else self._clean_description(description)
         
         return f"""**{index}. {order_id}**
 📅 {formatted_date}
@@ -1,21 +1,32 @@
 # 2. workflows/knowledge_workflow.py  
+import copy
 from typing import Dict, Any, Optional
 from workflows.base_workflow import BaseWorkflow
-from knowledge.rag_tool import RAGTool
+from tools.component_registry import registry
+from config.api_config import FINGERPRINT_CACHE_CONFIG
+from tools.lru_cache import LRUCache
+from tools.query_normalizer import get_normalizer
 
 class KnowledgeWorkflow(BaseWorkflow):
     """Workflow for handling knowledge-based queries using RAG"""
     
+    # RAG answers per (query fingerprint, knowledge base version)
+    _answer_cache = LRUCache(
+        max_entries=FINGERPRINT_CACHE_CONFIG["knowledge_answer"].get("max_entries", 256),
+        ttl_seconds=FINGERPRINT_CACHE_CONFIG["knowledge_answer"].get("ttl_seconds"),
+        name="KnowledgeAnswerCache"
+    )
+    
     def __init__(self, db_tool=None):
         """Initialize KnowledgeWorkflow - doesn't need db_tool but accepts for consistency"""
         super().__init__(db_tool)
         
-        try:
-            self.rag_tool = RAGTool()
+        # Shared RAGTool (one embedding model + Chroma client per process)
+        self.rag_tool = registry.get_optional("rag_tool")
+        if self.rag_tool:
             print("✅ KnowledgeWorkflow initialized with RAG")
-        except Exception as e:
-            print(f"❌ RAG initialization failed: {str(e)}")
-            self.rag_tool = None
+        else:
+            print("❌ RAG initialization failed")
     
     def execute(self, user_query: str, enhanced_context: Optional[Dict] = None, session_id: str = "") -> Dict[str, Any]:
         """
@@ -33,6 +44,14 @@ class KnowledgeWorkflow(BaseWorkflow):
             if not self.rag_tool:
                 return self._create_error_response("RAG tool not available")
             
+            cache_enabled = FINGERPRINT_CACHE_CONFIG["knowledge_answer"].get("enabled", True)
+            cache_key = (get_normalizer().fingerprint(user_query), self.rag_tool.knowledge_version())
+            if cache_enabled:
+                cached_response = self._answer_cache.get(cache_key)
+                if cached_response is not None:
+                    print(f"[{session_id}] 💾 Knowledge answer cache HIT")
+                    return copy.deepcopy(cached_response)
+            
             # Check if knowledge base has content
             stats = self.rag_tool.get_knowledge_stats()
             if stats.get("total_documents", 0) == 0:
@@ -69,7 +88,7 @@ class KnowledgeWorkflow(BaseWorkflow):
             # Generate RAG answer
             rag_answer = self.rag_tool.generate_rag_answer(user_query, filtered_docs)
             
-            return self._create_success_response(
+            response = self._create_success_response(
                 rag_answer,
                 metadata={
                     "search_results": len(relevant_docs),
@@ -80,10 +99,30 @@ class KnowledgeWorkflow(BaseWorkflow):
                 }
             )
             
+            # Don't cache LLM failures
+            if cache_enabled and not rag_answer.startswith("❌"):
+                self._answer_cache.set(cache_key, copy.deepcopy(response))
+            
+            return response
+            
         except Exception as e:
             self._log_workflow_execution(session_id, "KnowledgeWorkflow", user_query, False)
             return self._create_error_response(f"Knowledge workflow execution failed: {str(e)}")
     
+    @classmethod
+    def get_cache_stats(cls) -> Dict[str, Any]:
+        return cls._answer_cache.get_stats()
+    
+    @classmethod
+    def export_cache_entries(cls) -> list:
+        """Answers with their knowledge base version (the persisted document count)"""
+        return cls._answer_cache.export_entries()
+    
+    @classmethod
+    def load_cache_entries(cls, entries: list) -> int:
+        # Answers of an older knowledge base keep their old version in the key and are never hit
+        return cls._answer_cache.load_entries(entries)
+    
     def is_knowledge_query(self, user_query: str) -> bool:
         """Check if query is knowledge-related"""
         knowledge_keywords = [
@@ -1,7 +1,8 @@
 from typing import Dict, Any, Optional, List
 from tools.query_parser import SmartCareQueryParser
-from tools.telkomsel_api_client import TelkomselAPIClient
+from tools.component_registry import get_component
 from tools.chart_generator import ChartGenerator
+from tools.tracing import span, traced
 
 class SmartCareWorkflow:
     """Workflow for handling real-time MSISDN queries with API integration"""
@@ -9,7 +10,8 @@ class SmartCareWorkflow:
     def __init__(self):
         """Initialize SmartCare workflow components"""
         self.query_parser = SmartCareQueryParser()
-        self.api_client = TelkomselAPIClient()
+        # Shared Telkomsel client (token + response cache per process, see CACHE_CONFIG)
+        self.api_client = get_component("smartcare_api")
         self.chart_generator = ChartGenerator()
         print("🔗 SmartCareWorkflow initialized")
 
@@ -47,11 +49,12 @@ class SmartCareWorkflow:
             api_format_msisdn = self._convert_to_api_format(msisdn_info["normalized"])
             
             try:
-                api_result = self.api_client.query_user_history(
-                    api_format_msisdn,
-                    api_params["startTime"],
-                    api_params["endTime"]
-                )
+                with span("smartcare_api"):
+                    api_result = self.api_client.query_user_history(
+                        api_format_msisdn,
+                        api_params["startTime"],
+                        api_params["endTime"]
+                    )
             except Exception as api_error:
                 # Catch ALL exceptions from API calls
                 print(f"API Error caught: {api_error}")
@@ -100,6 +103,7 @@ class SmartCareWorkflow:
             }
         }
 
+    @traced("smartcare_chart")
     def _generate_chart_response(self, api_result: Dict, msisdn_info: Dict, time_range: Dict, session_id: str) -> Dict[str, Any]:
         """Generate chart visualization from API data"""
         try:
@@ -130,6 +134,7 @@ class SmartCareWorkflow:
         except Exception as e:
             return self._create_error_response(f"Chart generation failed: {str(e)}")
     
+    @traced("narrative")
     def _generate_narrative_response(self, api_result: Dict, msisdn_info: Dict, time_range: Dict, intent: str, session_id: str) -> Dict[str, Any]:
         """Generate narrative response from API data"""
         try:
@@ -39,7 +39,9 @@ class SummaryWorkflow(BaseWorkflow):
                 
                 if data and len(data) > 0:
                     # Generate comprehensive summary narrative
-                    narrative = self.story_agent.generate_summary_narrative(data, location, time_period)
+                    narrative = self.story_agent.generate_summary_narrative(data, location, time_period,
+                                                                            result.get("approximation"))
+                    narrative = self._append_guard_note(narrative, execution_result)
                     
                     return self._create_success_response(
                         narrative,
@@ -50,12 +52,15 @@ class SummaryWorkflow(BaseWorkflow):
                             "location": location,
                             "time_period": time_period,
                             "data_points": len(data),
-                            "total_complaints": self._calculate_total_complaints(data)
+                            "total_complaints": self._calculate_total_complaints(data),
+                            "guard": execution_result.get("guard"),
+                            "approximation": result.get("approximation")
                         }
                     )
                 else:
                     # No data found for summary
                     no_data_message = self._generate_no_data_summary(location, time_period)
+                    no_data_message = self._append_guard_note(no_data_message, execution_result)
                     
                     return self._create_success_response(
                         no_data_message,